@@ -1,116 +1,317 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, g
 import os
-import re
 import json
+import math
+import base64
+import binascii
+import logging
+import time
+import functools
+import threading
 from scripts.preferences import UserPreferences
-from datetime import datetime
+from scripts.note_store import NoteStore, load_equipment_file, equipment_source
+from scripts.note_db import SqliteNoteStore
+from scripts.file_index import NoteFileIndex
+from scripts.watcher import DataDirWatcher
+from scripts.jobs import JobQueue, JobConflict
+from scripts.similarity import NoteSimilarity
+from extract_notes import default_plum_path, extract_notes_incremental
+from scripts.export import iter_ndjson, iter_csv, gzip_stream
+from scripts import metrics
+from scripts.metrics import span, SlowRequestProfiler
+from scripts.response_cache import ResponseCache
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
 DATA_DIR = os.path.join(os.getcwd(), "data")
 user_prefs = UserPreferences()
+API_MAX_LIMIT = 500
+# Page size used when the notesPerPage preference is not a usable number
+DEFAULT_NOTES_PER_PAGE = 20
+# Date filters resolved against the current date
+RELATIVE_DATE_FILTERS = ('today', 'week', 'month')
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (iter_csv, 'text/csv', 'csv'),
+}
+# "sqlite" (default) keeps notes in NOTES_DB; "json" keeps using data/notes.json
+NOTES_BACKEND = os.environ.get('NOTES_BACKEND', 'sqlite')
+NOTES_DB = os.environ.get('NOTES_DB', os.path.join(os.getcwd(), 'clean_notes.db'))
+if NOTES_BACKEND == 'json':
+    note_store = NoteStore(DATA_DIR)
+else:
+    note_store = SqliteNoteStore(NOTES_DB, data_dir=DATA_DIR)
+# Persistent index over the extracted data/<site>/note_N.txt files, built by
+# the first search_notes() call
+text_index = None
+text_index_lock = threading.Lock()
+# Background jobs (extraction) run here instead of in the request thread
+job_queue = JobQueue()
+EXTRACT_STAGES = ('read', 'cleaned', 'written')
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', '1'))
+# MinHash/LSH index of note texts for "similar notes" and clustering jobs,
+# brought up to date with the store on use
+note_similarity = NoteSimilarity(note_store, threshold=float(os.environ.get('SIMILARITY_THRESHOLD', '0.6')))
+CLUSTER_STAGES = ('indexed', 'clustered')
+# Set DATA_WATCHER=0 to re-check DATA_DIR on each request instead of watching it
+DATA_WATCHER = os.environ.get('DATA_WATCHER', '1') != '0'
+# Rendered pages and API responses, keyed by their filters and the corpus
+# generation; RESPONSE_CACHE_MB=0 turns the cache off
+RESPONSE_CACHE_MB = float(os.environ.get('RESPONSE_CACHE_MB', '32'))
+response_cache = ResponseCache(max_bytes=int(RESPONSE_CACHE_MB * 1024 * 1024))
+# Set PROFILE_SLOW_MS to save cProfile stats of requests slower than that;
+# PROFILE_SAMPLE_RATE profiles only that fraction of requests
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '0'))
+profiler = None
+if PROFILE_SLOW_MS > 0:
+    profiler = SlowRequestProfiler(PROFILE_SLOW_MS / 1000,
+                                   sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '1.0')),
+                                   output_dir=os.environ.get('PROFILE_DIR', os.path.join(os.getcwd(), 'logs', 'profiles')))
+
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+    g.profile = profiler.start() if profiler else None
+
+@app.after_request
+def add_request_timing(response):
+    """Record the request in /metrics and report its spans in a Server-Timing header"""
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unmatched'
+    metrics.registry.inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.registry.observe('http_request_duration_seconds', elapsed, endpoint=endpoint)
+    response.headers['Server-Timing'] = metrics.server_timing(metrics.finish_request(), total=elapsed)
+    return response
+
+@app.teardown_request
+def finish_request_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.finish(profile, time.perf_counter() - g.request_start, f'{request.method}_{request.path}')
+
+def import_equipment_file(site, path):
+    """Make the store's notes from one <site>/<equipment>.json match the file"""
+    try:
+        notes = load_equipment_file(site, path)
+    except (OSError, ValueError) as e:
+        # Usually a file still being written or just removed; its next event retries
+        logging.warning(f"Skipping {path}: {e}")
+        return
+    note_store.replace_source(equipment_source(site, path), notes)
+
+def import_equipment_files():
+    """
+    Bring the store in line with every <site>/<equipment>.json under DATA_DIR,
+    e.g. files changed or removed while the app was stopped
+    """
+    sources = set()
+    if os.path.isdir(DATA_DIR):
+        for site_entry in sorted(os.scandir(DATA_DIR), key=lambda entry: entry.name):
+            if site_entry.is_dir():
+                for entry in sorted(os.scandir(site_entry.path), key=lambda entry: entry.name):
+                    if entry.name.endswith('.json') and entry.is_file():
+                        sources.add(equipment_source(site_entry.name, entry.path))
+                        import_equipment_file(site_entry.name, entry.path)
+    for source in note_store.get_sources() - sources:
+        note_store.replace_source(source, [])
+
+def apply_data_changes(paths):
+    """Watcher callback: apply changed paths under DATA_DIR to the note store and text index"""
+    if paths is None:
+        # Events were lost; fall back to a full comparison
+        if text_index is not None:
+            text_index.refresh()
+        if NOTES_BACKEND == 'json':
+            note_store.refresh()
+        import_equipment_files()
+        response_cache.clear()
+        return
+    # The JSON store opens its lock file for every write; that alone changes no data
+    paths = {path for path in paths if path != 'notes.lock'}
+    if not paths:
+        return
+    response_cache.clear()
+    index_changed = False
+    for relpath in sorted(paths):
+        parts = relpath.split(os.sep)
+        path = os.path.join(DATA_DIR, relpath)
+        if len(parts) == 1 and parts[0] in ('notes.json', 'notes.jsonl'):
+            if NOTES_BACKEND == 'json':
+                note_store.refresh()
+        elif len(parts) == 1 and not os.path.exists(path):
+            # A removed site directory takes the notes of all its files along
+            prefix = equipment_source(parts[0], '')
+            for source in note_store.get_sources():
+                if source.startswith(prefix):
+                    note_store.replace_source(source, [])
+        elif len(parts) == 2 and parts[1].endswith('.json'):
+            # A new, updated or removed <site>/<equipment>.json
+            if os.path.isfile(path):
+                import_equipment_file(parts[0], path)
+            elif not os.path.exists(path):
+                note_store.replace_source(equipment_source(parts[0], path), [])
+        if text_index is not None:
+            index_changed |= text_index.update_path(relpath)
+    if index_changed:
+        text_index.save()
+
+data_watcher = None
+if DATA_WATCHER:
+    data_watcher = DataDirWatcher(DATA_DIR, apply_data_changes).start()
+    # Changes from here on arrive through the watcher; catch up once now with
+    # the files changed while the app was stopped
+    if NOTES_BACKEND == 'json':
+        note_store.refresh()
+        note_store.watched = True
+    import_equipment_files()
+
+def get_text_index():
+    """Return the extracted note file index, loading and refreshing it on first use"""
+    global text_index
+    with text_index_lock:
+        if text_index is None:
+            # Published before the first refresh so changes seen by the watcher
+            # meanwhile are applied after it rather than dropped
+            text_index = NoteFileIndex(DATA_DIR)
+            text_index.refresh()
+        return text_index
 
 def search_notes(query):
-    results = []
-    # Walk through each site directory under DATA_DIR
-    for root, dirs, files in os.walk(DATA_DIR):
-        for file in files:
-            if file.endswith(".txt"):
-                filepath = os.path.join(root, file)
-                with open(filepath, "r", encoding="utf-8") as f:
-                    content = f.read()
-                # If query is empty or found in note, add to results
-                if not query or re.search(re.escape(query), content, re.IGNORECASE):
-                    # Get site name from directory structure
-                    site = os.path.basename(root)
-                    results.append({"site": site, "content": content})
-    return results
-
-def load_notes():
-    """Load notes from the JSON file or database"""
-    try:
-        notes_path = os.path.join(DATA_DIR, 'notes.json')
-        if os.path.exists(notes_path):
-            with open(notes_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            # Check for individual site directories if notes.json doesn't exist
-            notes = []
-            for site_dir in os.listdir(DATA_DIR):
-                site_path = os.path.join(DATA_DIR, site_dir)
-                if os.path.isdir(site_path):
-                    for file in os.listdir(site_path):
-                        if file.endswith('.json'):
-                            file_path = os.path.join(site_path, file)
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                equipment_notes = json.load(f)
-                                equipment = file.replace('.json', '')
-                                for note_data in equipment_notes:
-                                    notes.append({
-                                        "site": site_dir,
-                                        "equipment": equipment,
-                                        "content": note_data.get('content', ''),
-                                        "date": note_data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                                    })
-            
-            # Save the combined notes to notes.json for future use
-            os.makedirs(DATA_DIR, exist_ok=True)
-            with open(notes_path, 'w', encoding='utf-8') as f:
-                json.dump(notes, f, indent=4)
-            
-            return notes
-    except Exception as e:
-        print(f"Error loading notes: {e}")
-        # Create an empty notes file if it doesn't exist or has errors
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(os.path.join(DATA_DIR, 'notes.json'), 'w', encoding='utf-8') as f:
-            json.dump([], f)
-        return []
+    """Search the extracted note files; only new or changed files are read from disk"""
+    return get_text_index().search(query, refresh=data_watcher is None)
 
 def get_available_sites():
     """Get a list of all available sites from the notes data"""
-    notes = load_notes()
-    return sorted(list(set(note['site'] for note in notes if 'site' in note)))
+    return note_store.get_sites()
+
+def parse_day(value, name):
+    """Parse a YYYY-MM-DD form or query value, raising ValueError if it is malformed"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+
+def date_filter_range(date_filter, start='', end=''):
+    """
+    Translate a date filter into a [date_from, date_to) string range.
+    'custom' (or no filter with start/end given) uses the inclusive days start..end.
+    """
+    today = datetime.now().date()
+    if date_filter == 'today':
+        first, last = today, today
+    elif date_filter == 'week':
+        # Monday to Sunday, the same weeks the facet counts use
+        first = today - timedelta(days=today.weekday())
+        last = first + timedelta(days=6)
+    elif date_filter == 'month':
+        first = today.replace(day=1)
+        last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    elif date_filter == 'custom' or (not date_filter and (start or end)):
+        first = parse_day(start, 'date_from') if start else None
+        last = parse_day(end, 'date_to') if end else None
+        if first and last and first > last:
+            raise ValueError('date_from must not be after date_to')
+    elif not date_filter:
+        return None, None
+    else:
+        raise ValueError(f'Unknown date filter: {date_filter}')
+    date_from = first.isoformat() if first else None
+    date_to = (last + timedelta(days=1)).isoformat() if last else None
+    return date_from, date_to
+
+def notes_per_page():
+    """The notesPerPage preference as a page size between 1 and API_MAX_LIMIT, or the default if it is not a positive number"""
+    try:
+        per_page = int(user_prefs.get_preference('notesPerPage', DEFAULT_NOTES_PER_PAGE))
+    except (TypeError, ValueError):
+        return DEFAULT_NOTES_PER_PAGE
+    return min(per_page, API_MAX_LIMIT) if per_page >= 1 else DEFAULT_NOTES_PER_PAGE
+
+def response_cache_key():
+    """Everything a cached page or API response depends on"""
+    params = tuple(sorted((name, value) for name, value in request.values.items(multi=True) if value != ''))
+    # Relative date filters cover different days as the calendar moves on
+    today = datetime.now().date().isoformat() if request.values.get('date_filter') in RELATIVE_DATE_FILTERS else None
+    return (request.path, params, today, note_store.generation(), user_prefs.version)
+
+def skip_response_cache():
+    """Keep the current response (usually an error) out of the response cache"""
+    g.skip_response_cache = True
+
+def cached_response(view):
+    """
+    Serve a view from the response cache while the corpus is unchanged, and
+    answer a matching If-None-Match with 304 without running the view
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not response_cache.max_bytes:
+            return view(*args, **kwargs)
+        key = response_cache_key()
+        etag = response_cache.etag(key)
+        if request.if_none_match.contains(etag):
+            metrics.inc('cache_hits_total', cache='etag')
+            response = Response(status=304)
+        else:
+            cached = response_cache.get(key)
+            if cached is not None:
+                metrics.inc('cache_hits_total', cache='responses')
+                body, mimetype = cached
+                response = Response(body, mimetype=mimetype)
+            else:
+                metrics.inc('cache_misses_total', cache='responses')
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or g.get('skip_response_cache'):
+                    return response
+                response_cache.put(key, response.get_data(), response.mimetype)
+        response.set_etag(etag)
+        # Browsers may keep the page but must revalidate it with the ETag
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
 
 @app.route('/', methods=['GET', 'POST'])
+@cached_response
 def index():
     search_query = request.form.get('search', '')
     site_filter = request.form.get('site_filter', '')
     date_filter = request.form.get('date_filter', '')
+    custom_from = request.form.get('date_from', '')
+    custom_to = request.form.get('date_to', '')
+    page = request.form.get('page', 1, type=int)
     error = None
 
     try:
-        notes = load_notes()
-        results = [note for note in notes if search_query.lower() in note.get('content', '').lower()]
+        date_from, date_to = date_filter_range(date_filter, custom_from, custom_to)
+        per_page = notes_per_page()
+        # Total, facet counts and the page come back from one query
+        offset = (max(page, 1) - 1) * per_page
+        with span('notes'):
+            result = note_store.facet_notes(search_query, site_filter, date_from, date_to,
+                                            limit=per_page, offset=offset)
+        total_notes = result['total']
+        total_pages = max(1, math.ceil(total_notes / per_page))
+        if not 1 <= page <= total_pages:
+            page = min(max(page, 1), total_pages)
+            with span('notes'):
+                result = note_store.facet_notes(search_query, site_filter, date_from, date_to,
+                                                limit=per_page, offset=(page - 1) * per_page)
         
-        if site_filter:
-            results = [note for note in results if note.get('site', '') == site_filter]
+        # Only the current page is fetched and rendered
+        results = result['notes']
         
-        # Apply date filter logic here if needed
-        if date_filter:
-            today = datetime.now().strftime('%Y-%m-%d')
-            if date_filter == 'today':
-                results = [note for note in results if note.get('date', '').startswith(today)]
-            elif date_filter == 'week':
-                # Simplified week filter - just check if date is within 7 days
-                # A more robust implementation would use datetime calculations
-                results = [note for note in results if 
-                          note.get('date', '') >= (datetime.now().replace(day=datetime.now().day-7)).strftime('%Y-%m-%d')]
-            elif date_filter == 'month':
-                # Simplified month filter - just check if it's the current month and year
-                current_month_year = datetime.now().strftime('%Y-%m')
-                results = [note for note in results if 
-                          note.get('date', '').startswith(current_month_year)]
-        
-        grouped_notes = {}
-        for note in results:
-            site = note.get('site', 'Unknown Site')
-            if site not in grouped_notes:
-                grouped_notes[site] = []
-            grouped_notes[site].append(note)
+        with span('group'):
+            grouped_notes = {}
+            for note in results:
+                site = note.get('site', 'Unknown Site')
+                if site not in grouped_notes:
+                    grouped_notes[site] = []
+                grouped_notes[site].append(note)
         
-        total_notes = len(results)
-        unique_sites = len(grouped_notes)
-        sites = get_available_sites()
+        unique_sites = len(result['facets']['site'])
+        with span('sites'):
+            sites = get_available_sites()
         
         # Get user preferences for template
         theme = user_prefs.get_preference('theme', 'light')
@@ -118,49 +319,141 @@ def index():
         sidebar_expanded = user_prefs.get_preference('sidebarExpanded', True)
         
     except Exception as e:
+        skip_response_cache()
         error = str(e)
         print(f"Error in index route: {e}")
         results = []
         grouped_notes = {}
         total_notes = 0
         unique_sites = 0
+        page = 1
+        total_pages = 1
         sites = []
         theme = "light"
         default_sort = "date-desc"
         sidebar_expanded = True
 
-    return render_template('index.html', 
-                          notes=results, 
-                          search_query=search_query, 
-                          site_filter=site_filter, 
-                          date_filter=date_filter, 
-                          error=error, 
-                          grouped_notes=grouped_notes, 
-                          total_notes=total_notes, 
-                          unique_sites=unique_sites,
-                          sites=sites,
-                          theme=theme,
-                          default_sort=default_sort,
-                          sidebar_expanded=sidebar_expanded)
+    with span('render'):
+        return render_template('index.html', 
+                              notes=results, 
+                              search_query=search_query, 
+                              site_filter=site_filter, 
+                              date_filter=date_filter, 
+                              date_from=custom_from,
+                              date_to=custom_to,
+                              error=error, 
+                              grouped_notes=grouped_notes, 
+                              total_notes=total_notes, 
+                              unique_sites=unique_sites,
+                              page=page,
+                              total_pages=total_pages,
+                              sites=sites,
+                              theme=theme,
+                              default_sort=default_sort,
+                              sidebar_expanded=sidebar_expanded)
+
+def encode_cursor(note_id):
+    """Return an opaque pagination cursor pointing just past note_id"""
+    payload = json.dumps({'after': note_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def decode_cursor(cursor):
+    """Return the note id encoded in a cursor, raising ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return int(payload['after'])
+    except (TypeError, KeyError, ValueError, UnicodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+def page_args():
+    """Read limit/offset/cursor from the query string, raising ValueError if they are invalid"""
+    limit = request.args.get('limit', notes_per_page(), type=int)
+    offset = request.args.get('offset', 0, type=int)
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+    if limit < 1 or limit > API_MAX_LIMIT or offset < 0:
+        raise ValueError(f'limit must be between 1 and {API_MAX_LIMIT} and offset must be >= 0')
+    return limit, offset, after
+
+def date_args():
+    """Read date_filter/date_from/date_to from the query string as a [date_from, date_to) range"""
+    return date_filter_range(request.args.get('date_filter', ''),
+                             request.args.get('date_from', ''),
+                             request.args.get('date_to', ''))
 
 @app.route('/api/notes', methods=['GET'])
+@cached_response
 def api_get_notes():
     query = request.args.get('search', '')
     site = request.args.get('site', '')
     
     try:
-        notes = load_notes()
-        results = [note for note in notes if query.lower() in note['content'].lower()]
-        
-        if site:
-            results = [note for note in results if note['site'] == site]
+        limit, offset, after = page_args()
+        date_from, date_to = date_args()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        total = note_store.count_notes(query, site, date_from, date_to)
+        # Fetch one extra row to know whether another page follows
+        results = note_store.query_notes(query, site, date_from, date_to,
+                                         limit=limit + 1, offset=offset, after=after)
+        has_more = len(results) > limit
+        results = results[:limit]
             
         return jsonify({
             'success': True,
             'count': len(results),
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'next_cursor': encode_cursor(results[-1]['id']) if has_more else None,
             'notes': results
         })
     except Exception as e:
+        skip_response_cache()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/facets', methods=['GET'])
+@cached_response
+def api_get_facets():
+    """Matching notes plus their counts per site, equipment, day, week and month"""
+    query = request.args.get('search', '')
+    site = request.args.get('site', '')
+    
+    try:
+        limit, offset, after = page_args()
+        date_from, date_to = date_args()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        result = note_store.facet_notes(query, site, date_from, date_to,
+                                        limit=limit + 1, offset=offset, after=after)
+        has_more = len(result['notes']) > limit
+        results = result['notes'][:limit]
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'total': result['total'],
+            'limit': limit,
+            'offset': offset,
+            'next_cursor': encode_cursor(results[-1]['id']) if has_more else None,
+            'facets': result['facets'],
+            'notes': results
+        })
+    except Exception as e:
+        skip_response_cache()
         return jsonify({
             'success': False,
             'error': str(e)
@@ -170,25 +463,41 @@ def api_get_notes():
 def api_add_note():
     try:
         note_data = request.json
+        if not isinstance(note_data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a JSON object for the note'
+            }), 400
         
         # Validate required fields
-        if not note_data.get('content') or not note_data.get('site'):
+        if not str(note_data.get('content') or '').strip() or not note_data.get('site'):
             return jsonify({
                 'success': False,
                 'error': 'Content and site are required'
             }), 400
+        
+        # The stores index these as text; reject anything else before it is written
+        for field in ('site', 'equipment', 'content', 'date'):
+            if note_data.get(field) is not None and not isinstance(note_data[field], str):
+                return jsonify({
+                    'success': False,
+                    'error': f'{field} must be a string'
+                }), 400
             
         # Add timestamp if not provided
         if 'date' not in note_data:
             from datetime import datetime
             note_data['date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-        # Load existing notes, add the new one, and save
-        notes = load_notes()
-        notes.append(note_data)
-        
-        with open('c:\\LocalStorage\\Sticky_Note_Compiler\\data\\notes.json', 'w') as f:
-            json.dump(notes, f, indent=4)
+        # Add the new note to the shared store, which persists it unless the
+        # site already has a note with the same text
+        if note_store.add_note(note_data) is None:
+            return jsonify({
+                'success': True,
+                'duplicate': True,
+                'message': 'An identical note already exists for this site',
+                'note': note_data
+            })
             
         return jsonify({
             'success': True,
@@ -201,6 +510,87 @@ def api_add_note():
             'error': str(e)
         }), 500
 
+@app.route('/api/notes/<int:note_id>/similar', methods=['GET'])
+@cached_response
+def api_similar_notes(note_id):
+    """Notes whose text nearly matches the given note's, most similar first"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        threshold = request.args.get('threshold', note_similarity.index.threshold, type=float)
+        if limit < 1 or limit > API_MAX_LIMIT or not 0 < threshold <= 1:
+            raise ValueError(f'limit must be between 1 and {API_MAX_LIMIT} and threshold between 0 and 1')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        with span('similarity'):
+            index = note_similarity.refresh()
+            if note_id not in index:
+                return jsonify({
+                    'success': False,
+                    'error': 'Unknown note'
+                }), 404
+            matches = index.similar(note_id, limit=limit, threshold=threshold)
+        scores = dict(matches)
+        results = note_store.get_notes_by_id([other_id for other_id, _ in matches])
+        for note in results:
+            note['similarity'] = scores[note['id']]
+        
+        return jsonify({
+            'success': True,
+            'note_id': note_id,
+            'threshold': threshold,
+            'count': len(results),
+            'notes': results
+        })
+    except Exception as e:
+        skip_response_cache()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/export', methods=['GET'])
+def api_export_notes():
+    """Stream matching notes as NDJSON or CSV, optionally gzip-compressed"""
+    export_format = request.args.get('format', 'ndjson').lower()
+    compress = request.args.get('gzip', '') in ('1', 'true', 'yes')
+    query = request.args.get('search', '')
+    site = request.args.get('site', '')
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f"Unsupported export format: {export_format}"
+        }), 400
+    
+    try:
+        date_from, date_to = date_args()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    serializer, mimetype, extension = EXPORT_FORMATS[export_format]
+    body = serializer(note_store.iter_notes(query, site, date_from, date_to))
+    filename = f'notes.{extension}'
+    if compress:
+        body = gzip_stream(body)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, span, cache and scan metrics in the Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/preferences', methods=['GET'])
 def get_preferences():
     return jsonify(user_prefs.preferences)
@@ -209,10 +599,18 @@ def get_preferences():
 def update_preferences():
     try:
         new_prefs = request.json
+        if not isinstance(new_prefs, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a JSON object of preferences'
+            }), 400
         
-        # Update all preferences
-        for key, value in new_prefs.items():
-            user_prefs.set_preference(key, value)
+        # Apply all preferences as one change, saved with a single write
+        if not user_prefs.update(new_prefs):
+            return jsonify({
+                'success': False,
+                'error': 'Preferences could not be updated'
+            }), 500
             
         return jsonify({
             'success': True,
@@ -224,21 +622,99 @@ def update_preferences():
             'error': str(e)
         }), 500
 
+def run_extraction(job, plum_path):
+    """Job body: file new and changed Sticky Notes under DATA_DIR, reporting progress on the job"""
+    try:
+        return extract_notes_incremental(plum_path, DATA_DIR, workers=EXTRACT_WORKERS, progress=job.advance)
+    finally:
+        response_cache.clear()
+
 @app.route('/api/extract', methods=['POST'])
 def api_extract_data():
-    """Endpoint to trigger data extraction process"""
+    """Start a background extraction job and return its id immediately"""
     try:
-        from scripts.data_extractor import main as extract_main
-        extract_main()
+        plum_path = os.environ.get('PLUM_PATH') or default_plum_path()
+        if not os.path.exists(plum_path):
+            return jsonify({
+                'success': False,
+                'error': f'plum.sqlite not found at {plum_path}'
+            }), 404
+        job = job_queue.submit('extract', lambda job: run_extraction(job, plum_path),
+                               stages=EXTRACT_STAGES, rate_stage='written')
         return jsonify({
             'success': True,
-            'message': 'Data extraction completed successfully'
-        })
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
+    except JobConflict as e:
+        return jsonify({
+            'success': False,
+            'error': 'An extraction is already running',
+            'job_id': e.job.id,
+            'status_url': f'/api/jobs/{e.job.id}'
+        }), 409
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def run_clustering(job, min_size, limit):
+    """Job body: group the whole corpus into near-duplicate clusters, largest first"""
+    index = note_similarity.refresh(progress=job.advance)
+    clusters = index.clusters(min_size=min_size, progress=job.advance)
+    return {
+        'notes': len(index),
+        'threshold': index.threshold,
+        'clusters': len(clusters),
+        'clustered_notes': sum(len(ids) for ids in clusters),
+        'largest': [{'size': len(ids), 'note_ids': ids} for ids in clusters[:limit]]
+    }
+
+@app.route('/api/clusters', methods=['POST'])
+def api_cluster_notes():
+    """Start a background job clustering near-duplicate notes and return its id immediately"""
+    min_size = request.args.get('min_size', 2, type=int)
+    limit = request.args.get('limit', 50, type=int)
+    if min_size < 2 or limit < 1 or limit > API_MAX_LIMIT:
+        return jsonify({
+            'success': False,
+            'error': f'min_size must be >= 2 and limit between 1 and {API_MAX_LIMIT}'
+        }), 400
+    try:
+        job = job_queue.submit('cluster', lambda job: run_clustering(job, min_size, limit),
+                               stages=CLUSTER_STAGES, rate_stage='clustered')
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}'
+        }), 202
+    except JobConflict as e:
+        return jsonify({
+            'success': False,
+            'error': 'A clustering job is already running',
+            'job_id': e.job.id,
+            'status_url': f'/api/jobs/{e.job.id}'
+        }), 409
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """Report the status, per-stage progress and throughput of a background job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,222 @@
+"""
+End-to-end benchmark of the web endpoints and the extraction pipeline.
+
+For each corpus size a note store is filled with synthetic notes
+(benchmarks/corpus.py), requests are replayed through Flask's test client
+and the latency percentiles and throughput of each endpoint are reported.
+The app's response cache is off unless --response-cache-mb is given, so
+repeated requests time the queries rather than cache hits.
+clean_user_text and extract_notes are timed on a synthetic plum.sqlite of
+the same size. Results are saved as JSON; --compare prints the change in
+median latency and throughput against an earlier results file.
+
+    python -m benchmarks.bench_app [--sizes 1000,10000,100000,1000000]
+        [--backend sqlite|json] [--requests 200] [--response-cache-mb 0]
+        [--output bench_results.json]
+        [--compare previous.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+
+from benchmarks.corpus import SITES, EQUIPMENT, write_notes_db, write_notes_json, write_plum_sqlite
+
+SEARCH_TERMS = ['crind', 'ribbon cable', 'blown fuse', 'FP 10', 'water intrusion', 'no such words']
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(latencies, errors):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p90_ms': round(percentile(ordered, 90) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'mean_ms': round(total / len(ordered) * 1000, 3),
+        'per_second': round(len(ordered) / total, 1) if total else None,
+    }
+
+
+def time_requests(send, count, warmup=3):
+    """
+    Call send(i) count times after a warmup; returns the summary of the
+    timed calls. Warmup calls take the indexes after the timed ones, so a
+    case that adds notes never repeats one and hits the duplicate check.
+    """
+    for i in range(count, count + warmup):
+        send(i)
+    latencies = []
+    errors = 0
+    for i in range(count):
+        start = time.perf_counter()
+        response = send(i)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+    return summarize(latencies, errors)
+
+
+def endpoint_cases(client, size, rng):
+    """(name, send) pairs; POST /api/notes is last because it grows the corpus."""
+    offsets = [rng.randrange(max(1, min(size, 10000) - 50)) for _ in range(64)]
+    terms = [rng.choice(SEARCH_TERMS) for _ in range(64)]
+    sites = [rng.choice(SITES) for _ in range(64)]
+    return [
+        ('GET /', lambda i: client.get('/')),
+        ('POST / search', lambda i: client.post('/', data={'search': terms[i % 64], 'page': 1 + i % 3})),
+        ('POST / site+dates', lambda i: client.post('/', data={
+            'site_filter': sites[i % 64], 'date_filter': 'custom', 'date_from': '2024-01-08', 'date_to': '2024-01-14'})),
+        ('GET /api/notes page', lambda i: client.get(f'/api/notes?limit=50&offset={offsets[i % 64]}')),
+        ('GET /api/notes search', lambda i: client.get(
+            '/api/notes', query_string={'search': terms[i % 64], 'site': sites[i % 64], 'limit': 50})),
+        ('GET /api/facets', lambda i: client.get('/api/facets', query_string={'search': terms[i % 64], 'limit': 20})),
+        ('POST /api/notes', lambda i: client.post('/api/notes', json={
+            'site': sites[i % 64], 'equipment': rng.choice(EQUIPMENT),
+            'content': f"Benchmark note {i}: {terms[i % 64]}"})),
+    ]
+
+
+def build_store(app_module, backend, size, workdir, seed):
+    """Create a store holding size synthetic notes; returns it and the seconds taken."""
+    start = time.perf_counter()
+    if backend == 'json':
+        data_dir = os.path.join(workdir, f'json_{size}')
+        os.makedirs(data_dir)
+        write_notes_json(os.path.join(data_dir, 'notes.json'), size, seed)
+        store = app_module.NoteStore(data_dir, compact_interval=0)
+        store.get_notes()
+    else:
+        store = app_module.SqliteNoteStore(os.path.join(workdir, f'notes_{size}.db'))
+        write_notes_db(store, size, seed)
+    return store, time.perf_counter() - start
+
+
+def bench_pipeline(plum_path, workdir, size, workers):
+    """Time clean_user_text over every raw note and a full extract_notes run."""
+    # Imported here so app.py is first imported from the scratch directory
+    from extract_notes import clean_user_text, extract_notes
+
+    conn = sqlite3.connect(plum_path)
+    texts = [row[0] for row in conn.execute('SELECT Text FROM Note')]
+    conn.close()
+    size_mb = sum(len(text.encode('utf-8')) for text in texts) / 1e6
+    start = time.perf_counter()
+    for text in texts:
+        clean_user_text(text)
+    clean_seconds = time.perf_counter() - start
+
+    out_dir = os.path.join(workdir, f'extract_{size}')
+    start = time.perf_counter()
+    written = extract_notes(plum_path, out_dir, workers=workers)
+    extract_seconds = time.perf_counter() - start
+    shutil.rmtree(out_dir, ignore_errors=True)
+    return [
+        {'case': 'clean_user_text', 'notes': len(texts), 'seconds': round(clean_seconds, 3),
+         'per_second': round(len(texts) / clean_seconds, 1), 'mb_per_second': round(size_mb / clean_seconds, 2)},
+        {'case': 'extract_notes', 'notes': len(texts), 'written': written, 'workers': workers,
+         'seconds': round(extract_seconds, 3), 'per_second': round(len(texts) / extract_seconds, 1)},
+    ]
+
+
+def compare(results, previous_path):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {(r['backend'], r['size'], r['case']): r for r in json.load(f)['results']}
+    print(f"\nchange against {previous_path} (negative p50 is faster):")
+    for result in results:
+        old = previous.get((result['backend'], result['size'], result['case']))
+        if not old:
+            continue
+        parts = []
+        if 'p50_ms' in result and old.get('p50_ms'):
+            parts.append(f"p50 {result['p50_ms'] / old['p50_ms'] - 1:+.0%}")
+        if result.get('per_second') and old.get('per_second'):
+            parts.append(f"throughput {result['per_second'] / old['per_second'] - 1:+.0%}")
+        print(f"  {result['backend']:<7}{result['size']:>9}  {result['case']:<24}{', '.join(parts)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help='Comma-separated corpus sizes, e.g. 1000,10000,100000,1000000')
+    parser.add_argument('--backend', choices=('sqlite', 'json'), default='sqlite')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint and size')
+    parser.add_argument('--extract-max', type=int, default=100000,
+                        help='Skip the extraction pipeline for corpora larger than this')
+    parser.add_argument('--workers', type=int, default=1, help='extract_notes worker processes')
+    parser.add_argument('--response-cache-mb', type=float, default=0,
+                        help='Size of the app response cache; 0 times every request uncached')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    output = os.path.abspath(args.output)
+    previous = os.path.abspath(args.compare) if args.compare else None
+
+    # app.py reads its configuration and creates its files relative to the
+    # working directory on import, so import it inside a scratch directory.
+    workdir = tempfile.mkdtemp(prefix='bench_app_')
+    cwd = os.getcwd()
+    sys.path.insert(0, cwd)
+    os.chdir(workdir)
+    os.environ['NOTES_BACKEND'] = args.backend
+    os.environ['NOTES_DB'] = os.path.join(workdir, 'clean_notes.db')
+    os.environ['DATA_WATCHER'] = '0'
+    os.environ['RESPONSE_CACHE_MB'] = str(args.response_cache_mb)
+    results = []
+    try:
+        import app as app_module
+        app_module.app.logger.disabled = True
+        client = app_module.app.test_client()
+        for size in sizes:
+            rng = random.Random(args.seed)
+            store, load_seconds = build_store(app_module, args.backend, size, workdir, args.seed)
+            app_module.note_store = store
+            print(f"\n{args.backend} corpus of {size} notes ready in {load_seconds:.1f}s")
+            print(f"  {'case':<24}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'req/s':>9}{'errors':>8}")
+            for case, send in endpoint_cases(client, size, rng):
+                summary = time_requests(send, args.requests)
+                results.append(dict(backend=args.backend, size=size, case=case, **summary))
+                print(f"  {case:<24}{summary['p50_ms']:>9.2f}{summary['p90_ms']:>9.2f}"
+                      f"{summary['p99_ms']:>9.2f}{summary['per_second']:>9.1f}{summary['errors']:>8}")
+            if size <= args.extract_max:
+                plum_path = os.path.join(workdir, f'plum_{size}.sqlite')
+                write_plum_sqlite(plum_path, size, args.seed)
+                for result in bench_pipeline(plum_path, workdir, size, args.workers):
+                    results.append(dict(backend=args.backend, size=size, **result))
+                    print(f"  {result['case']:<24}{result['per_second']:>9.1f} notes/s")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'args': vars(args),
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+    if previous:
+        compare(results, previous)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Micro-benchmark for the shared note cleaning engine (scripts/cleaning.py).
+
+Compares throughput in MB/s against the per-line regex implementations it
+replaced and checks that both produce identical output on every sample.
+
+    python -m benchmarks.bench_cleaning [--notes 20000] [--repeat 5]
+"""
+import re
+import sys
+import time
+import random
+import argparse
+
+from scripts.cleaning import strip_code_lines, split_site_header, clean_html_text
+
+
+# --- Previous implementations, kept verbatim as the reference ---------------
+
+def legacy_strip_code_lines(plain_text):
+    plain_text = re.sub(r'\n+', '\n', plain_text).strip()
+    filtered_lines = []
+    for line in plain_text.splitlines():
+        if re.match(r'^\s*(//|#|/\*|\*\s)', line):
+            continue
+        filtered_lines.append(line)
+    return "\n".join(filtered_lines).strip()
+
+
+def legacy_split_site_header(user_text):
+    site_match = re.search(r'(?:Site(?:ID)?):\s*([^\n]+)', user_text, re.IGNORECASE)
+    site_folder = site_match.group(1).strip() if site_match else "Uncategorized"
+    user_text = re.sub(r'(?:Site(?:ID)?):\s*[^\n]+\n?', '', user_text, flags=re.IGNORECASE).strip()
+    return site_folder, user_text
+
+
+def legacy_clean_html_text(html_content):
+    clean_text = re.sub(r'<[^>]+>', '', html_content)
+    clean_text = clean_text.replace('&nbsp;', ' ')
+    clean_text = clean_text.replace('&lt;', '<')
+    clean_text = clean_text.replace('&gt;', '>')
+    clean_text = clean_text.replace('&amp;', '&')
+    clean_text = re.sub(r'\s+', ' ', clean_text)
+    return clean_text.strip()
+
+
+# --- Synthetic corpus ---------------------------------------------------------
+
+WORK_LINES = [
+    "Replaced the PPU in the premium position. Tested successfully.",
+    "Purged the CRIND to restore card reader functionality.",
+    "Fixed E-stop circuit by replacing a blown fuse.",
+    "9-10.5 RTT 20 miles",
+    "   indented follow-up",
+    "* bullet from a pasted list",
+    "*not a bullet",
+    "# heading pasted from markdown",
+    "// leftover code comment",
+    "/* block comment */",
+    "Site: 711 #36064 - King NC",
+    "SiteID: Great Stop 18",
+    "",
+    "",
+    "tab\tseparated\tvalues",
+    "line with form\x0cfeed",
+    "unicode line\u2028separator",
+]
+
+HTML_PIECES = [
+    "<p>", "</p>", "<br/>", "<div class=\"note\">", "</div>", "&nbsp;", "&lt;",
+    "&gt;", "&amp;", "&amp;lt;", "Replaced PPU", " card reader ", "\n", "\t",
+    "Fedex Ground 274", "<b>FP 5</b>", "  ",
+]
+
+
+def make_plain_notes(count, rng):
+    return ["\n".join(rng.choice(WORK_LINES) for _ in range(rng.randint(1, 12))) for _ in range(count)]
+
+
+def make_html_notes(count, rng):
+    return ["".join(rng.choice(HTML_PIECES) for _ in range(rng.randint(5, 60))) for _ in range(count)]
+
+
+def throughput(func, samples, repeat):
+    """Return the best MB/s over `repeat` passes through the samples."""
+    size_mb = sum(len(s.encode('utf-8')) for s in samples) / 1e6
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sample in samples:
+            func(sample)
+        best = min(best, time.perf_counter() - start)
+    return size_mb / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=20000, help='Number of synthetic notes per case')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing passes per implementation')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    plain = make_plain_notes(args.notes, rng)
+    html = make_html_notes(args.notes, rng)
+    cases = [
+        ('strip_code_lines', legacy_strip_code_lines, strip_code_lines, plain),
+        ('split_site_header', legacy_split_site_header, split_site_header, plain),
+        ('clean_html_text', legacy_clean_html_text, clean_html_text, html),
+    ]
+
+    failed = False
+    print(f"{'case':<20}{'legacy MB/s':>14}{'engine MB/s':>14}{'speedup':>10}")
+    for name, legacy, engine, samples in cases:
+        mismatches = sum(1 for s in samples if legacy(s) != engine(s))
+        if mismatches:
+            failed = True
+            print(f"{name}: {mismatches} outputs differ from the legacy implementation")
+            continue
+        old = throughput(legacy, samples, args.repeat)
+        new = throughput(engine, samples, args.repeat)
+        print(f"{name:<20}{old:>14.1f}{new:>14.1f}{new / old:>9.1f}x")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
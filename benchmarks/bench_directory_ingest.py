@@ -0,0 +1,148 @@
+"""
+Benchmark for streaming directory ingest (DataExtractor.iter_directory).
+
+Builds a tree of synthetic .md/.txt/.csv/.json note files, checks that
+iter_directory() returns the same data as the recursive listdir walk it
+replaced, then reports files/s for the old walk and for iter_directory with
+one and several parse processes, and the peak Python memory of the old
+nested-dict result versus consuming the stream.
+
+    python -m benchmarks.bench_directory_ingest [--files 50000] [--workers 1,2,4]
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+from scripts.data_extractor import DataExtractor, logger
+from benchmarks.corpus import iter_notes
+
+
+# --- Previous extract_from_directory, kept verbatim for timing ----------------
+
+def legacy_extract_from_directory(extractor, directory_path, recursive=True):
+    results = {}
+
+    try:
+        if not os.path.exists(directory_path) or not os.path.isdir(directory_path):
+            return results
+
+        for item in os.listdir(directory_path):
+            full_path = os.path.join(directory_path, item)
+
+            if os.path.isfile(full_path):
+                ext = os.path.splitext(item)[1].lower()
+                if ext in ['.json', '.txt', '.md', '.csv']:
+                    data = extractor.extract_from_file(full_path)
+                    if data is not None:
+                        results[item] = data
+
+            elif os.path.isdir(full_path) and recursive:
+                sub_results = legacy_extract_from_directory(extractor, full_path, recursive)
+                if sub_results:
+                    results[item] = sub_results
+
+    except Exception:
+        pass
+
+    return results
+
+
+# --- Synthetic tree -------------------------------------------------------------
+
+def render_file(ext, notes):
+    if ext == '.md':
+        return ''.join(f"## {n['site']} / {n['equipment']}\n{n['content']}\n\n" for n in notes)
+    if ext == '.txt':
+        return '\n\n'.join(n['content'] for n in notes)
+    if ext == '.csv':
+        rows = ['site,equipment,date,content']
+        rows += [f"\"{n['site']}\",{n['equipment']},{n['date']},\"{n['content'].splitlines()[-1]}\"" for n in notes]
+        return '\n'.join(rows) + '\n'
+    return '[' + ','.join(f'{{"site": "{n["site"]}", "date": "{n["date"]}"}}' for n in notes) + ']'
+
+
+def build_tree(root, count, seed):
+    rng = random.Random(seed)
+    notes = iter_notes(count * 4, seed)
+    for i in range(count):
+        folder = os.path.join(root, f"site_{i % 50:02d}", f"batch_{i // 1000:03d}")
+        os.makedirs(folder, exist_ok=True)
+        ext = rng.choice(('.md', '.md', '.txt', '.txt', '.csv', '.json'))
+        with open(os.path.join(folder, f"note_{i}{ext}"), 'w', encoding='utf-8') as f:
+            f.write(render_file(ext, [next(notes) for _ in range(4)]))
+
+
+def flatten(nested, prefix=''):
+    """Turn the nested legacy result into sorted (relative path, data) pairs."""
+    for name, value in sorted(nested.items()):
+        path = os.path.join(prefix, name) if prefix else name
+        if os.path.splitext(name)[1] in ('.json', '.txt', '.md', '.csv'):
+            yield path, value
+        else:
+            yield from flatten(value, path)
+
+
+def without_timestamps(data):
+    if isinstance(data, dict):
+        return {k: without_timestamps(v) for k, v in data.items() if k != 'extracted_at'}
+    if isinstance(data, list):
+        return [without_timestamps(v) for v in data]
+    return data
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=50000, help='Number of files in the synthetic tree')
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}", help='Comma-separated parse process counts')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    logger.setLevel('ERROR')
+
+    root = tempfile.mkdtemp(prefix='bench_ingest_')
+    try:
+        build_tree(root, args.files, args.seed)
+        extractor = DataExtractor()
+
+        legacy, legacy_seconds = timed(lambda: legacy_extract_from_directory(extractor, root))
+        expected = [(path, without_timestamps(data)) for path, data in flatten(legacy)]
+        streamed = [(path, without_timestamps(data)) for path, data in extractor.iter_directory(root, parse_workers=1)]
+        if streamed != expected:
+            print("iter_directory() output differs from the legacy walk")
+            sys.exit(1)
+
+        print(f"{args.files} files, {os.cpu_count()} cores")
+        print(f"{'implementation':<28}{'files/s':>10}{'speedup':>10}")
+        print(f"{'legacy listdir walk':<28}{args.files / legacy_seconds:>10.0f}{1:>9.1f}x")
+        for workers in sorted({int(w) for w in args.workers.split(',')}):
+            count, seconds = timed(lambda: sum(1 for _ in extractor.iter_directory(root, parse_workers=workers)))
+            name = f"iter_directory, {workers} proc"
+            print(f"{name:<28}{count / seconds:>10.0f}{legacy_seconds / seconds:>9.1f}x")
+
+        legacy_peak = peak_memory(lambda: legacy_extract_from_directory(extractor, root))
+        stream_peak = peak_memory(lambda: sum(1 for _ in extractor.iter_directory(root, parse_workers=1)))
+        print(f"peak memory: nested dict {legacy_peak / 1e6:.1f} MB, streamed {stream_peak / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Memory benchmark for the columnar note table (scripts/note_table.py).
+
+Loads a synthetic notes.json the way NoteStore does and reports the memory
+retained per 100k notes as the list of dicts json.load returns and as a
+NoteTable, after checking that the table gives back identical notes.
+
+    python -m benchmarks.bench_note_table [--notes 100000]
+"""
+import gc
+import sys
+import json
+import argparse
+import tracemalloc
+
+from scripts.note_table import NoteTable
+from benchmarks.corpus import iter_notes
+
+
+def make_notes_json(count, seed):
+    return json.dumps(list(iter_notes(count, seed)), indent=4)
+
+
+def retained(build, text):
+    """Return (object, bytes still allocated once build(text) has returned)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(text)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100000, help='Number of synthetic notes')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    text = make_notes_json(args.notes, args.seed)
+    notes, dict_bytes = retained(json.loads, text)
+    table, table_bytes = retained(lambda t: NoteTable(json.loads(t)), text)
+
+    if list(table) != notes:
+        print("NoteTable does not return the notes it was built from")
+        sys.exit(1)
+
+    scale = 100000 / args.notes
+    print(f"{'representation':<16}{'MB per 100k':>14}{'bytes/note':>12}")
+    for name, size in (('list of dicts', dict_bytes), ('NoteTable', table_bytes)):
+        print(f"{name:<16}{size * scale / 1e6:>14.1f}{size / args.notes:>12.0f}")
+    overhead = (dict_bytes - table_bytes) / args.notes
+    print(f"saved {overhead:.0f} bytes per note ({1 - table_bytes / dict_bytes:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Benchmark and parity check for the RTF-to-text engine (scripts/rtf.py).
+
+Checks that the engine matches striprtf on every fixture in
+benchmarks/fixtures/rtf and on randomly generated documents, then compares
+throughput in MB/s on multi-MB documents against the character loop
+DataExtractor used before and against striprtf.
+
+    python -m benchmarks.bench_rtf [--size-mb 4] [--random 2000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+from striprtf.striprtf import rtf_to_text as striprtf_to_text
+
+from scripts.rtf import rtf_to_text
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'rtf')
+
+
+# --- Previous DataExtractor implementation, kept verbatim for timing ----------
+
+def legacy_extract_text_from_rtf(rtf_content):
+    result = []
+    in_control = False
+    skip_next = False
+
+    for char in rtf_content:
+        if skip_next:
+            skip_next = False
+            continue
+
+        if char == '\\':
+            in_control = True
+            continue
+
+        if in_control:
+            if char.isalpha():
+                continue
+            else:
+                in_control = False
+
+        if not in_control and char != '{' and char != '}':
+            result.append(char)
+
+    return ''.join(result).strip()
+
+
+# --- Synthetic documents ------------------------------------------------------
+
+HEADER = (r"{\rtf1\ansi\ansicpg1252\deff0{\fonttbl{\f0\fnil\fcharset0 Segoe UI;}"
+          r"{\f1\fnil\fcharset204 Arial;}}{\colortbl ;\red0\green0\blue0;}"
+          r"{\*\generator Riched20 10.0.19041}\viewkind4\uc1 \pard\f0\fs22 ")
+
+# Pieces a random document is assembled from; all keep the braces balanced
+PIECES = [
+    "Replaced the PPU in the premium position. ", "Site: 711 #36064 - King NC\\par ",
+    "\\par ", "\\line ", "\\tab ", "{\\b bold text} ", "{\\i\\f1 \\'cf\\'f0\\'e8\\'e2\\'e5\\'f2} ",
+    "\\'e9t\\'e9 ", "\\u8364?", "\\u-3913?", "{\\uc2\\u8212\\'97\\'97} ", "\\{braces\\} ",
+    "\\\\server\\\\share ", "{\\*\\bkmkstart note}", "{\\pict\\wmetafile8 0123456789abcdef}",
+    "{\\field{\\*\\fldinst{HYPERLINK \"https://example.com\"}}{\\fldrslt{link}}} ",
+    "\\emdash ", "\\~", "\\-", "{\\info{\\author tech}{\\title note}}", "9-10.5 RTT 20 miles ",
+    "\r\n", "\\fs24 ", "\\cf1 ", "\\highlight2 ", "\\ulnone ",
+]
+
+
+def make_document(rng, pieces):
+    return HEADER + ''.join(rng.choice(PIECES) for _ in range(pieces)) + "\\par\r\n}\r\n"
+
+
+NOTE_LINES = [
+    "Site: 711 #36064 - King NC", "Replaced the PPU in the premium position. Tested successfully.",
+    "Purged the CRIND to restore card reader functionality.", "Fixed E-stop circuit by replacing a blown fuse.",
+    "9-10.5 RTT 20 miles", "Caf\\'e9 on the corner asked about the \\'93new\\'94 dispenser.",
+    "{\\b Follow up:} order a spare \\u8364? 40 keypad", "{\\pntext\\f1\\'B7\\tab}Checked the printer paper",
+]
+
+
+def make_picture(rng, size):
+    """An embedded picture the way WordPad stores it: hex digits in 128-character lines."""
+    data = ''.join(rng.choice('0123456789abcdef') for _ in range(4096))
+    hex_lines = '\r\n'.join(data[i:i + 128] for i in range(0, len(data), 128))
+    blob = (hex_lines + '\r\n') * max(1, size // (len(hex_lines) + 2))
+    return "{\\pict{\\*\\picprop}\\wmetafile8\\picw1000\\pich800\\picwgoal567\\pichgoal454 \r\n" + blob + "}"
+
+
+def make_large_document(rng, size_mb, picture_every=0):
+    """
+    A WordPad style note of about size_mb: formatted paragraphs, plus an
+    embedded picture of about 256 KB after every `picture_every` paragraphs.
+    """
+    body = []
+    size = 0
+    picture = make_picture(rng, 256 * 1024) if picture_every else None
+    while size < size_mb * 1e6:
+        piece = "\\pard\\sa200\\sl276\\slmult1\\f0\\fs22 " + rng.choice(NOTE_LINES) + "\\par\r\n"
+        if picture_every and rng.randrange(picture_every) == 0:
+            piece += picture + "\\par\r\n"
+        body.append(piece)
+        size += len(piece)
+    return HEADER + ''.join(body) + "\\par\r\n}\r\n"
+
+
+def make_control_heavy_document(rng, size_mb):
+    """Worst case: the random PIECES, with a control word every few characters."""
+    body = []
+    size = 0
+    while size < size_mb * 1e6:
+        piece = rng.choice(PIECES)
+        body.append(piece)
+        size += len(piece)
+    return HEADER + ''.join(body) + "\\par\r\n}\r\n"
+
+
+def throughput(func, text, repeat):
+    """Return the best MB/s over `repeat` conversions of text."""
+    size_mb = len(text.encode('utf-8')) / 1e6
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return size_mb / best
+
+
+def check_parity(name, text):
+    expected = striprtf_to_text(text, errors='replace')
+    actual = rtf_to_text(text, errors='replace')
+    if expected != actual:
+        print(f"{name}: output differs from striprtf")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=4, help='Size of the timed document')
+    parser.add_argument('--random', type=int, default=2000, help='Random documents checked against striprtf')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing passes per implementation')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failed = False
+
+    fixtures = sorted(os.listdir(FIXTURE_DIR))
+    for filename in fixtures:
+        with open(os.path.join(FIXTURE_DIR, filename), 'r', encoding='utf-8') as f:
+            failed |= not check_parity(filename, f.read())
+    for i in range(args.random):
+        failed |= not check_parity(f"random document {i}", make_document(rng, rng.randint(1, 200)))
+    print(f"parity: {len(fixtures)} fixtures, {args.random} random documents"
+          f" -> {'FAILED' if failed else 'ok'}")
+
+    documents = [
+        ('formatted text', make_large_document(rng, args.size_mb)),
+        ('with pictures', make_large_document(rng, args.size_mb, picture_every=50)),
+        ('control words', make_control_heavy_document(rng, args.size_mb)),
+    ]
+    print(f"\n{'document':<16}{'legacy MB/s':>13}{'striprtf MB/s':>15}{'engine MB/s':>13}"
+          f"{'vs legacy':>11}{'vs striprtf':>13}")
+    for name, document in documents:
+        failed |= not check_parity(name, document)
+        legacy = throughput(legacy_extract_text_from_rtf, document, args.repeat)
+        reference = throughput(striprtf_to_text, document, args.repeat)
+        engine = throughput(rtf_to_text, document, args.repeat)
+        print(f"{name:<16}{legacy:>13.1f}{reference:>15.1f}{engine:>13.1f}"
+              f"{engine / legacy:>10.1f}x{engine / reference:>12.1f}x")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark for note segmentation in text files (identify_notes_in_text).
+
+Checks that the single-pass segmentation returns the same notes as the
+header/bullet/paragraph scans it replaced, first on many small fuzzed
+documents built from awkward fragments and then on multi-MB markdown, list
+and paragraph inputs, and reports MB/s for both.
+
+    python -m benchmarks.bench_segmentation [--mb 4] [--fuzz 20000] [--repeat 3]
+"""
+import re
+import sys
+import time
+import random
+import datetime
+import argparse
+
+from scripts.data_extractor import identify_notes_in_text
+from benchmarks.corpus import iter_notes
+
+
+# --- Previous implementation, kept verbatim as the reference ------------------
+
+def legacy_identify_notes_in_text(content):
+    notes = []
+
+    # Look for markdown headers as potential note titles
+    header_pattern = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
+    headers = header_pattern.finditer(content)
+
+    for match in headers:
+        level = len(match.group(1))
+        title = match.group(2).strip()
+
+        # Find content until next header or end of text
+        start_pos = match.end()
+        next_header = header_pattern.search(content, start_pos)
+        end_pos = next_header.start() if next_header else len(content)
+
+        note_content = content[start_pos:end_pos].strip()
+
+        notes.append({
+            'title': title,
+            'level': level,
+            'content': note_content,
+            'extracted_at': datetime.datetime.now().isoformat()
+        })
+
+    # If no headers found, try to identify by bullet points or numbered lists
+    if not notes and ('\n- ' in content or re.search(r'\n\d+\. ', content)):
+        bullet_pattern = re.compile(r'(?:^|\n)(?:- |\d+\. )(.+)(?:\n|$)')
+        bullets = bullet_pattern.finditer(content)
+
+        for i, match in enumerate(bullets):
+            bullet_content = match.group(1).strip()
+            notes.append({
+                'title': f"Note {i+1}",
+                'content': bullet_content,
+                'extracted_at': datetime.datetime.now().isoformat()
+            })
+
+    # Look for sticky note style text blocks (paragraphs separated by multiple newlines)
+    if not notes:
+        # Split by multiple newlines (common in copied sticky notes)
+        sticky_blocks = re.split(r'\n{2,}', content)
+        if len(sticky_blocks) > 1:
+            for i, block in enumerate(sticky_blocks):
+                if block.strip():  # Skip empty blocks
+                    title = block.split('\n')[0].strip() if block.strip() else f"Sticky Note {i+1}"
+                    notes.append({
+                        'title': title[:50] + ('...' if len(title) > 50 else ''),
+                        'content': block.strip(),
+                        'source': 'text_extraction',
+                        'extracted_at': datetime.datetime.now().isoformat()
+                    })
+
+    return notes
+
+
+# --- Inputs --------------------------------------------------------------------
+
+# Fragments chosen to hit the edge cases of the three patterns: headers whose
+# whitespace runs onto the next line, 7+ hashes, consecutive list items,
+# list markers without text, \r and other non-newline whitespace, and runs
+# of blank lines at either end.
+FRAGMENTS = [
+    "\n", "\n", "\n", "\n\n", "#", "##", "#######", "# ", "#\t", " ", "\t", "\r", "\x0c",
+    "- ", "-", "1. ", "12. ", "1.", "Replaced PPU", "card reader", "x" * 60, " ",
+    " ", "# Site 18\n", "- item\n", "3. step\n",
+]
+
+
+def fuzz_documents(count, rng):
+    for _ in range(count):
+        yield ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 24)))
+
+
+def large_inputs(megabytes, seed):
+    """(name, text) pairs of roughly `megabytes` MB in each shape extract_from_file sees."""
+    target = int(megabytes * 1e6)
+
+    def build(render):
+        parts, size = [], 0
+        for note in iter_notes(10 ** 9, seed):
+            part = render(note)
+            parts.append(part)
+            size += len(part)
+            if size >= target:
+                return ''.join(parts)
+
+    return [
+        ('markdown headers', build(lambda n: f"## {n['site']} / {n['equipment']}\n{n['content']}\n\n")),
+        ('bullet list', 'Tasks\n' + build(lambda n: f"- {n['content'].splitlines()[-1]}\n")),
+        ('numbered list', 'Steps\n' + build(lambda n: f"{len(n['site'])}. {n['content'].splitlines()[-1]}\n\n")),
+        ('paragraphs', build(lambda n: f"{n['content']}\n\n\n")),
+        ('no structure', build(lambda n: f"{n['content']}\n")),
+    ]
+
+
+def without_timestamps(notes):
+    return [{k: v for k, v in note.items() if k != 'extracted_at'} for note in notes]
+
+
+def best_time(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mb', type=float, default=4, help='Approximate size of each large input')
+    parser.add_argument('--fuzz', type=int, default=20000, help='Number of small fuzzed documents')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing passes per implementation')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mismatches = [doc for doc in fuzz_documents(args.fuzz, rng)
+                  if without_timestamps(identify_notes_in_text(doc)) != without_timestamps(legacy_identify_notes_in_text(doc))]
+    if mismatches:
+        print(f"{len(mismatches)} of {args.fuzz} fuzzed documents differ, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+    print(f"{args.fuzz} fuzzed documents identical")
+
+    failed = False
+    print(f"{'input':<18}{'MB':>6}{'notes':>9}{'legacy MB/s':>14}{'engine MB/s':>14}{'speedup':>10}")
+    for name, text in large_inputs(args.mb, args.seed):
+        notes = identify_notes_in_text(text)
+        if without_timestamps(notes) != without_timestamps(legacy_identify_notes_in_text(text)):
+            failed = True
+            print(f"{name}: notes differ from the legacy implementation")
+            continue
+        size_mb = len(text.encode('utf-8')) / 1e6
+        old = size_mb / best_time(legacy_identify_notes_in_text, text, args.repeat)
+        new = size_mb / best_time(identify_notes_in_text, text, args.repeat)
+        print(f"{name:<18}{size_mb:>6.1f}{len(notes):>9}{old:>14.1f}{new:>14.1f}{new / old:>9.1f}x")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
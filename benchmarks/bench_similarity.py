@@ -0,0 +1,169 @@
+"""
+Benchmark for near-duplicate detection (scripts.similarity.SimilarityIndex).
+
+Builds a corpus of synthetic notes in which technicians re-type the same
+work items with typos, casing, extra remarks and reordering, indexes it and
+reports notes/s for building the MinHash/LSH index, the latency of
+similar() and the time of a full clusters() pass, with peak memory.
+
+On a sample of the first notes it also compares every pair of notes by
+the exact Jaccard similarity of their shingles, the O(N^2) approach the
+index avoids, to report the recall and precision of similar() and the time the
+pairwise pass would take on the full corpus. Signatures only estimate the
+similarity, so pairs near the threshold fall either side of it; the run
+fails unless similar() finds 99% of the pairs clearly above the threshold
+and 99% of what it finds is at most a little below it.
+
+    python -m benchmarks.bench_similarity [--notes 100000] [--exact 2000]
+"""
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+import statistics
+
+from scripts.similarity import SimilarityIndex, shingle_hashes, DEFAULT_THRESHOLD
+from benchmarks.corpus import iter_notes, WORK_ITEMS
+
+REMARKS = [
+    "Customer reported the issue again this morning.",
+    "Will return with parts.",
+    "Manager on duty signed off.",
+    "No further action needed.",
+    "Left a voicemail for the site contact.",
+]
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def retype(text, rng):
+    """Return text as a technician might re-type it: typos, case and spacing changes."""
+    chars = list(text)
+    for _ in range(rng.randint(0, 3)):
+        i = rng.randrange(len(chars))
+        edit = rng.random()
+        if edit < 0.4:
+            chars[i] = rng.choice(LETTERS)
+        elif edit < 0.7:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice(LETTERS + ' '))
+    text = ''.join(chars)
+    if rng.random() < 0.2:
+        text = text.lower()
+    if rng.random() < 0.2:
+        text = text.replace(' ', '  ', 1)
+    return text
+
+
+def build_corpus(count, seed):
+    """Notes from benchmarks.corpus with varied wording, plus some unrelated free text."""
+    rng = random.Random(seed)
+    texts = []
+    for note in iter_notes(count, seed):
+        if rng.random() < 0.1:
+            words = [rng.choice(item.split()) for item in rng.choices(WORK_ITEMS + REMARKS, k=12)]
+            texts.append(' '.join(words) + f" ticket {rng.randrange(10 ** 6)}")
+            continue
+        lines = note['content'].split('\n')
+        header, items = lines[0], [line for line in lines[2:] if line]
+        if rng.random() < 0.3:
+            rng.shuffle(items)
+        if rng.random() < 0.6:
+            items = [retype(item, rng) for item in items]
+        if rng.random() < 0.3:
+            items.append(rng.choice(REMARKS))
+        texts.append(header + '\n\n' + '\n'.join(items))
+    return texts
+
+
+def build_index(texts):
+    index = SimilarityIndex()
+    for note_id, text in enumerate(texts):
+        index.add(note_id, text)
+    return index
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def exact_similarities(texts, floor):
+    """Return {(i, j): Jaccard similarity} for the pairs i < j of texts at or above floor."""
+    shingles = [shingle_hashes(text) for text in texts]
+    pairs = {}
+    for i, a in enumerate(shingles):
+        for j in range(i + 1, len(shingles)):
+            b = shingles[j]
+            common = len(a & b)
+            if common and common >= floor * (len(a) + len(b) - common):
+                pairs[i, j] = common / (len(a) + len(b) - common)
+    return pairs
+
+
+def share(part, whole):
+    return len(part & whole) / len(whole) if whole else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100000, help='Notes in the synthetic corpus')
+    parser.add_argument('--exact', type=int, default=2000, help='Sample size for the exact pairwise comparison')
+    parser.add_argument('--queries', type=int, default=2000, help='similar() calls to time')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    texts = build_corpus(args.notes, args.seed)
+    index, seconds = timed(lambda: build_index(texts))
+    print(f"{args.notes} notes, {index.groups()} distinct signatures")
+    print(f"build: {args.notes / seconds:.0f} notes/s ({seconds:.2f} s), "
+          f"peak {peak_memory(lambda: build_index(texts)) / 1e6:.0f} MB")
+
+    rng = random.Random(args.seed)
+    latencies = []
+    for note_id in rng.sample(range(args.notes), min(args.queries, args.notes)):
+        _, seconds = timed(lambda: index.similar(note_id, threshold=args.threshold))
+        latencies.append(seconds * 1000)
+    latencies.sort()
+    print(f"similar(): p50 {statistics.median(latencies):.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+
+    clusters, seconds = timed(lambda: index.clusters(args.threshold))
+    print(f"clusters(): {seconds:.2f} s, {len(clusters)} clusters of 2+ holding "
+          f"{sum(map(len, clusters))} notes, largest {len(clusters[0]) if clusters else 0}")
+
+    sample = texts[:args.exact]
+    margin = 0.1
+    exact, seconds = timed(lambda: exact_similarities(sample, args.threshold - margin))
+    pair_count = len(sample) * (len(sample) - 1) / 2
+    estimate = seconds * (args.notes * (args.notes - 1) / 2) / pair_count
+    above = {pair for pair, value in exact.items() if value >= args.threshold}
+    clearly_above = {pair for pair, value in exact.items() if value >= args.threshold + margin}
+    # Queried on the full index, as in use; matches outside the sample are ignored
+    found = set()
+    for note_id in range(len(sample)):
+        for other, _ in index.similar(note_id, limit=args.notes, threshold=args.threshold):
+            if other < len(sample):
+                found.add((min(note_id, other), max(note_id, other)))
+    print(f"exact pairwise on {len(sample)} notes: {seconds:.1f} s, "
+          f"~{estimate / 3600:.1f} h for {args.notes}; {len(above)} pairs >= {args.threshold}")
+    print(f"similar() on the sample: recall {share(found, above):.3f} "
+          f"({share(found, clearly_above):.3f} of pairs >= {args.threshold + margin:.1f}), "
+          f"precision {share(above, found):.3f} "
+          f"({share(set(exact), found):.3f} of pairs >= {args.threshold - margin:.1f})")
+    sys.exit(0 if share(found, clearly_above) >= 0.99 and share(set(exact), found) >= 0.99 else 1)
+
+
+if __name__ == '__main__':
+    main()
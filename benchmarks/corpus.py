@@ -0,0 +1,110 @@
+"""
+Reproducible synthetic corpora for the benchmarks.
+
+Notes use the site, equipment and work-item vocabulary imported from
+scripts/import_sample_data.py and are fully determined by their count and
+seed. The same notes can be written as a notes.json snapshot, loaded into
+a SQLite notes database, or wrapped as raw Sticky Notes texts in a
+synthetic plum.sqlite for the extraction pipeline.
+
+    python -m benchmarks.corpus --notes 10000 --out bench_corpus
+"""
+import os
+import json
+import uuid
+import random
+import sqlite3
+import argparse
+import itertools
+from datetime import datetime, timedelta
+
+from scripts.fingerprints import note_fingerprint
+from scripts.import_sample_data import SITES, EQUIPMENT, WORK_ITEMS
+
+# Lines the cleaning step is expected to drop from raw notes
+CODE_LINES = ["// TODO follow up", "# pasted heading", "/* ticket template */"]
+START_DATE = datetime(2024, 1, 1)
+
+
+def iter_notes(count, seed=1):
+    """Yield count notes with site, equipment, content and date, oldest first."""
+    rng = random.Random(seed)
+    for i in range(count):
+        equipment = rng.choice(EQUIPMENT)
+        content = f"Work performed on {equipment}:\n\n"
+        content += "\n".join(f"• {item}" for item in rng.sample(WORK_ITEMS, rng.randint(1, 3)))
+        date = START_DATE + timedelta(seconds=i * 600 + rng.randint(0, 599))
+        yield {
+            "site": rng.choice(SITES),
+            "equipment": equipment,
+            "content": content,
+            "date": date.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+def raw_note_text(note, rng):
+    """Render a note as RTF the way Sticky Notes stores it, sometimes with a stray code line."""
+    lines = [f"Site: {note['site']}"] + note['content'].split('\n')
+    if rng.random() < 0.3:
+        lines.insert(rng.randint(1, len(lines)), rng.choice(CODE_LINES))
+    escaped = [line.replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}') for line in lines]
+    if rng.random() < 0.5:
+        escaped[0] = '\\b ' + escaped[0] + '\\b0 '
+    return '{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Segoe UI;}}\\f0\\fs22 ' + '\\par\n'.join(escaped) + '\\par\n}'
+
+
+
+def write_notes_json(path, count, seed=1):
+    """Write count notes as a notes.json snapshot."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(list(iter_notes(count, seed)), f, indent=4)
+
+
+def write_notes_db(store, count, seed=1, batch_size=10000):
+    """
+    Bulk-load count notes into an empty SqliteNoteStore. import_notes()
+    checks every note for an existing copy, which is needlessly slow for a
+    generated corpus, so rows are inserted directly, with the content_hash
+    the store's duplicate checks look up.
+    """
+    conn = store._connect()
+    rows = ((n['site'], n['equipment'], n['content'], n['date'], note_fingerprint(n['site'], n['content']))
+            for n in iter_notes(count, seed))
+    with conn:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany('INSERT INTO notes (site, equipment, content, date, content_hash) '
+                             'VALUES (?, ?, ?, ?, ?)', batch)
+
+
+def write_plum_sqlite(path, count, seed=1):
+    """Create a plum.sqlite whose Note table holds count raw note texts."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('CREATE TABLE Note(Text, Id, UpdatedAt, WindowPosition, Theme, CreatedAt)')
+        rows = ((raw_note_text(note, rng), str(uuid.UUID(int=rng.getrandbits(128))), i, None, 'Yellow', i)
+                for i, note in enumerate(iter_notes(count, seed)))
+        conn.executemany('INSERT INTO Note VALUES (?, ?, ?, ?, ?, ?)', rows)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=10000, help='Number of notes')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='bench_corpus', help='Directory for notes.json and plum.sqlite')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    write_notes_json(os.path.join(args.out, 'notes.json'), args.notes, args.seed)
+    write_plum_sqlite(os.path.join(args.out, 'plum.sqlite'), args.notes, args.seed)
+    print(f"Wrote {args.notes} notes to {args.out}/notes.json and {args.out}/plum.sqlite")
+
+
+if __name__ == '__main__':
+    main()
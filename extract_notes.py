@@ -1,60 +1,337 @@
 import os
 import sqlite3
-import re
+import getpass
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from striprtf.striprtf import rtf_to_text
+from scripts.checkpoint import ExtractionCheckpoint, content_fingerprint
+from scripts.cleaning import strip_code_lines, split_site_header
+from scripts.fingerprints import FingerprintIndex, note_fingerprint, NOTE_FILE_PATTERN
 
-# ...existing code for obtaining plum.sqlite path...
-username = os.getlogin()
-plum_path = f'C:\\Users\\{username}\\AppData\\Local\\Packages\\Microsoft.MicrosoftStickyNotes_8wekyb3d8bbwe\\LocalState\\plum.sqlite'
-if not os.path.exists(plum_path):
-    print(f"Error: plum.sqlite not found at {plum_path}")
-    exit(1)
+DEFAULT_BATCH_SIZE = 500
+CHECKPOINT_NAME = '.extract_checkpoint.json'
+FINGERPRINT_INDEX_NAME = '.note_fingerprints.json'
 
-# Connect and extract notes from the Sticky Notes DB
-conn_plum = sqlite3.connect(plum_path)
-cursor_plum = conn_plum.cursor()
-cursor_plum.execute("SELECT Text FROM Note")
-notes = cursor_plum.fetchall()
-conn_plum.close()
 
-# Ensure output folder exists
-data_dir = os.path.join(os.getcwd(), "data")
-os.makedirs(data_dir, exist_ok=True)
+def default_plum_path():
+    # ...existing code for obtaining plum.sqlite path...
+    # os.getlogin() fails without a controlling terminal (services, cron)
+    username = getpass.getuser()
+    return f'C:\\Users\\{username}\\AppData\\Local\\Packages\\Microsoft.MicrosoftStickyNotes_8wekyb3d8bbwe\\LocalState\\plum.sqlite'
 
-note_counter = {}
 
 def clean_user_text(raw_text):
-    # Remove RTF formatting
-    plain_text = rtf_to_text(raw_text)
-    # Remove extra whitespace and line breaks
-    plain_text = re.sub(r'\n+', '\n', plain_text).strip()
-    # Remove potential code blocks (lines starting with typical code markers)
-    filtered_lines = []
-    for line in plain_text.splitlines():
-        # Discard lines that start with common code markers
-        if re.match(r'^\s*(//|#|/\*|\*\s)', line):
-            continue
-        filtered_lines.append(line)
-    return "\n".join(filtered_lines).strip()
+    # Remove RTF formatting, collapse line breaks and drop code-like lines
+    return strip_code_lines(rtf_to_text(raw_text))
+
 
-for note in notes:
-    user_text = clean_user_text(note[0])
+def prepare_note(raw_text):
+    """Clean one raw note and split off its site. Returns (site_folder, text) or None if empty."""
+    user_text = clean_user_text(raw_text)
     if not user_text:
-        continue
-    # Look for a "Site:" or "SiteID:" field in the note text
-    site_match = re.search(r'(?:Site(?:ID)?):\s*([^\n]+)', user_text, re.IGNORECASE)
-    site_folder = site_match.group(1).strip() if site_match else "Uncategorized"
-    # Remove the site header from the note text so only user-entered data remains
-    user_text = re.sub(r'(?:Site(?:ID)?):\s*[^\n]+\n?', '', user_text, flags=re.IGNORECASE).strip()
-    # Create folder per site
-    site_dir = os.path.join(data_dir, site_folder)
-    os.makedirs(site_dir, exist_ok=True)
-    # Generate unique filename for the note within the site folder
-    note_counter.setdefault(site_folder, 0)
-    note_counter[site_folder] += 1
-    filename = f"note_{note_counter[site_folder]}.txt"
-    filepath = os.path.join(site_dir, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(user_text)
-
-print("Notes extracted, cleaned, and filed by site successfully.")
+        return None
+    # Take the site from a "Site:" or "SiteID:" header and remove the header
+    # so only user-entered data remains
+    return split_site_header(user_text)
+
+
+def prepare_batch(raw_texts):
+    """Worker entry point: prepare a batch of raw notes in one round trip."""
+    return [prepare_note(raw_text) for raw_text in raw_texts]
+
+
+def iter_batches(cursor, batch_size):
+    """Stream raw note texts from the cursor in lists of batch_size."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield [row[0] for row in rows]
+
+
+def iter_prepared_batches(batches, workers):
+    """
+    Yield prepared batches in input order. With more than one worker the
+    cleaning runs in a process pool, keeping a bounded number of batches in
+    flight so memory stays flat however large the database is.
+    """
+    if workers <= 1:
+        for batch in batches:
+            yield prepare_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(prepare_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def count_progress(batches, progress, stage):
+    """Pass batches through, reporting each batch's size to progress(stage, count)."""
+    for batch in batches:
+        progress(stage, len(batch))
+        yield batch
+
+
+class NoteWriter:
+    """
+    Files prepared notes as note_N.txt under one folder per site.
+
+    A persistent fingerprint index of the filed notes is kept in the data
+    folder. A note whose normalized text is already filed for its site, or
+    that has no text at all, is skipped, so re-running an extraction never
+    adds copies. New notes are numbered after the highest file already
+    filed for their site.
+
+    Without a checkpoint files are only ever added: a note whose text was
+    edited gets a new file and the file of its old text stays.
+
+    With a checkpoint, each note keeps the file it was given on an earlier
+    run unless its site changed. A duplicate note is recorded as holding
+    the file already filed for its text, and a file is only deleted once
+    no note holds it any more.
+    """
+
+    def __init__(self, data_dir, checkpoint=None):
+        self.data_dir = data_dir
+        self.checkpoint = checkpoint
+        self.index = FingerprintIndex(os.path.join(data_dir, FINGERPRINT_INDEX_NAME), data_dir)
+        self.note_counter = {}
+        self.skipped = 0
+        self._created_dirs = set()
+        filed = list(self.index.paths())
+        if checkpoint is not None:
+            filed += [entry['file'] for entry in checkpoint.entries.values() if entry.get('file')]
+            if not self.index.tracks_holders:
+                self._register_holders()
+        for relpath in filed:
+            site_folder, filename = os.path.split(relpath)
+            number = int(NOTE_FILE_PATTERN.match(filename).group(1))
+            self.note_counter[site_folder] = max(self.note_counter.get(site_folder, 0), number)
+
+    def _register_holders(self):
+        # The index predates holder tracking: notes with a file hold it, and
+        # notes skipped as duplicates are re-processed to find their file
+        for note_id, entry in self.checkpoint.entries.items():
+            fingerprint = self.index.fingerprint_of(entry.get('file'))
+            if fingerprint is not None:
+                self.index.add_holder(fingerprint, note_id)
+            elif entry.get('site'):
+                entry['hash'] = None
+
+    def _new_filepath(self, site_folder):
+        # Create folder per site
+        site_dir = os.path.join(self.data_dir, site_folder)
+        if site_dir not in self._created_dirs:
+            os.makedirs(site_dir, exist_ok=True)
+            self._created_dirs.add(site_dir)
+        # Generate unique filename for the note within the site folder
+        self.note_counter.setdefault(site_folder, 0)
+        self.note_counter[site_folder] += 1
+        filename = f"note_{self.note_counter[site_folder]}.txt"
+        return os.path.join(site_dir, filename)
+
+    def remove_file(self, relpath):
+        """Delete a previously written note file, if it still exists."""
+        self.index.discard_path(relpath)
+        try:
+            os.remove(os.path.join(self.data_dir, relpath))
+        except FileNotFoundError:
+            pass
+
+    def release_file(self, relpath, note_id, keep=False):
+        """
+        Drop note_id from the notes holding a written file. Once no note holds
+        it the file is deleted, unless keep is set, and True is returned.
+        """
+        if not self.index.release(relpath, note_id):
+            return False
+        if not keep:
+            self.remove_file(relpath)
+        return True
+
+    def write_batch(self, prepared, note_ids=None, fingerprints=None):
+        """
+        Write one batch of (site_folder, text) results, skipping empty and
+        duplicate notes. Returns how many files were written. note_ids and
+        fingerprints are required when writing with a checkpoint.
+        """
+        written = 0
+        for i, result in enumerate(prepared):
+            site_folder, user_text = result or (None, None)
+            fingerprint = note_fingerprint(site_folder, user_text)
+            filed_as = self.index.get(fingerprint)
+            note_id = old_file = reused = None
+            if self.checkpoint is not None:
+                note_id = note_ids[i]
+                old_file = (self.checkpoint.get(note_id) or {}).get('file')
+                if old_file and old_file != filed_as:
+                    # The note's text or site changed: overwrite its file if
+                    # no duplicate still holds it and the new text is not
+                    # filed elsewhere, otherwise leave it to the duplicates
+                    reusable = filed_as is None and os.path.dirname(old_file) == site_folder
+                    if self.release_file(old_file, note_id, keep=reusable) and reusable:
+                        reused = old_file
+                    old_file = None
+
+            if fingerprint is None or (filed_as and filed_as != old_file):
+                # Nothing left after cleaning, or another note already holds this text
+                if result is not None:
+                    self.skipped += 1
+                if fingerprint is not None and note_id is not None:
+                    self.index.add_holder(fingerprint, note_id)
+                if self.checkpoint is not None:
+                    self.checkpoint.record(note_id, fingerprints[i], site=site_folder, file=filed_as)
+                continue
+
+            relpath = old_file or reused
+            if relpath:
+                filepath = os.path.join(self.data_dir, relpath)
+            else:
+                filepath = self._new_filepath(site_folder)
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(user_text)
+            relpath = os.path.relpath(filepath, self.data_dir)
+            self.index.add(fingerprint, relpath, note_id)
+            written += 1
+            if self.checkpoint is not None:
+                self.checkpoint.record(note_id, fingerprints[i], site=site_folder, file=relpath)
+        return written
+
+
+def extract_notes(plum_path, data_dir, workers=1, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Extract, clean and file every note in plum.sqlite. Output is identical
+    for any number of workers because batches are written in row order.
+    progress, if given, is called as progress(stage, count) for the
+    "read", "cleaned" and "written" stages.
+
+    Files are only added, never replaced or removed: the text a note had
+    before an edit, or a deleted note, keeps its file. Use
+    extract_notes_incremental() to keep the files in line with plum.sqlite.
+    """
+    # Ensure output folder exists
+    os.makedirs(data_dir, exist_ok=True)
+    writer = NoteWriter(data_dir)
+
+    # Connect and extract notes from the Sticky Notes DB
+    conn_plum = sqlite3.connect(plum_path)
+    try:
+        cursor_plum = conn_plum.cursor()
+        cursor_plum.execute("SELECT Text FROM Note")
+        batches = iter_batches(cursor_plum, batch_size)
+        if progress:
+            batches = count_progress(batches, progress, 'read')
+        for prepared in iter_prepared_batches(batches, workers):
+            written = writer.write_batch(prepared)
+            if progress:
+                progress('cleaned', len(prepared))
+                progress('written', written)
+    finally:
+        conn_plum.close()
+        writer.index.save()
+    return writer.note_counter
+
+
+def iter_changed_batches(cursor, checkpoint, seen_ids, batch_size):
+    """
+    Stream (ids, fingerprints, texts) batches holding only the notes that are
+    new or modified since the checkpoint; every id read is added to seen_ids.
+    """
+    batch = ([], [], [])
+    for note_id, text in cursor:
+        seen_ids.add(note_id)
+        fingerprint = content_fingerprint(text)
+        if not checkpoint.is_changed(note_id, fingerprint):
+            continue
+        batch[0].append(note_id)
+        batch[1].append(fingerprint)
+        batch[2].append(text)
+        if len(batch[0]) >= batch_size:
+            yield batch
+            batch = ([], [], [])
+    if batch[0]:
+        yield batch
+
+
+def extract_notes_incremental(plum_path, data_dir, workers=1, batch_size=DEFAULT_BATCH_SIZE,
+                              checkpoint_path=None, progress=None):
+    """
+    Re-process only notes whose Id is new or whose text changed since the last
+    incremental run, and delete the files of notes removed from plum.sqlite.
+    Returns counts of changed and removed notes. progress is reported as in
+    extract_notes(), counting only the new or changed notes.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    checkpoint = ExtractionCheckpoint(checkpoint_path or os.path.join(data_dir, CHECKPOINT_NAME))
+    writer = NoteWriter(data_dir, checkpoint)
+    seen_ids = set()
+    changed = 0
+
+    try:
+        conn_plum = sqlite3.connect(plum_path)
+        try:
+            cursor_plum = conn_plum.cursor()
+            cursor_plum.execute("SELECT Id, Text FROM Note")
+            batches = iter_changed_batches(cursor_plum, checkpoint, seen_ids, batch_size)
+            # Keep ids and fingerprints beside the texts sent to the workers
+            pending = deque()
+            def texts():
+                for note_ids, fingerprints, raw_texts in batches:
+                    pending.append((note_ids, fingerprints))
+                    if progress:
+                        progress('read', len(raw_texts))
+                    yield raw_texts
+            for prepared in iter_prepared_batches(texts(), workers):
+                note_ids, fingerprints = pending.popleft()
+                written = writer.write_batch(prepared, note_ids, fingerprints)
+                changed += len(note_ids)
+                if progress:
+                    progress('cleaned', len(prepared))
+                    progress('written', written)
+        finally:
+            conn_plum.close()
+
+        removed = checkpoint.missing(seen_ids)
+        for note_id in removed:
+            entry = checkpoint.discard(note_id)
+            if entry.get('file'):
+                writer.release_file(entry['file'], note_id)
+        checkpoint.save()
+    finally:
+        # Files written before a failure stay indexed, as in extract_notes()
+        writer.index.save()
+    return {'changed': changed, 'removed': len(removed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract, clean and file Windows Sticky Notes by site')
+    parser.add_argument('--plum', help='Path to plum.sqlite (defaults to the current user\'s Sticky Notes database)')
+    parser.add_argument('--data-dir', default=os.path.join(os.getcwd(), "data"), help='Output folder')
+    parser.add_argument('--workers', type=int, default=1, help='Number of cleaning processes')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Notes read from the database per batch')
+    parser.add_argument('--incremental', action='store_true', help='Only process notes added or changed since the last incremental run, '
+                        'and replace or remove the files of edited and deleted notes')
+    parser.add_argument('--checkpoint', help=f'Checkpoint file for --incremental (default: <data-dir>/{CHECKPOINT_NAME})')
+    args = parser.parse_args()
+
+    plum_path = args.plum or default_plum_path()
+    if not os.path.exists(plum_path):
+        print(f"Error: plum.sqlite not found at {plum_path}")
+        exit(1)
+
+    if args.incremental:
+        counts = extract_notes_incremental(plum_path, args.data_dir, args.workers, args.batch_size, args.checkpoint)
+        print(f"{counts['changed']} new or changed notes filed, {counts['removed']} removed notes deleted.")
+    else:
+        extract_notes(plum_path, args.data_dir, args.workers, args.batch_size)
+        print("Notes extracted, cleaned, and filed by site successfully.")
+
+
+if __name__ == "__main__":
+    main()
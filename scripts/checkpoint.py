@@ -0,0 +1,53 @@
+import hashlib
+try:
+    from scripts.json_file import load_json, write_json
+except ImportError:
+    # Imported by a module run directly from scripts/
+    from json_file import load_json, write_json
+
+
+def content_fingerprint(text):
+    """Return a stable hash of a raw note body."""
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+class ExtractionCheckpoint:
+    """
+    Persisted record of which Sticky Notes a previous run already processed.
+
+    Entries are keyed on the note ``Id`` and hold the fingerprint of the raw
+    note text plus whatever the caller needs to undo its output later (for
+    example the file a note was written to). A run compares fingerprints to
+    find new or modified notes and lists the ids it never saw to find
+    removed ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._load()
+
+    def _load(self):
+        return load_json(self.path, {}, 'extraction checkpoint')
+
+    def save(self):
+        """Atomically write the checkpoint to disk."""
+        write_json(self.path, self.entries, indent=1)
+
+    def get(self, note_id):
+        return self.entries.get(str(note_id))
+
+    def is_changed(self, note_id, fingerprint):
+        """True if the note is new or its fingerprint differs from the last run."""
+        entry = self.entries.get(str(note_id))
+        return entry is None or entry.get('hash') != fingerprint
+
+    def record(self, note_id, fingerprint, **info):
+        self.entries[str(note_id)] = dict(info, hash=fingerprint)
+
+    def discard(self, note_id):
+        return self.entries.pop(str(note_id), None)
+
+    def missing(self, seen_ids):
+        """Return the ids recorded previously but absent from seen_ids."""
+        seen = {str(note_id) for note_id in seen_ids}
+        return [note_id for note_id in self.entries if note_id not in seen]
@@ -0,0 +1,55 @@
+import re
+
+# All patterns are compiled once at import. Each public function makes as few
+# passes over the text as possible, mostly inside the C regex engine, instead
+# of looping over lines in Python.
+
+_NEWLINE_RUNS = re.compile(r'\n+')
+# A code line within '\n'-separated text, together with its line break.
+# [^\S\n] is whitespace other than '\n', so a match never spans two lines.
+_CODE_LINE = re.compile(r'^[^\S\n]*(?://|#|/\*|\*[^\S\n]).*\n?', re.MULTILINE)
+_CODE_LINE_START = re.compile(r'^\s*(//|#|/\*|\*\s)')
+# Line boundaries recognised by str.splitlines() other than '\n'
+_OTHER_LINE_BREAKS = re.compile('[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+_SITE_HEADER = re.compile(r'(?:Site(?:ID)?):\s*([^\n]+)\n?', re.IGNORECASE)
+
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+
+def strip_code_lines(plain_text):
+    """
+    Collapse blank lines and drop lines starting with a code marker
+    (``//``, ``#``, ``/*`` or ``* ``), returning the stripped result.
+    """
+    text = _NEWLINE_RUNS.sub('\n', plain_text) if '\n\n' in plain_text else plain_text
+    text = text.strip()
+    if _OTHER_LINE_BREAKS.search(text):
+        # Rare: other characters also end a line; split exactly like splitlines()
+        return "\n".join(line for line in text.splitlines()
+                         if not _CODE_LINE_START.match(line)).strip()
+    if '/' in text or '#' in text or '*' in text:
+        text = _CODE_LINE.sub('', text)
+    return text.strip()
+
+
+def split_site_header(user_text, default_site="Uncategorized"):
+    """
+    Find the first "Site:" or "SiteID:" header and remove every such header.
+    Returns (site, remaining_text).
+    """
+    match = _SITE_HEADER.search(user_text)
+    if not match:
+        return default_site, user_text.strip()
+    return match.group(1).strip(), _SITE_HEADER.sub('', user_text).strip()
+
+
+def clean_html_text(html_content):
+    """Remove HTML tags, decode the common entities and collapse all whitespace."""
+    text = _HTML_TAG.sub('', html_content) if '<' in html_content else html_content
+    if '&' in text:
+        # Chained str.replace runs in C and beats a regex with a callback;
+        # '&amp;' goes last so '&amp;lt;' decodes to '&lt;' as before.
+        text = text.replace('&nbsp;', ' ').replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+    # str.split() splits on exactly the characters matched by \s
+    return ' '.join(text.split())
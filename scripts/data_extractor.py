@@ -4,10 +4,30 @@ import re
 import logging
 import datetime
 import sqlite3
+import csv
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import chain, islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Any, Union, Optional, Tuple
+from typing import Dict, List, Any, Union, Optional, Tuple, Iterator
 import sys
 
+try:
+    from scripts.checkpoint import ExtractionCheckpoint, content_fingerprint
+    from scripts.fingerprints import note_fingerprint
+    from scripts.cleaning import clean_html_text
+    from scripts.rtf import rtf_to_text
+    from scripts.metrics import inc, span
+except ImportError:
+    # Run directly as scripts/data_extractor.py
+    from checkpoint import ExtractionCheckpoint, content_fingerprint
+    from fingerprints import note_fingerprint
+    from cleaning import clean_html_text
+    from rtf import rtf_to_text
+    from metrics import inc, span
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +39,272 @@ logging.basicConfig(
 )
 logger = logging.getLogger('data_extractor')
 
+# Note segmentation patterns. _LINE_START_RE classifies the start of every
+# line as a possible header ('#'), list item or blank line ('').
+_HEADER_RE = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
+_BULLET_RE = re.compile(r'(?:^|\n)(?:- |\d+\. )(.+)(?:\n|$)')
+_LINE_START_RE = re.compile(r'^(?:#|- |\d+\. |$)', re.MULTILINE)
+
+
+def identify_notes_in_text(content: str) -> List[Dict[str, Any]]:
+    """
+    Identify potential notes in text content with enhanced Sticky Notes recognition.
+    Looks for patterns like markdown headers, bullet points, numbered lists, 
+    or typical sticky note patterns.
+    """
+    return list(iter_notes_in_text(content))
+
+
+def iter_notes_in_text(content: str, extracted_at: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the notes identify_notes_in_text() finds, one at a time.
+
+    A single scan over the line starts finds the first markdown header and
+    records list items and blank lines on the way. Headers win if there are
+    any, then bullet or numbered lists, then paragraphs separated by blank
+    lines. All notes from one call share the extracted_at timestamp.
+    """
+    if extracted_at is None:
+        extracted_at = datetime.datetime.now().isoformat()
+    length = len(content)
+    bullet_starts = []
+    blank_lines = []
+
+    for mark in _LINE_START_RE.finditer(content):
+        start = mark.start()
+        kind = mark.group()
+        if kind == '#':
+            header = _HEADER_RE.match(content, start)
+            if header:
+                yield from _header_notes(content, header, extracted_at)
+                return
+        elif kind:
+            bullet_starts.append(start)
+        elif 0 < start < length:
+            # An empty line inside the text: a newline directly after another
+            blank_lines.append(start)
+
+    # Lists count only if an item starts after the first line
+    if bullet_starts and bullet_starts[-1] > 0:
+        found = False
+        for note in _bullet_notes(content, bullet_starts, extracted_at):
+            found = True
+            yield note
+        if found:
+            return
+
+    if blank_lines:
+        yield from _paragraph_notes(content, blank_lines, extracted_at)
+
+
+def _header_notes(content: str, header: re.Match, extracted_at: str) -> Iterator[Dict[str, Any]]:
+    """Each header with the text up to the next one, starting from the first header."""
+    for next_header in _HEADER_RE.finditer(content, header.end()):
+        yield _header_note(header, content[header.end():next_header.start()], extracted_at)
+        header = next_header
+    yield _header_note(header, content[header.end():], extracted_at)
+
+
+def _header_note(header: re.Match, body: str, extracted_at: str) -> Dict[str, Any]:
+    return {
+        'title': header.group(2).strip(),
+        'level': len(header.group(1)),
+        'content': body.strip(),
+        'extracted_at': extracted_at
+    }
+
+
+def _bullet_notes(content: str, bullet_starts: List[int], extracted_at: str) -> Iterator[Dict[str, Any]]:
+    """One note per list item; an item's match includes the newline before the next line."""
+    count = 0
+    scanned_to = 0
+    for start in bullet_starts:
+        # Items after the first line match from the newline in front of them
+        match_at = start - 1 if start else 0
+        if match_at < scanned_to:
+            continue
+        match = _BULLET_RE.match(content, match_at)
+        if match:
+            count += 1
+            scanned_to = match.end()
+            yield {
+                'title': f"Note {count}",
+                'content': match.group(1).strip(),
+                'extracted_at': extracted_at
+            }
+
+
+def _paragraph_notes(content: str, blank_lines: List[int], extracted_at: str) -> Iterator[Dict[str, Any]]:
+    """Sticky note style text blocks: paragraphs separated by two or more newlines."""
+    block_start = 0
+    run_first = run_last = blank_lines[0]
+    for line in blank_lines[1:] + [None]:
+        if line is not None and line == run_last + 1:
+            run_last = line
+            continue
+        # The newlines from run_first - 1 through run_last separate two blocks
+        yield from _paragraph_note(content[block_start:run_first - 1], extracted_at)
+        block_start = run_last + 1
+        if line is not None:
+            run_first = run_last = line
+    yield from _paragraph_note(content[block_start:], extracted_at)
+
+
+def _paragraph_note(block: str, extracted_at: str) -> Iterator[Dict[str, Any]]:
+    text = block.strip()
+    if text:
+        title = block.partition('\n')[0].strip()
+        yield {
+            'title': title[:50] + ('...' if len(title) > 50 else ''),
+            'content': text,
+            'source': 'text_extraction',
+            'extracted_at': extracted_at
+        }
+
+
+# File types extract_from_directory() and iter_directory() pick up
+DIRECTORY_EXTENSIONS = ('.json', '.txt', '.md', '.csv')
+
+
+def parse_file_content(file_path: str, content: str,
+                       csv_columns: Optional[Dict[str, Any]] = None) -> Union[Dict[str, Any], List[Any], str, None]:
+    """
+    Parse the text of a file the way extract_from_file() would after reading
+    it, with CSV rows mapped by csv_columns (default CSV_COLUMNS). content is
+    None for a file that could not be read.
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if content is None:
+        return {'.json': {}, '.csv': []}.get(file_ext, "")
+    if file_ext == '.json':
+        content = content.strip()
+        if not content:
+            logger.warning(f"Empty file: {file_path}")
+            return {}
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parsing error in {file_path}: {str(e)}")
+            return {}
+    elif file_ext in ['.txt', '.md']:
+        # Structured notes if any were found, otherwise the raw content
+        return identify_notes_in_text(content) or content
+    elif file_ext == '.csv':
+        batches = csv_note_batches(io.StringIO(content), csv_columns or CSV_COLUMNS, name=file_path)
+        return [note for batch in batches for note in batch]
+    logger.warning(f"Unsupported file type: {file_ext}")
+    return None
+
+
+def parse_file_batch(batch: List[Tuple[str, str]],
+                     csv_columns: Optional[Dict[str, Any]] = None) -> List[Tuple[str, Any]]:
+    """Worker entry point: parse a batch of (relative path, content) in one round trip."""
+    results = []
+    for relpath, content in batch:
+        try:
+            results.append((relpath, parse_file_content(relpath, content, csv_columns)))
+        except Exception as e:
+            logger.error(f"Error extracting from {relpath}: {str(e)}")
+            results.append((relpath, None))
+    return results
+
+
+# Note fields a CSV export is mapped to, with the header names recognised
+# (case-insensitively) for each unless the config has a 'csv_columns' entry
+CSV_COLUMNS = {
+    'site': ('site', 'site name', 'siteid', 'site id', 'location'),
+    'equipment': ('equipment', 'asset', 'unit', 'device'),
+    'content': ('content', 'note', 'notes', 'description', 'comments'),
+    'date': ('date', 'created', 'created at', 'timestamp'),
+}
+
+
+def csv_column_indexes(header: List[str], columns: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """Position in header of the first column matching each note field, or None."""
+    positions = {}
+    for i, name in enumerate(header):
+        positions.setdefault(name.strip().lower(), i)
+    indexes = {}
+    for field, names in columns.items():
+        if isinstance(names, str):
+            names = (names,)
+        indexes[field] = next((positions[name.lower()] for name in names if name.lower() in positions), None)
+    return indexes
+
+
+def normalize_csv_date(value: str) -> Optional[str]:
+    """ISO dates and times in the app's 'YYYY-MM-DD HH:MM:SS' form; anything else unchanged."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None and parsed.year >= 1000:
+        # Same text as the strftime() below, several times faster
+        return parsed.isoformat(' ', 'seconds')
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def csv_note_batches(lines: Iterator[str], columns: Dict[str, Any], batch_size: int = 5000,
+                     name: str = 'CSV') -> Iterator[List[Dict[str, Any]]]:
+    """
+    Map the rows of a CSV export (any iterable of lines with a header row)
+    to lists of up to batch_size notes with the site, equipment, content
+    and date fields the note stores use.
+
+    columns maps each field to a header name or list of candidates, as in
+    CSV_COLUMNS. Rows without content are skipped, a missing site becomes
+    'Uncategorized' and ISO dates are normalised. name identifies the
+    source in log messages.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    indexes = csv_column_indexes(header, columns)
+    if indexes['content'] is None:
+        logger.error(f"No content column in {name}; expected one of {columns['content']}")
+        return
+    positions = [indexes[field] for field in ('site', 'equipment', 'content', 'date')]
+    # Short rows are padded to the last mapped column, and an unmapped
+    # field reads a blank cell appended to each row
+    last = max(i for i in positions if i is not None)
+    padding = [''] * (last + 1)
+    unmapped = None in positions
+    cells = itemgetter(*(-1 if i is None else i for i in positions))
+
+    while True:
+        rows = list(islice(reader, batch_size))
+        if not rows:
+            break
+        batch = []
+        append = batch.append
+        for row in rows:
+            if len(row) <= last:
+                row += padding[len(row):]
+            if unmapped:
+                row.append('')
+            site, equipment, content, date = cells(row)
+            content = content.strip()
+            if not content:
+                continue
+            append({
+                'site': site.strip() or 'Uncategorized',
+                'equipment': equipment.strip() or None,
+                'content': content,
+                'date': normalize_csv_date(date) if date else None
+            })
+        if batch:
+            yield batch
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 class DataExtractor:
     """
     Main class for extracting data from various sources like text files, 
@@ -43,6 +329,7 @@ class DataExtractor:
                 self.config = self._load_json(default_config_path)
         
         # Windows Sticky Notes locations
+        self.checkpoint_path = os.path.join(self.project_dir, 'config', 'sticky_notes_checkpoint.json')
         self.sticky_notes_paths = {
             'win10_plum': os.path.expanduser('~\\AppData\\Local\\Packages\\Microsoft.MicrosoftStickyNotes_8wekyb3d8bbwe\\LocalState\\plum.sqlite'),
             'win10_legacy': os.path.expanduser('~\\AppData\\Roaming\\Microsoft\\Sticky Notes\\StickyNotes.snt'),
@@ -94,13 +381,16 @@ class DataExtractor:
             file_ext = os.path.splitext(file_path)[1].lower()
             
             if file_ext == '.json':
-                return self._load_json(file_path)
+                with span('extract.json'):
+                    return self._load_json(file_path)
                 
             elif file_ext in ['.txt', '.md']:
-                return self.extract_from_text_file(file_path)
+                with span('extract.text'):
+                    return self.extract_from_text_file(file_path)
                 
             elif file_ext in ['.csv']:
-                return self.extract_from_csv(file_path)
+                with span('extract.csv'):
+                    return self.extract_from_csv(file_path)
                 
             else:
                 logger.warning(f"Unsupported file type: {file_ext}")
@@ -117,8 +407,10 @@ class DataExtractor:
                 content = f.read()
                 
             # Try to identify notes in the content (using regex patterns)
-            notes = self._identify_notes_in_text(content)
+            with span('extract.identify'):
+                notes = self._identify_notes_in_text(content)
             if notes:
+                inc('notes_extracted_total', len(notes), source='text_file')
                 return notes
             
             # If no structured notes were found, return raw content
@@ -128,23 +420,55 @@ class DataExtractor:
             return ""
     
     def extract_from_csv(self, file_path: str) -> List[Dict[str, Any]]:
-        """Extract data from CSV files."""
+        """Extract the notes of a CSV export, as iter_csv_notes() reads them, into one list."""
         try:
-            import csv
-            results = []
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    results.append(dict(row))
-            
-            return results
+            return [note for batch in self.iter_csv_notes(file_path) for note in batch]
         except Exception as e:
             logger.error(f"Error extracting from CSV file {file_path}: {str(e)}")
             return []
     
-    def extract_from_win10_sticky_notes(self) -> List[Dict[str, Any]]:
-        """Extract notes from Windows 10 Sticky Notes (plum.sqlite database)."""
+    def iter_csv_notes(self, file_path: str, columns: Optional[Dict[str, Any]] = None,
+                       batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream a CSV export as lists of up to batch_size notes, as
+        csv_note_batches() maps them. columns defaults to the config's
+        'csv_columns' entry, falling back to CSV_COLUMNS. Only one batch is
+        held in memory at a time.
+        """
+        columns = {**CSV_COLUMNS, **(columns or self.config.get('csv_columns', {}))}
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv_note_batches(f, columns, batch_size, file_path)
+
+    def ingest_csv(self, file_path: str, note_store: Any, columns: Optional[Dict[str, Any]] = None,
+                   batch_size: int = 5000) -> Tuple[int, int]:
+        """
+        Stream a CSV export into a note store (SqliteNoteStore or NoteStore)
+        through its import_notes(), so duplicates of notes already stored or
+        earlier in the file are skipped and the insert is one transaction.
+        Returns (notes read, notes imported).
+        """
+        read = 0
+
+        def batches():
+            nonlocal read
+            for batch in self.iter_csv_notes(file_path, columns, batch_size):
+                read += len(batch)
+                yield batch
+
+        with span('extract.csv_ingest'):
+            imported = note_store.import_notes(chain.from_iterable(batches()), batch_size=batch_size)
+        inc('notes_extracted_total', read, source='csv')
+        logger.info(f"Imported {imported} of {read} notes from {file_path}")
+        return read, imported
+
+    def extract_from_win10_sticky_notes(self, checkpoint: Optional[ExtractionCheckpoint] = None) -> List[Dict[str, Any]]:
+        """
+        Extract notes from Windows 10 Sticky Notes (plum.sqlite database).
+        
+        With a checkpoint, only notes whose Id is new or whose text changed
+        since the last run are cleaned and returned, and notes that have
+        disappeared are returned as ``{'id': ..., 'deleted': True}`` tombstones.
+        """
         db_path = self.sticky_notes_paths['win10_plum']
         notes = []
         
@@ -159,11 +483,20 @@ class DataExtractor:
             
             # Try the modern schema first (Windows 10 newer versions)
             try:
-                cursor.execute("SELECT Text, WindowPosition, Theme, Id, CreatedAt FROM Note")
-                for row in cursor.fetchall():
+                with span('extract.query'):
+                    cursor.execute("SELECT Text, WindowPosition, Theme, Id, CreatedAt FROM Note")
+                seen_ids = set()
+                for row in cursor:
                     text, position, theme, note_id, created_at = row
+                    if checkpoint is not None:
+                        seen_ids.add(note_id)
+                        fingerprint = content_fingerprint(text)
+                        if not checkpoint.is_changed(note_id, fingerprint):
+                            continue
+                        checkpoint.record(note_id, fingerprint)
                     # Clean HTML tags from the text
-                    clean_text = self._clean_html_content(text)
+                    with span('extract.clean'):
+                        clean_text = self._clean_html_content(text)
                     notes.append({
                         'title': clean_text.split('\n')[0] if clean_text else "Untitled Note",
                         'content': clean_text,
@@ -174,13 +507,23 @@ class DataExtractor:
                         'source': 'windows_sticky_notes',
                         'extracted_at': datetime.datetime.now().isoformat()
                     })
+                if checkpoint is not None:
+                    for note_id in checkpoint.missing(seen_ids):
+                        checkpoint.discard(note_id)
+                        notes.append({
+                            'id': note_id,
+                            'deleted': True,
+                            'source': 'windows_sticky_notes'
+                        })
+                    checkpoint.save()
             except sqlite3.OperationalError:
                 # Try older schema
                 logger.debug("Trying older Windows 10 Sticky Notes schema")
                 cursor.execute("SELECT Text, WindowPosition, Theme FROM Notes")
                 for i, row in enumerate(cursor.fetchall()):
                     text, position, theme = row
-                    clean_text = self._clean_html_content(text)
+                    with span('extract.clean'):
+                        clean_text = self._clean_html_content(text)
                     notes.append({
                         'title': clean_text.split('\n')[0] if clean_text else f"Sticky Note {i+1}",
                         'content': clean_text,
@@ -191,6 +534,7 @@ class DataExtractor:
                     })
                     
             conn.close()
+            inc('notes_extracted_total', len(notes), source='windows_sticky_notes')
             logger.info(f"Extracted {len(notes)} notes from Windows 10 Sticky Notes")
             return notes
             
@@ -207,148 +551,140 @@ class DataExtractor:
         if html_content.startswith('{\\rtf'):
             return self._extract_text_from_rtf(html_content)
             
-        # Remove HTML tags
-        clean_text = re.sub(r'<[^>]+>', '', html_content)
-        
-        # Handle special characters
-        clean_text = clean_text.replace('&nbsp;', ' ')
-        clean_text = clean_text.replace('&lt;', '<')
-        clean_text = clean_text.replace('&gt;', '>')
-        clean_text = clean_text.replace('&amp;', '&')
-        
-        # Remove multiple spaces and newlines
-        clean_text = re.sub(r'\s+', ' ', clean_text)
-        
-        return clean_text.strip()
+        # Remove HTML tags, decode special characters and collapse whitespace
+        return clean_html_text(html_content)
     
     def _extract_text_from_rtf(self, rtf_content: str) -> str:
         """Extract plain text from RTF content."""
-        # Simple RTF parser - for complex RTF might need a dedicated library
-        result = []
-        in_control = False
-        skip_next = False
-        
-        for char in rtf_content:
-            if skip_next:
-                skip_next = False
-                continue
-                
-            if char == '\\':
-                in_control = True
-                continue
-                
-            if in_control:
-                if char.isalpha():
-                    continue
-                else:
-                    in_control = False
-                    
-            if not in_control and char != '{' and char != '}':
-                result.append(char)
-                
-        return ''.join(result).strip()
+        # Undecodable \'hh bytes become U+FFFD rather than failing the whole note
+        return rtf_to_text(rtf_content, errors='replace').strip()
     
-    def extract_all_sticky_notes(self) -> List[Dict[str, Any]]:
-        """Extract all available Sticky Notes from the system."""
+    def extract_all_sticky_notes(self, incremental: bool = False) -> List[Dict[str, Any]]:
+        """
+        Extract all available Sticky Notes from the system.
+        When incremental, only changes since the previous incremental run are returned.
+        Notes without text and repeats of a note body already returned are left out.
+        """
         all_notes = []
+        checkpoint = ExtractionCheckpoint(self.checkpoint_path) if incremental else None
+        seen = set()
         
         # Try Windows 10 modern Sticky Notes
-        win10_notes = self.extract_from_win10_sticky_notes()
-        if win10_notes:
-            all_notes.extend(win10_notes)
+        win10_notes = self.extract_from_win10_sticky_notes(checkpoint)
+        for note in win10_notes:
+            if not note.get('deleted'):
+                fingerprint = note_fingerprint(None, note.get('content'))
+                if fingerprint is None or fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+            all_notes.append(note)
             
         # Add legacy format extraction here if needed
             
         return all_notes
     
     def _identify_notes_in_text(self, content: str) -> List[Dict[str, Any]]:
+        """See identify_notes_in_text()."""
+        return identify_notes_in_text(content)
+    
+    def extract_from_directory(self, directory_path: str, recursive: bool = True,
+                               io_workers: int = 8, parse_workers: int = 1) -> Dict[str, Any]:
         """
-        Identify potential notes in text content with enhanced Sticky Notes recognition.
-        Looks for patterns like markdown headers, bullet points, numbered lists, 
-        or typical sticky note patterns.
+        Extract data from all supported files in a directory, nested by
+        folder. Holds everything in memory; iter_directory() streams instead.
         """
-        notes = []
-        
-        # Look for markdown headers as potential note titles
-        header_pattern = re.compile(r'^(#{1,6})\s+(.+)$', re.MULTILINE)
-        headers = header_pattern.finditer(content)
-        
-        for match in headers:
-            level = len(match.group(1))
-            title = match.group(2).strip()
-            
-            # Find content until next header or end of text
-            start_pos = match.end()
-            next_header = header_pattern.search(content, start_pos)
-            end_pos = next_header.start() if next_header else len(content)
-            
-            note_content = content[start_pos:end_pos].strip()
+        results = {}
+        for relpath, data in self.iter_directory(directory_path, recursive, io_workers, parse_workers):
+            target = results
+            *folders, name = relpath.split(os.sep)
+            for folder in folders:
+                target = target.setdefault(folder, {})
+            target[name] = data
+        return results
+    
+    def _iter_directory_files(self, root: str, directory: str, recursive: bool):
+        """Yield (relative path, full path) of supported files below directory, in name order."""
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.error(f"Error extracting from directory {directory}: {str(e)}")
+            return
+        for entry in entries:
+            if entry.is_file():
+                if os.path.splitext(entry.name)[1].lower() in DIRECTORY_EXTENSIONS:
+                    yield os.path.relpath(entry.path, root), entry.path
+            elif recursive and entry.is_dir():
+                yield from self._iter_directory_files(root, entry.path, recursive)
+    
+    def _iter_file_contents(self, files, io_workers: int):
+        """
+        Read files on a thread pool, yielding (relative path, content) in
+        input order; content is None for files that could not be read.
+        """
+        with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='extract-read') as pool:
+            pending = deque()
             
-            notes.append({
-                'title': title,
-                'level': level,
-                'content': note_content,
-                'extracted_at': datetime.datetime.now().isoformat()
-            })
-        
-        # If no headers found, try to identify by bullet points or numbered lists
-        if not notes and ('\n- ' in content or re.search(r'\n\d+\. ', content)):
-            bullet_pattern = re.compile(r'(?:^|\n)(?:- |\d+\. )(.+)(?:\n|$)')
-            bullets = bullet_pattern.finditer(content)
+            def drain(limit):
+                while len(pending) > limit:
+                    relpath, future = pending.popleft()
+                    try:
+                        yield relpath, future.result()
+                    except (OSError, UnicodeDecodeError) as e:
+                        logger.error(f"Error reading {relpath}: {str(e)}")
+                        yield relpath, None
             
-            for i, match in enumerate(bullets):
-                bullet_content = match.group(1).strip()
-                notes.append({
-                    'title': f"Note {i+1}",
-                    'content': bullet_content,
-                    'extracted_at': datetime.datetime.now().isoformat()
-                })
-        
-        # Look for sticky note style text blocks (paragraphs separated by multiple newlines)
-        if not notes:
-            # Split by multiple newlines (common in copied sticky notes)
-            sticky_blocks = re.split(r'\n{2,}', content)
-            if len(sticky_blocks) > 1:
-                for i, block in enumerate(sticky_blocks):
-                    if block.strip():  # Skip empty blocks
-                        title = block.split('\n')[0].strip() if block.strip() else f"Sticky Note {i+1}"
-                        notes.append({
-                            'title': title[:50] + ('...' if len(title) > 50 else ''),
-                            'content': block.strip(),
-                            'source': 'text_extraction',
-                            'extracted_at': datetime.datetime.now().isoformat()
-                        })
-        
-        return notes
+            for relpath, path in files:
+                pending.append((relpath, pool.submit(_read_text, path)))
+                # Bound the files held in memory to a few per thread
+                yield from drain(io_workers * 4)
+            yield from drain(0)
     
-    def extract_from_directory(self, directory_path: str, recursive: bool = True) -> Dict[str, Any]:
-        """Extract data from all supported files in a directory."""
-        results = {}
+    def iter_directory(self, directory_path: str, recursive: bool = True, io_workers: int = 8,
+                       parse_workers: Optional[int] = None, batch_size: int = 32):
+        """
+        Stream (relative path, data) for every supported file in a directory,
+        with data as extract_from_file() would return it.
         
-        try:
-            if not os.path.exists(directory_path) or not os.path.isdir(directory_path):
-                logger.error(f"Directory not found: {directory_path}")
-                return results
-                
-            for item in os.listdir(directory_path):
-                full_path = os.path.join(directory_path, item)
-                
-                if os.path.isfile(full_path):
-                    ext = os.path.splitext(item)[1].lower()
-                    if ext in ['.json', '.txt', '.md', '.csv']:
-                        data = self.extract_from_file(full_path)
-                        if data is not None:
-                            results[item] = data
-                
-                elif os.path.isdir(full_path) and recursive:
-                    sub_results = self.extract_from_directory(full_path, recursive)
-                    if sub_results:
-                        results[item] = sub_results
+        The tree is walked lazily with os.scandir, files are read by a pool of
+        io_workers threads and parsed in batches of batch_size by a pool of
+        parse_workers processes (one per core by default; 1 parses in this
+        process). Only a bounded number of files and batches are in flight, so
+        memory stays flat however large the tree is. Records come out in walk
+        order, depth first with names sorted.
+        """
+        if not os.path.isdir(directory_path):
+            logger.error(f"Directory not found: {directory_path}")
+            return
+        parse_workers = parse_workers or os.cpu_count() or 1
+        csv_columns = {**CSV_COLUMNS, **self.config.get('csv_columns', {})}
+        files = self._iter_directory_files(directory_path, directory_path, recursive)
+        contents = self._iter_file_contents(files, io_workers)
+        batches = iter(lambda: list(islice(contents, batch_size)), [])
         
-        except Exception as e:
-            logger.error(f"Error extracting from directory {directory_path}: {str(e)}")
+        def records(parsed_batch):
+            for relpath, data in parsed_batch:
+                if data is None:
+                    continue
+                if isinstance(data, list):
+                    inc('notes_extracted_total', len(data), source='directory')
+                yield relpath, data
         
-        return results
+        if parse_workers <= 1:
+            for batch in batches:
+                with span('extract.parse'):
+                    parsed = parse_file_batch(batch, csv_columns)
+                yield from records(parsed)
+            return
+        
+        with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(parse_file_batch, batch, csv_columns))
+                if len(pending) >= parse_workers * 2:
+                    yield from records(pending.popleft().result())
+            while pending:
+                yield from records(pending.popleft().result())
     
     def extract_from_clipboard(self) -> Union[str, Dict[str, Any], None]:
         """Extract data from system clipboard."""
@@ -426,6 +762,11 @@ if __name__ == "__main__":
     parser.add_argument('--config', help='Path to configuration file')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
     parser.add_argument('--sticky-notes', action='store_true', help='Extract from Windows Sticky Notes')
+    parser.add_argument('--incremental', action='store_true', help='Only return Sticky Notes changed since the last incremental run')
+    parser.add_argument('--workers', type=int, default=None, help='Processes parsing directory files (default: one per core)')
+    parser.add_argument('--stream', action='store_true', help='Write a directory as JSON lines of {"path", "data"} as files are parsed')
+    parser.add_argument('--db', help='Stream a CSV source into the SQLite note store at this path instead of printing it')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per batch when streaming a CSV into --db')
     
     args = parser.parse_args()
     
@@ -437,17 +778,31 @@ if __name__ == "__main__":
     extractor = DataExtractor(args.config)
     
     # Process based on source type
-    if args.sticky_notes:
-        data = extractor.extract_all_sticky_notes()
+    if args.db and args.source and args.source.lower().endswith('.csv'):
+        from scripts.note_db import SqliteNoteStore
+        read, imported = extractor.ingest_csv(args.source, SqliteNoteStore(args.db), batch_size=args.batch_size)
+        print(f"Imported {imported} of {read} notes into {args.db}")
+        sys.exit(0)
+    elif args.stream and args.source and os.path.isdir(args.source):
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            for relpath, data in extractor.iter_directory(args.source, args.recursive, parse_workers=args.workers):
+                out.write(json.dumps({'path': relpath, 'data': data}) + '\n')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        sys.exit(0)
+    elif args.sticky_notes:
+        data = extractor.extract_all_sticky_notes(args.incremental)
     elif args.source and os.path.isfile(args.source):
         data = extractor.extract_from_file(args.source)
     elif args.source and os.path.isdir(args.source):
-        data = extractor.extract_from_directory(args.source, args.recursive)
+        data = extractor.extract_from_directory(args.source, args.recursive, parse_workers=args.workers or 1)
     elif args.source and args.source.lower() == 'clipboard':
         data = extractor.extract_from_clipboard()
     elif not args.source:
         # Default to sticky notes if no source specified
-        data = extractor.extract_all_sticky_notes()
+        data = extractor.extract_all_sticky_notes(args.incremental)
     else:
         logger.error(f"Invalid source: {args.source}")
         sys.exit(1)
@@ -0,0 +1,51 @@
+import bisect
+
+
+def date_key(note):
+    """Sort key of a note's date; notes without a date sort first."""
+    value = note.get('date')
+    return value if isinstance(value, str) else ''
+
+
+class DateIndex:
+    """
+    Note ids ordered by date, for range lookups by binary search.
+
+    Dates are ``YYYY-MM-DD HH:MM:SS`` strings, whose string order is their
+    chronological order, so the key is the string itself and a range bound
+    may be any prefix (``2025-03`` or ``2025-03-12``). Undated notes sort
+    first and never match a range, as a NULL date fails every comparison in
+    SQLite. A lookup costs O(log N) to find the range plus O(k) for the k ids
+    inside it.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._ids = []
+
+    def build(self, notes):
+        """Replace the index with the given notes, numbered by position."""
+        pairs = sorted((date_key(note), i) for i, note in enumerate(notes))
+        self._keys = [key for key, _ in pairs]
+        self._ids = [i for _, i in pairs]
+
+    def add(self, doc_id, note):
+        """Index a note; appending notes in date order costs O(1) per note."""
+        key = date_key(note)
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+            self._ids.append(doc_id)
+            return
+        pos = bisect.bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._ids.insert(pos, doc_id)
+
+    def range(self, date_from=None, date_to=None):
+        """Return the sorted ids of notes dated in ``[date_from, date_to)``, never undated ones."""
+        start = bisect.bisect_left(self._keys, date_from) if date_from else bisect.bisect_right(self._keys, '')
+        end = bisect.bisect_left(self._keys, date_to) if date_to else len(self._keys)
+        # Ids mostly arrive in date order, so this sort is close to linear
+        return sorted(self._ids[start:end])
+
+    def __len__(self):
+        return len(self._ids)
@@ -0,0 +1,65 @@
+import io
+import csv
+import json
+import zlib
+
+EXPORT_FIELDS = ['id', 'site', 'equipment', 'date', 'content']
+
+# Records are buffered into chunks of roughly this size before being sent,
+# so the response neither holds the corpus in memory nor emits tiny writes.
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunked(pieces):
+    """
+    Join small string pieces into encoded chunks of about CHUNK_SIZE bytes.
+    The first piece is sent on its own so the client sees data immediately.
+    """
+    buffer = []
+    size = 0
+    first = True
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if first or size >= CHUNK_SIZE:
+            first = False
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_ndjson(notes):
+    """Yield the notes as newline-delimited JSON, in byte chunks."""
+    return _chunked(json.dumps(note, ensure_ascii=False) + '\n' for note in notes)
+
+
+def iter_csv(notes):
+    """Yield the notes as CSV with a header row, in byte chunks."""
+    def rows():
+        line = io.StringIO()
+        writer = csv.DictWriter(line, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for note in notes:
+            writer.writerow(note)
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+        yield line.getvalue()
+    return _chunked(rows())
+
+
+def gzip_stream(chunks):
+    """Compress a stream of byte chunks into a single gzip member as it is produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if first:
+            # Push the header and first records out instead of waiting for a full block
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
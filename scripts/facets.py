@@ -0,0 +1,66 @@
+from collections import Counter
+from datetime import date, timedelta
+from functools import lru_cache
+
+FACETS = ('site', 'equipment', 'day', 'week', 'month')
+
+
+@lru_cache(maxsize=4096)
+def _day_buckets(day):
+    try:
+        parsed = date.fromisoformat(day)
+    except ValueError:
+        return None
+    if parsed.isoformat() != day:
+        # Only plain YYYY-MM-DD, as SQLite's date() accepts
+        return None
+    # Weeks run Monday to Sunday and are named after their Monday
+    week = (parsed - timedelta(days=parsed.weekday())).isoformat()
+    return day, week, day[:7]
+
+
+def date_buckets(value):
+    """
+    Return the (day, week, month) buckets of a ``YYYY-MM-DD[ HH:MM:SS]``
+    date string, or None if it is not a string starting with a valid date.
+    """
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    return _day_buckets(value[:10])
+
+
+class FacetCounts:
+    """
+    Note counts per site, equipment, day, week and month.
+
+    Counts are updated one note at a time with add(), so a corpus-wide set
+    can be kept current as notes are inserted instead of being recomputed.
+    Notes without a site, equipment or valid date are left out of that
+    facet only.
+    """
+
+    def __init__(self, notes=()):
+        self.total = 0
+        self.counts = {facet: Counter() for facet in FACETS}
+        for note in notes:
+            self.add(note)
+
+    def add(self, note, count=1):
+        self.add_values(note.get('site'), note.get('equipment'), note.get('date'), count)
+
+    def add_values(self, site, equipment, date_value, count=1):
+        counts = self.counts
+        self.total += count
+        if site:
+            counts['site'][site] += count
+        if equipment:
+            counts['equipment'][equipment] += count
+        buckets = date_buckets(date_value)
+        if buckets:
+            counts['day'][buckets[0]] += count
+            counts['week'][buckets[1]] += count
+            counts['month'][buckets[2]] += count
+
+    def to_dict(self):
+        """Return {facet: {value: count}} with values in sorted order."""
+        return {facet: dict(sorted(counter.items())) for facet, counter in self.counts.items()}
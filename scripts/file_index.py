@@ -0,0 +1,177 @@
+import os
+import json
+import logging
+import threading
+from scripts.search_index import TrigramIndex
+from scripts.metrics import inc
+from scripts.json_file import write_json
+
+INDEX_NAME = '.text_index.json'
+INDEX_VERSION = 1
+
+
+class NoteFileIndex:
+    """
+    Persistent index of the ``.txt`` note files under data_dir.
+
+    Each file is recorded under its path relative to data_dir together with
+    its (mtime_ns, size, inode) signature and its content, and the whole
+    record is saved to ``.text_index.json``. A refresh scans the directory
+    tree and only reads files that are new or whose signature changed, so a
+    search over thousands of notes costs one directory scan plus an
+    in-memory trigram lookup.
+    """
+
+    def __init__(self, data_dir, index_path=None):
+        self.data_dir = data_dir
+        self.index_path = index_path or os.path.join(data_dir, INDEX_NAME)
+        self._lock = threading.RLock()
+        # relpath -> [mtime_ns, size, inode, content]
+        self._files = {}
+        self._doc_ids = {}
+        self._paths = {}
+        self._index = TrigramIndex()
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                if saved.get('version') == INDEX_VERSION:
+                    for relpath, entry in saved['files'].items():
+                        self._put(relpath, entry)
+        except Exception as e:
+            logging.error(f"Error loading text index {self.index_path}: {e}")
+            self._files, self._doc_ids, self._paths = {}, {}, {}
+            self._index = TrigramIndex()
+
+    def save(self):
+        """Atomically write the index to disk."""
+        with self._lock:
+            write_json(self.index_path, {'version': INDEX_VERSION, 'files': self._files})
+
+    def _put(self, relpath, entry):
+        self._drop(relpath)
+        doc_id = self._index.add(entry[3])
+        self._files[relpath] = entry
+        self._doc_ids[relpath] = doc_id
+        self._paths[doc_id] = relpath
+
+    def _drop(self, relpath):
+        doc_id = self._doc_ids.pop(relpath, None)
+        if doc_id is None:
+            return False
+        self._index.remove(doc_id)
+        del self._paths[doc_id]
+        del self._files[relpath]
+        return True
+
+    def _scan(self, directory=None):
+        """Yield (relpath, DirEntry) for every .txt file below directory."""
+        directory = directory or self.data_dir
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._scan(entry.path)
+            elif entry.name.endswith('.txt') and entry.is_file():
+                yield os.path.relpath(entry.path, self.data_dir), entry
+
+    @staticmethod
+    def _signature(stat, inode):
+        return [stat.st_mtime_ns, stat.st_size, inode or stat.st_ino]
+
+    def _read(self, relpath, signature):
+        with open(os.path.join(self.data_dir, relpath), 'r', encoding='utf-8') as f:
+            return signature + [f.read()]
+
+    def _index_entry(self, relpath, signature):
+        """Index one file unless its signature is unchanged. Returns True if the index changed."""
+        known = self._files.get(relpath)
+        if known is not None and known[:3] == signature:
+            inc('cache_hits_total', cache='text_index')
+            return False
+        inc('cache_misses_total', cache='text_index')
+        try:
+            self._put(relpath, self._read(relpath, signature))
+        except (OSError, UnicodeDecodeError) as e:
+            logging.error(f"Error indexing {relpath}: {e}")
+            self._drop(relpath)
+        return True
+
+    def update_path(self, relpath):
+        """
+        Re-index a file or directory after it was created, modified or
+        removed. Returns True if the index changed.
+        """
+        with self._lock:
+            path = os.path.join(self.data_dir, relpath)
+            changed = False
+            if os.path.isdir(path):
+                for file_relpath, entry in self._scan(path):
+                    try:
+                        signature = self._signature(entry.stat(), entry.inode())
+                    except OSError:
+                        continue
+                    changed |= self._index_entry(file_relpath, signature)
+                return changed
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Gone: drop the file, or everything below a removed directory
+                prefix = relpath.rstrip(os.sep) + os.sep
+                for known in [known for known in self._files if known == relpath or known.startswith(prefix)]:
+                    changed |= self._drop(known)
+                return changed
+            if not relpath.endswith('.txt'):
+                return False
+            return self._index_entry(relpath, self._signature(stat, None))
+
+    def remove_file(self, relpath):
+        """Forget a file that no longer exists. Returns True if it was indexed."""
+        with self._lock:
+            return self._drop(relpath)
+
+    def refresh(self):
+        """
+        Bring the index up to date with the files on disk, reading only new
+        or changed files. Saves the index and returns True if anything changed.
+        """
+        with self._lock:
+            changed = False
+            seen = set()
+            for relpath, entry in self._scan():
+                seen.add(relpath)
+                try:
+                    signature = self._signature(entry.stat(), entry.inode())
+                except OSError:
+                    continue
+                changed |= self._index_entry(relpath, signature)
+            for relpath in [path for path in self._files if path not in seen]:
+                self._drop(relpath)
+                changed = True
+            if changed:
+                try:
+                    self.save()
+                except OSError as e:
+                    logging.error(f"Error saving text index {self.index_path}: {e}")
+            return changed
+
+    def search(self, query, refresh=True):
+        """
+        Return {"site", "content"} for every note file containing query
+        (case-insensitive), ordered by path. The site is the file's folder.
+        """
+        with self._lock:
+            if refresh:
+                self.refresh()
+            relpaths = sorted(self._paths[doc_id] for doc_id in self._index.search(query or ''))
+            return [{"site": os.path.basename(os.path.dirname(os.path.join(self.data_dir, relpath))),
+                     "content": self._files[relpath][3]}
+                    for relpath in relpaths]
+
+    def __len__(self):
+        return len(self._files)
@@ -0,0 +1,123 @@
+import os
+import re
+import hashlib
+import logging
+try:
+    from scripts.json_file import load_json, write_json
+except ImportError:
+    # Imported by a module run directly from scripts/
+    from json_file import load_json, write_json
+
+NOTE_FILE_PATTERN = re.compile(r'^note_(\d+)\.txt$')
+
+
+def normalize_note_text(text):
+    """Case-fold a note body and collapse runs of whitespace, so re-cleaned copies compare equal."""
+    return ' '.join((text or '').split()).casefold()
+
+
+def note_fingerprint(site, text):
+    """
+    Return the deduplication key of a note: a hash of its site and
+    normalized text, or None for a note with no text, which is never stored.
+    """
+    normalized = normalize_note_text(text)
+    if not normalized:
+        return None
+    return hashlib.sha1(f"{(site or '').strip()}\0{normalized}".encode('utf-8')).hexdigest()
+
+
+class FingerprintIndex:
+    """
+    Persisted map from note fingerprint to the ``<site>/note_N.txt`` file
+    holding that note, so filing a note whose text is already on disk for
+    the same site can be skipped without reading the corpus.
+
+    Each fingerprint also lists the ids of the Sticky Notes whose text the
+    file holds, so a file shared by duplicate notes outlives any one of
+    them. Files filed without note ids (full extractions) have no holders.
+
+    A data directory that has no index yet is scanned once to build it.
+    """
+
+    def __init__(self, path, data_dir=None):
+        self.path = path
+        self.entries, self.holders = self._load()
+        self._paths = {relpath: fingerprint for fingerprint, relpath in self.entries.items()}
+        if not os.path.exists(path) and data_dir:
+            self.scan(data_dir)
+
+    def _load(self):
+        data = load_json(self.path, {}, 'fingerprint index')
+        # An index written before holders were tracked is a flat fingerprint -> file map
+        self.tracks_holders = 'files' in data
+        if not self.tracks_holders:
+            return data, {}
+        return data['files'], {fingerprint: set(ids) for fingerprint, ids in data['notes'].items()}
+
+    def scan(self, data_dir):
+        """Index the note files already filed under data_dir; the first file wins for duplicates."""
+        for site_entry in sorted(os.scandir(data_dir), key=lambda entry: entry.name):
+            if not site_entry.is_dir():
+                continue
+            for entry in os.scandir(site_entry.path):
+                if not NOTE_FILE_PATTERN.match(entry.name):
+                    continue
+                try:
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        text = f.read()
+                except (OSError, UnicodeDecodeError) as e:
+                    logging.error(f"Error reading {entry.path} for the fingerprint index: {e}")
+                    continue
+                fingerprint = note_fingerprint(site_entry.name, text)
+                if fingerprint is not None and fingerprint not in self.entries:
+                    self.add(fingerprint, os.path.join(site_entry.name, entry.name))
+
+    def save(self):
+        """Atomically write the index to disk."""
+        notes = {fingerprint: sorted(ids) for fingerprint, ids in self.holders.items() if ids}
+        write_json(self.path, {'files': self.entries, 'notes': notes}, indent=1)
+
+    def get(self, fingerprint):
+        """Return the file already holding this note, or None."""
+        return self.entries.get(fingerprint)
+
+    def fingerprint_of(self, relpath):
+        """Return the fingerprint of the note held by relpath, or None."""
+        return self._paths.get(relpath)
+
+    def paths(self):
+        return self._paths.keys()
+
+    def add(self, fingerprint, relpath, note_id=None):
+        """Record that relpath now holds the note with this fingerprint, on behalf of note_id if given."""
+        if self._paths.get(relpath) != fingerprint:
+            self.discard_path(relpath)
+        self.entries[fingerprint] = relpath
+        self._paths[relpath] = fingerprint
+        if note_id is not None:
+            self.add_holder(fingerprint, note_id)
+
+    def add_holder(self, fingerprint, note_id):
+        """Record that note_id has the text already filed under this fingerprint."""
+        self.holders.setdefault(fingerprint, set()).add(str(note_id))
+
+    def release(self, relpath, note_id):
+        """
+        Drop note_id from the notes holding relpath. Returns True if no note
+        holds the file any more, in which case its entry is discarded and the
+        caller may delete or reuse the file.
+        """
+        fingerprint = self._paths.get(relpath)
+        ids = self.holders.get(fingerprint, set())
+        ids.discard(str(note_id))
+        if ids:
+            return False
+        self.discard_path(relpath)
+        return True
+
+    def discard_path(self, relpath):
+        fingerprint = self._paths.pop(relpath, None)
+        if fingerprint is not None and self.entries.get(fingerprint) == relpath:
+            del self.entries[fingerprint]
+            self.holders.pop(fingerprint, None)
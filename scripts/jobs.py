@@ -0,0 +1,109 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobConflict(Exception):
+    """Raised when a job of the same kind is already queued or running."""
+
+    def __init__(self, job):
+        super().__init__(f"A {job.kind} job is already {job.status}")
+        self.job = job
+
+
+class Job:
+    """
+    One background run and its progress.
+
+    The running function receives the job and reports progress with
+    ``job.advance(stage, count)``; the counts per stage, the elapsed time
+    and the throughput of ``rate_stage`` are exposed through to_dict().
+    """
+
+    def __init__(self, kind, stages, rate_stage=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = OrderedDict((stage, 0) for stage in stages)
+        self.rate_stage = rate_stage or (stages[-1] if stages else None)
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def advance(self, stage, count=1):
+        self.progress[stage] = self.progress.get(stage, 0) + count
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        elapsed = None
+        if self.started is not None:
+            elapsed = (self.finished or time.time()) - self.started
+        rate = None
+        if elapsed and self.rate_stage:
+            rate = round(self.progress.get(self.rate_stage, 0) / elapsed, 1)
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'elapsed': round(elapsed, 3) if elapsed is not None else None,
+            'notes_per_second': rate,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs on a small thread pool and remembers the most recent ones.
+
+    Only one job of each kind may be queued or running at a time; submitting
+    another raises JobConflict carrying the job already in progress.
+    """
+
+    def __init__(self, max_workers=2, history=50):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self.history = history
+
+    def submit(self, kind, func, stages=(), rate_stage=None):
+        """Queue func(job) and return the new Job."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.kind == kind and job.active:
+                    raise JobConflict(job)
+            job = Job(kind, list(stages), rate_stage)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job, func)
+        return job
+
+    def _run(self, job, func):
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = func(job)
+            job.status = 'succeeded'
+        except Exception as e:
+            logging.exception(f"{job.kind} job {job.id} failed")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -0,0 +1,41 @@
+import os
+import json
+import logging
+
+
+def load_json(path, default, description):
+    """
+    Return the JSON document stored at path, or default if the file is
+    missing or cannot be parsed (which is logged under description).
+    """
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        logging.error(f"Error loading {description} {path}: {e}")
+    return default
+
+
+def write_json_temp(path, data, **dump_args):
+    """
+    Write data as JSON to a temp file beside path and sync it to disk.
+    Returns the temp file's path, to be moved over path with os.replace().
+    The temp name includes the process id, so writers in different
+    processes never share one.
+    """
+    path = os.fspath(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_args)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
+
+
+def write_json(path, data, **dump_args):
+    """Atomically replace the file at path with data as JSON; readers see the old or the new file, never part of one."""
+    os.replace(write_json_temp(path, data, **dump_args), path)
@@ -0,0 +1,209 @@
+import os
+import time
+import random
+import logging
+import threading
+import cProfile
+import contextvars
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'HTTP requests handled, by endpoint, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Time spent handling HTTP requests, by endpoint.'),
+    'span_duration_seconds': ('histogram', 'Time spent in instrumented phases, by span name.'),
+    'cache_hits_total': ('counter', 'Lookups answered from an in-memory cache, by cache.'),
+    'cache_misses_total': ('counter', 'Lookups that had to read from disk, by cache.'),
+    'notes_scanned_total': ('counter', 'Notes examined while filtering, by backend.'),
+    'notes_extracted_total': ('counter', 'Notes produced by DataExtractor, by source.'),
+}
+
+# Spans recorded by the request being handled in the current thread
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, as Prometheus expects."""
+
+    __slots__ = ('buckets', 'sum', 'count')
+
+    def __init__(self):
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and duration histograms keyed by name and labels.
+
+    render() returns everything in the Prometheus text exposition format.
+    Updates take a lock, so the registry can be shared by request threads
+    and background jobs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.buckets), h.sum, h.count)) for key, h in self._histograms.items())
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                kind, text = METRIC_HELP.get(name, ('untyped', name))
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, key), value in counters:
+            describe(name)
+            lines.append(f'{name}{_format_labels(key)} {value}')
+        for (name, key), (buckets, total, count) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket in zip(DURATION_BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_format_labels(key)} {total:.6f}')
+            lines.append(f'{name}_count{_format_labels(key)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def inc(name, amount=1, **labels):
+    """Increment a counter in the shared registry."""
+    if amount:
+        registry.inc(name, amount, **labels)
+
+
+@contextmanager
+def span(name):
+    """
+    Time the enclosed block as ``span_duration_seconds{span=name}``. Inside
+    a request the duration is also kept for that request's Server-Timing
+    header.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('span_duration_seconds', elapsed, span=name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def start_request():
+    """Begin collecting spans for the request handled by this thread."""
+    _request_spans.set([])
+
+
+def finish_request():
+    """Stop collecting and return the request's spans as [(name, seconds)]."""
+    spans = _request_spans.get() or []
+    _request_spans.set(None)
+    return spans
+
+
+def server_timing(spans, total=None):
+    """Format spans as a Server-Timing header value, summing repeated names."""
+    durations = {}
+    for name, seconds in spans:
+        durations[name] = durations.get(name, 0.0) + seconds
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in durations.items())
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in cProfile hook for slow requests.
+
+    A fraction ``sample_rate`` of requests runs under cProfile, one at a
+    time because the interpreter allows only one active profiler. When a
+    profiled request takes longer than ``threshold`` seconds its stats are
+    written to ``output_dir`` for ``python -m pstats`` or snakeviz.
+    """
+
+    def __init__(self, threshold, sample_rate=1.0, output_dir='profiles'):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Return a running profiler for this request, or None if it is not sampled."""
+        if random.random() >= self.sample_rate or not self._lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger or coverage tool) is already active
+            self._lock.release()
+            return None
+        return profiler
+
+    def finish(self, profiler, elapsed, label):
+        """Stop profiler and keep its stats if the request was slow. Returns the file written, if any."""
+        try:
+            profiler.disable()
+        finally:
+            self._lock.release()
+        if elapsed < self.threshold:
+            return None
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{safe_label}_{elapsed * 1000:.0f}ms.prof")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            logging.error(f"Error writing profile {path}: {e}")
+            return None
+        logging.warning(f"Slow request {label} took {elapsed * 1000:.0f} ms; profile saved to {path}")
+        return path
@@ -0,0 +1,539 @@
+import os
+import json
+import logging
+import sqlite3
+import threading
+from itertools import islice
+from scripts.note_store import equipment_note_sources, load_site_dir_notes
+from scripts.fingerprints import note_fingerprint
+from scripts.facets import FACETS, FacetCounts
+from scripts.metrics import inc, span
+
+SCHEMA_VERSION = 7
+
+NOTE_COLUMNS = ('id', 'site', 'equipment', 'content', 'date')
+
+# AFTER INSERT triggers a bulk import_notes() suspends, applying their effect
+# to all the new rows at once before recreating them
+INSERT_TRIGGERS = ('notes_ai', 'notes_facets_ai', 'notes_generation_ai')
+
+
+def _facet_values(row):
+    """
+    SQL expressions giving each facet's bucket for the note referenced as
+    ``row``; they match scripts.facets.date_buckets().
+    """
+    day = f"substr({row}.date, 1, 10)"
+    # '+0 days' normalises out-of-range days such as 02-30, which date() alone echoes back
+    valid = f"date({day}, '+0 days') IS {day}"
+    return {
+        'site': f"{row}.site",
+        'equipment': f"{row}.equipment",
+        'day': f"CASE WHEN {valid} THEN {day} END",
+        'week': f"CASE WHEN {valid} THEN date({day}, 'weekday 0', '-6 days') END",
+        'month': f"CASE WHEN {valid} THEN substr({day}, 1, 7) END",
+    }
+
+
+def _facet_rows(row):
+    """A SELECT yielding one (facet, value) row per facet the note counts towards."""
+    selects = ' UNION ALL '.join(f"SELECT '{facet}' AS facet, {expr} AS value"
+                                 for facet, expr in _facet_values(row).items())
+    return f"SELECT facet, value FROM ({selects}) WHERE value IS NOT NULL AND value != ''"
+
+
+def _contains_ci(content, query):
+    """SQL helper matching the app's ``query.lower() in content.lower()`` test."""
+    return query.lower() in (content or '').lower()
+
+
+class SqliteNoteStore:
+    """
+    Notes storage backed by SQLite, used as the system of record.
+
+    The ``notes`` table holds one row per note with indexed ``site``,
+    ``equipment`` and ``date`` columns, and an FTS5 trigram table over
+    ``content`` serves substring searches. ``note_facets`` holds note counts
+    per site, equipment, day, week and month, and ``store_meta`` a
+    generation number bumped by every change to ``notes``; triggers keep
+    both current. ``content_hash`` holds each note's fingerprint (site plus
+    normalized text) so every write can skip duplicates with one index
+    lookup. ``source`` names the ``<site>/<equipment>.json`` file a note was
+    imported from, for replace_source(). It exposes the same methods as
+    ``NoteStore`` so the Flask routes can use either backend.
+    """
+
+    def __init__(self, db_path, data_dir=None):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.fts_enabled = True
+        version = self._init_schema()
+        if version < 1 and data_dir:
+            # First open of this database: import the existing JSON corpus
+            self.migrate_from_json(data_dir)
+        elif version < 7 and data_dir:
+            # Rows imported before sources were recorded
+            self._adopt_equipment_notes(data_dir)
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.create_function('contains_ci', 2, _contains_ci, deterministic=True)
+            conn.create_function('note_fingerprint', 2, note_fingerprint, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        """
+        Create or upgrade the schema. Returns the schema version the
+        database had before (0 for a brand new or legacy file).
+        """
+        conn = self._connect()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS notes
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                             content TEXT)""")
+            # clean_notes.db predates the site/equipment/date columns
+            existing = {row['name'] for row in conn.execute('PRAGMA table_info(notes)')}
+            for column in ('site', 'equipment', 'date'):
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE notes ADD COLUMN {column} TEXT')
+            if version < 1:
+                # Rows from the legacy table were filed without a site
+                conn.execute("UPDATE notes SET site = 'Uncategorized' WHERE site IS NULL")
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_site ON notes(site)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_equipment ON notes(equipment)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_date ON notes(date)')
+
+            # Site plus normalized text, consulted by every write to skip duplicates
+            if 'content_hash' not in existing:
+                conn.execute('ALTER TABLE notes ADD COLUMN content_hash TEXT')
+            if version < 5:
+                conn.execute('UPDATE notes SET content_hash = note_fingerprint(site, content) WHERE content_hash IS NULL')
+                conn.execute('DROP INDEX IF EXISTS idx_notes_identity')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_content_hash ON notes(content_hash)')
+
+            # File each imported note came from; rows from before version 7
+            # are matched to their file once by _adopt_equipment_notes()
+            if 'source' not in existing:
+                conn.execute('ALTER TABLE notes ADD COLUMN source TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_notes_source ON notes(source)')
+
+            conn.execute("""CREATE TABLE IF NOT EXISTS note_facets
+                            (facet TEXT NOT NULL, value TEXT NOT NULL, count INTEGER NOT NULL,
+                             PRIMARY KEY (facet, value)) WITHOUT ROWID""")
+            increment = f"""INSERT INTO note_facets (facet, value, count)
+                            SELECT facet, value, 1 FROM ({_facet_rows('new')}) WHERE true
+                            ON CONFLICT (facet, value) DO UPDATE SET count = count + 1;"""
+            decrement = f"""UPDATE note_facets SET count = count - 1
+                            WHERE (facet, value) IN ({_facet_rows('old')});
+                            DELETE FROM note_facets WHERE count <= 0;"""
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS notes_facets_ai AFTER INSERT ON notes BEGIN
+                                 {increment}
+                             END""")
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS notes_facets_ad AFTER DELETE ON notes BEGIN
+                                 {decrement}
+                             END""")
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS notes_facets_au
+                             AFTER UPDATE OF site, equipment, date ON notes BEGIN
+                                 {decrement}
+                                 {increment}
+                             END""")
+            if version < 2:
+                self._rebuild_facets(conn)
+
+            conn.execute("""CREATE TABLE IF NOT EXISTS store_meta
+                            (key TEXT PRIMARY KEY, value INTEGER NOT NULL)""")
+            conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('generation', 0)")
+            for name, event in (('ai', 'INSERT'), ('ad', 'DELETE'), ('au', 'UPDATE')):
+                conn.execute(f"""CREATE TRIGGER IF NOT EXISTS notes_generation_{name} AFTER {event} ON notes BEGIN
+                                     UPDATE store_meta SET value = value + 1 WHERE key = 'generation';
+                                 END""")
+
+        try:
+            with conn:
+                created = not conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone()
+                conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts
+                                USING fts5(content, content='notes', content_rowid='id',
+                                           tokenize='trigram')""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+                                    INSERT INTO notes_fts(rowid, content) VALUES (new.id, new.content);
+                                END""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+                                    INSERT INTO notes_fts(notes_fts, rowid, content)
+                                    VALUES ('delete', old.id, old.content);
+                                END""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE OF content ON notes BEGIN
+                                    INSERT INTO notes_fts(notes_fts, rowid, content)
+                                    VALUES ('delete', old.id, old.content);
+                                    INSERT INTO notes_fts(rowid, content) VALUES (new.id, new.content);
+                                END""")
+                if created:
+                    conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as e:
+            # SQLite builds without FTS5 or the trigram tokenizer (< 3.34)
+            logging.warning(f"FTS5 trigram index unavailable, falling back to table scans: {e}")
+            self.fts_enabled = False
+
+        if version < SCHEMA_VERSION:
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        return version
+
+    @staticmethod
+    def _rebuild_facets(conn):
+        """Recount note_facets from the notes table."""
+        conn.execute('DELETE FROM note_facets')
+        SqliteNoteStore._add_facet_counts(conn)
+
+    @staticmethod
+    def _add_facet_counts(conn, after_id=0):
+        """Add the notes with an id above after_id to the note_facets counts."""
+        for facet, expr in _facet_values('notes').items():
+            conn.execute(f"""INSERT INTO note_facets (facet, value, count)
+                             SELECT '{facet}', value, COUNT(*)
+                             FROM (SELECT {expr} AS value FROM notes WHERE id > ?)
+                             WHERE value IS NOT NULL AND value != ''
+                             GROUP BY value
+                             ON CONFLICT (facet, value) DO UPDATE SET count = count + excluded.count""",
+                         (after_id,))
+
+    @staticmethod
+    def _row_to_note(row):
+        return {column: row[column] for column in NOTE_COLUMNS}
+
+    def get_notes(self):
+        """Return every note in insertion order."""
+        rows = self._connect().execute(
+            'SELECT id, site, equipment, content, date FROM notes ORDER BY id')
+        return [self._row_to_note(row) for row in rows]
+
+    def get_sites(self):
+        """Return the sorted list of distinct sites, read from the facet counts."""
+        rows = self._connect().execute(
+            "SELECT value FROM note_facets WHERE facet = 'site' ORDER BY value")
+        return [row['value'] for row in rows]
+
+    def _where(self, query, site, date_from, date_to):
+        """Build the WHERE clause and parameters shared by the query methods."""
+        clauses = []
+        params = []
+        if query:
+            if self.fts_enabled and len(query) >= 3:
+                # A quoted phrase on the trigram table matches the substring;
+                # contains_ci keeps Python's case-folding semantics exact.
+                clauses.append('id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)')
+                params.append('"' + query.replace('"', '""') + '"')
+            clauses.append('contains_ci(content, ?)')
+            params.append(query)
+        if site:
+            clauses.append('site = ?')
+            params.append(site)
+        if date_from:
+            clauses.append('date >= ?')
+            params.append(date_from)
+        if date_to:
+            clauses.append('date < ?')
+            params.append(date_to)
+            if not date_from:
+                # Undated notes never match a range, as in DateIndex.range()
+                clauses.append("date > ''")
+        return clauses, params
+
+    def query_notes(self, query='', site='', date_from=None, date_to=None,
+                    limit=None, offset=0, after=None):
+        """
+        Return notes whose content contains ``query`` (ignoring case), optionally
+        restricted to a site and to dates in ``[date_from, date_to)``.
+        ``after`` skips notes up to and including that id; ``offset`` and
+        ``limit`` then select a page.
+        """
+        clauses, params = self._where(query, site, date_from, date_to)
+        if after is not None:
+            clauses.append('id > ?')
+            params.append(after)
+
+        sql = 'SELECT id, site, equipment, content, date FROM notes'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY id LIMIT ? OFFSET ?'
+        params.extend([-1 if limit is None else limit, offset])
+        with span('filter'):
+            notes = [self._row_to_note(row) for row in self._connect().execute(sql, params)]
+        inc('notes_scanned_total', len(notes), backend='sqlite')
+        return notes
+
+    def get_notes_by_id(self, ids):
+        """Return the notes with the given ids in that order, skipping unknown ids."""
+        ids = list(ids)
+        found = {}
+        conn = self._connect()
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            sql = ('SELECT id, site, equipment, content, date FROM notes WHERE id IN ('
+                   + ','.join('?' * len(chunk)) + ')')
+            for row in conn.execute(sql, chunk):
+                found[row['id']] = self._row_to_note(row)
+        return [found[i] for i in ids if i in found]
+
+    def generation(self):
+        """Return a number that changes whenever a note is added, changed or removed."""
+        return self._connect().execute("SELECT value FROM store_meta WHERE key = 'generation'").fetchone()[0]
+
+    def facet_counts(self):
+        """Return the corpus-wide {facet: {value: count}} from note_facets."""
+        facets = {facet: {} for facet in FACETS}
+        rows = self._connect().execute(
+            'SELECT facet, value, count FROM note_facets ORDER BY facet, value')
+        for row in rows:
+            facets[row['facet']][row['value']] = row['count']
+        return facets
+
+    def facet_notes(self, query='', site='', date_from=None, date_to=None,
+                    limit=None, offset=0, after=None):
+        """
+        Return {"total", "facets", "notes"} for a query: the number of
+        matching notes, their counts per facet and the page of notes that
+        query_notes() would return. Unfiltered counts are read from
+        note_facets; filtered ones from a single grouped pass over the matches.
+        """
+        clauses, params = self._where(query, site, date_from, date_to)
+        if clauses:
+            sql = ('SELECT site, equipment, substr(date, 1, 10) AS day, COUNT(*) AS n FROM notes WHERE '
+                   + ' AND '.join(clauses) + ' GROUP BY site, equipment, day')
+            counts = FacetCounts()
+            with span('facets'):
+                for row in self._connect().execute(sql, params):
+                    counts.add_values(row['site'], row['equipment'], row['day'], row['n'])
+            inc('notes_scanned_total', counts.total, backend='sqlite')
+            total, facets = counts.total, counts.to_dict()
+        else:
+            with span('facets'):
+                total, facets = self.count_notes(), self.facet_counts()
+        notes = self.query_notes(query, site, date_from, date_to, limit=limit, offset=offset, after=after)
+        return {'total': total, 'facets': facets, 'notes': notes}
+
+    def iter_notes(self, query='', site='', date_from=None, date_to=None, batch_size=1000):
+        """Yield matching notes one at a time, streaming rows from the cursor in batches."""
+        clauses, params = self._where(query, site, date_from, date_to)
+        sql = 'SELECT id, site, equipment, content, date FROM notes'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY id'
+        # A dedicated connection keeps this long-running read independent of
+        # other queries issued from the same thread while the export streams.
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.create_function('contains_ci', 2, _contains_ci, deterministic=True)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_note(row)
+        finally:
+            conn.close()
+
+    def count_notes(self, query='', site='', date_from=None, date_to=None):
+        """Return the number of notes query_notes() would match."""
+        clauses, params = self._where(query, site, date_from, date_to)
+        sql = 'SELECT COUNT(*) FROM notes'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return self._connect().execute(sql, params).fetchone()[0]
+
+    def add_note(self, note):
+        """
+        Insert a note and return its id, or None if it has no text or a note
+        with the same site and normalized text is already stored.
+        """
+        fingerprint = note_fingerprint(note.get('site'), note.get('content'))
+        if fingerprint is None:
+            return None
+        conn = self._connect()
+        with self._write_lock, conn:
+            if conn.execute('SELECT 1 FROM notes WHERE content_hash = ? LIMIT 1', (fingerprint,)).fetchone():
+                return None
+            cursor = conn.execute(
+                'INSERT INTO notes (site, equipment, content, date, content_hash) VALUES (?, ?, ?, ?, ?)',
+                (note.get('site'), note.get('equipment'), note.get('content', ''), note.get('date'), fingerprint))
+        note['id'] = cursor.lastrowid
+        return cursor.lastrowid
+
+    def import_notes(self, notes, batch_size=1000):
+        """
+        Insert the notes that have text and are not already present (same
+        site and normalized text) in one transaction. notes may be any
+        iterable, such as a stream of CSV rows; it is consumed batch_size
+        notes at a time and checked against every row written so far,
+        including earlier notes of the same import. Returns how many were
+        inserted.
+
+        When there is more than one batch the per-row insert triggers are
+        suspended for the transaction, and the search index, facet counts
+        and generation are updated for all new rows together at the end.
+        """
+        conn = self._connect()
+        notes = iter(notes)
+        batch = list(islice(notes, batch_size))
+        imported = 0
+        with self._write_lock, conn:
+            suspended = self._suspend_insert_triggers(conn) if len(batch) >= batch_size else None
+            while batch:
+                rows = self._unstored_rows(conn, batch)
+                conn.executemany('INSERT INTO notes (site, equipment, content, date, content_hash, source) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', rows)
+                imported += len(rows)
+                batch = list(islice(notes, batch_size))
+            if suspended is not None:
+                self._resume_insert_triggers(conn, *suspended, imported)
+        return imported
+
+    @staticmethod
+    def _unstored_rows(conn, notes):
+        """
+        Return insert rows for the notes with text whose fingerprint is
+        neither stored nor repeated earlier in notes. Stored fingerprints are
+        looked up for the whole batch at once rather than row by row.
+        """
+        rows = {}
+        for note in notes:
+            fingerprint = note_fingerprint(note.get('site'), note.get('content'))
+            if fingerprint is not None and fingerprint not in rows:
+                rows[fingerprint] = (note.get('site'), note.get('equipment'), note.get('content', ''),
+                                     note.get('date'), fingerprint, note.get('source'))
+        fingerprints = list(rows)
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(fingerprints), 500):
+            chunk = fingerprints[start:start + 500]
+            sql = 'SELECT content_hash FROM notes WHERE content_hash IN (' + ','.join('?' * len(chunk)) + ')'
+            for row in conn.execute(sql, chunk):
+                rows.pop(row[0], None)
+        return list(rows.values())
+
+    def get_sources(self):
+        """Return the set of files notes were imported from."""
+        rows = self._connect().execute('SELECT DISTINCT source FROM notes WHERE source IS NOT NULL')
+        return {row['source'] for row in rows}
+
+    def replace_source(self, source, notes):
+        """
+        Make the notes imported from source (a ``<site>/<equipment>.json``
+        key) exactly the given ones, in one transaction; an empty list
+        removes them all. Notes without text or already stored from
+        elsewhere, including identical notes posted by hand, are skipped and
+        stay unowned. Returns (added, removed).
+        """
+        wanted = {}
+        for note in notes:
+            fingerprint = note_fingerprint(note.get('site'), note.get('content'))
+            if fingerprint is not None and fingerprint not in wanted:
+                wanted[fingerprint] = (note.get('site'), note.get('equipment'), note.get('content', ''),
+                                       note.get('date'), fingerprint, source)
+        conn = self._connect()
+        with self._write_lock, conn:
+            owned = {row['content_hash']: row['id'] for row in conn.execute(
+                'SELECT id, content_hash FROM notes WHERE source = ?', (source,))}
+            stale = [(i,) for fingerprint, i in owned.items() if fingerprint not in wanted]
+            conn.executemany('DELETE FROM notes WHERE id = ?', stale)
+            new = [row for fingerprint, row in wanted.items() if fingerprint not in owned]
+            cursor = conn.executemany(
+                """INSERT INTO notes (site, equipment, content, date, content_hash, source)
+                   SELECT ?1, ?2, ?3, ?4, ?5, ?6 WHERE NOT EXISTS
+                   (SELECT 1 FROM notes WHERE content_hash = ?5)""", new)
+            added = cursor.rowcount if new else 0
+        return added, len(stale)
+
+    @staticmethod
+    def _suspend_insert_triggers(conn):
+        """
+        Drop the insert triggers inside a new transaction, so a rollback
+        restores them. Returns (highest id before the import, [(name, sql)]).
+        """
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM notes').fetchone()[0]
+        placeholders = ', '.join('?' * len(INSERT_TRIGGERS))
+        triggers = [tuple(row) for row in conn.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+            INSERT_TRIGGERS)]
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+        return last_id, triggers
+
+    def _resume_insert_triggers(self, conn, last_id, triggers, imported):
+        """Do the suspended triggers' work for the rows after last_id, then recreate them."""
+        names = {name for name, _ in triggers}
+        with span('import.index'):
+            if 'notes_ai' in names:
+                conn.execute('INSERT INTO notes_fts(rowid, content) SELECT id, content FROM notes WHERE id > ?',
+                             (last_id,))
+            if 'notes_facets_ai' in names:
+                self._add_facet_counts(conn, last_id)
+        if 'notes_generation_ai' in names and imported:
+            conn.execute("UPDATE store_meta SET value = value + ? WHERE key = 'generation'", (imported,))
+        for _, sql in triggers:
+            conn.execute(sql)
+
+    def migrate_from_json(self, data_dir):
+        """
+        Import the per-site ``Equipment*.json`` files and ``notes.json`` from
+        ``data_dir``. Empty notes and notes already present (same site and
+        normalized text) are skipped, so running it again is harmless.
+        The equipment files go first so their notes are stored with their
+        source even when notes.json repeats them without one.
+        """
+        notes = []
+        if os.path.isdir(data_dir):
+            notes.extend(load_site_dir_notes(data_dir))
+        notes_path = os.path.join(data_dir, 'notes.json')
+        if os.path.exists(notes_path):
+            with open(notes_path, 'r', encoding='utf-8') as f:
+                notes.extend(json.load(f))
+
+        imported = self.import_notes(notes)
+        logging.info(f"Migrated {imported} notes from {data_dir} into {self.db_path}")
+        return imported
+
+    def _adopt_equipment_notes(self, data_dir):
+        """
+        Record the source of notes stored before sources were, so
+        replace_source() can later update or remove them. Only notes matching
+        one in an equipment file under data_dir (same site, equipment and
+        normalized text) are marked; the rest, such as notes posted by hand,
+        stay unowned. Returns the number of notes marked.
+        """
+        rows = [(source, fingerprint, equipment)
+                for (fingerprint, equipment), source in equipment_note_sources(data_dir).items()]
+        conn = self._connect()
+        with self._write_lock, conn:
+            cursor = conn.executemany('UPDATE notes SET source = ?1 '
+                                      'WHERE content_hash = ?2 AND equipment IS ?3 AND source IS NULL', rows)
+            adopted = cursor.rowcount if rows else 0
+        if adopted:
+            logging.info(f"Recorded the equipment file of {adopted} notes in {self.db_path}")
+        return adopted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Migrate the JSON notes corpus into the SQLite note store')
+    parser.add_argument('--db', default=os.path.join(os.getcwd(), 'clean_notes.db'), help='SQLite database path')
+    parser.add_argument('--data-dir', default=os.path.join(os.getcwd(), 'data'), help='Directory holding notes.json and site folders')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = SqliteNoteStore(args.db)
+    count = store.migrate_from_json(args.data_dir)
+    print(f"Imported {count} notes into {args.db}")
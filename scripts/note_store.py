@@ -0,0 +1,602 @@
+import os
+import bisect
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+from scripts.search_index import TrigramIndex
+from scripts.facets import FacetCounts
+from scripts.date_index import DateIndex
+from scripts.note_table import NoteTable
+from scripts.metrics import inc, span
+from scripts.fingerprints import note_fingerprint
+from scripts.file_lock import file_lock
+from scripts.json_file import write_json, write_json_temp
+
+
+def equipment_source(site, file_path):
+    """Return the ``<site>/<equipment>.json`` key recorded as the source of the file's notes."""
+    return f"{site}/{os.path.basename(file_path)}"
+
+
+def load_equipment_file(site, file_path):
+    """Read one ``<site>/<equipment>.json`` file into a list of notes, each naming the file as its source."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        equipment_notes = json.load(f)
+    equipment = os.path.basename(file_path).replace('.json', '')
+    source = equipment_source(site, file_path)
+    return [{
+        "site": site,
+        "equipment": equipment,
+        "content": note_data.get('content', ''),
+        "date": note_data.get('date', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+        "source": source
+    } for note_data in equipment_notes]
+
+
+def load_site_dir_notes(data_dir):
+    """Combine the per-site ``Equipment*.json`` files under data_dir into one notes list."""
+    notes = []
+    for site_dir in os.listdir(data_dir):
+        site_path = os.path.join(data_dir, site_dir)
+        if os.path.isdir(site_path):
+            for file in os.listdir(site_path):
+                if file.endswith('.json'):
+                    notes.extend(load_equipment_file(site_dir, os.path.join(site_path, file)))
+    return notes
+
+
+def equipment_note_sources(data_dir):
+    """
+    Map (fingerprint, equipment) of every note in the ``<site>/<equipment>.json``
+    files under data_dir to the file's source key. Unreadable files are skipped.
+    """
+    sources = {}
+    if not os.path.isdir(data_dir):
+        return sources
+    for site_dir in os.listdir(data_dir):
+        site_path = os.path.join(data_dir, site_dir)
+        if os.path.isdir(site_path):
+            for file in os.listdir(site_path):
+                if file.endswith('.json'):
+                    try:
+                        notes = load_equipment_file(site_dir, os.path.join(site_path, file))
+                    except (OSError, ValueError) as e:
+                        logging.warning(f"Skipping {os.path.join(site_path, file)}: {e}")
+                        continue
+                    for note in notes:
+                        fingerprint = note_fingerprint(note['site'], note['content'])
+                        if fingerprint is not None:
+                            sources.setdefault((fingerprint, note['equipment']), note['source'])
+    return sources
+
+
+def _parse_journal_entry(line):
+    """Return (pos, note) from one ``notes.jsonl`` line, raising ValueError if it is malformed."""
+    entry = json.loads(line)
+    if (not isinstance(entry, dict) or type(entry.get('pos')) is not int
+            or not isinstance(entry.get('note'), dict)):
+        raise ValueError('expected an object with an integer "pos" and a "note" object')
+    return entry['pos'], entry['note']
+
+
+class NoteStore:
+    """
+    Shared in-memory copy of the notes corpus backed by ``notes.json``.
+
+    The file is parsed once and only re-read when its mtime or size changes,
+    so repeated page renders do no JSON parsing while the corpus is unchanged.
+    Notes are held in a columnar NoteTable rather than as one dict each.
+    The sorted site list, a trigram search index, a date index and
+    corpus-wide facet counts are kept alongside the notes for the same reason.
+
+    New notes are appended to ``notes.jsonl`` instead of rewriting the whole
+    snapshot. Each journal line records the note's position in the corpus, so
+    entries already folded into ``notes.json`` by a compaction are skipped on
+    replay. A background thread periodically compacts the journal into the
+    snapshot using a temp file and an atomic rename.
+
+    Several processes may share the files: writers hold an exclusive lock on
+    ``notes.lock`` while they catch up with the journal and append to it, and
+    compaction holds it while it reads and replaces the journal.
+
+    When a watcher calls refresh() on file changes it sets ``watched``, and
+    reads stop checking the files on every request.
+
+    Notes imported from a ``<site>/<equipment>.json`` file record it as
+    their ``source``, so replace_source() can bring them in line with the
+    file when it changes or is removed. A notes.json from before sources
+    were recorded is migrated once when loaded; see _adopt_equipment_notes().
+    """
+
+    def __init__(self, data_dir, compact_interval=60):
+        self.data_dir = data_dir
+        self.notes_path = os.path.join(data_dir, 'notes.json')
+        self.journal_path = os.path.join(data_dir, 'notes.jsonl')
+        self.lock_path = os.path.join(data_dir, 'notes.lock')
+        self.compact_interval = compact_interval
+        self._lock = threading.RLock()
+        self._signature = None
+        self._journal_signature = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._compactor = None
+        self._notes = NoteTable()
+        self._sites = []
+        self._index = TrigramIndex()
+        self._dates = DateIndex()
+        self._facets = FacetCounts()
+        self._generation = 0
+        # Fingerprints of the cached notes, built by the first write that needs them
+        self._fingerprints = None
+        self.watched = False
+
+    @staticmethod
+    def _file_signature(path):
+        """Return (mtime_ns, size) of a file, or None if it is missing."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _set_notes(self, notes):
+        self._sites = sorted(set(note['site'] for note in notes if 'site' in note))
+        self._index.build(note.get('content', '') for note in notes)
+        self._dates.build(notes)
+        self._facets = FacetCounts(notes)
+        self._notes = NoteTable(notes)
+        self._fingerprints = None
+        self._generation += 1
+
+    def _append_to_cache(self, note):
+        self._notes.append(note)
+        if 'site' in note and note['site'] not in self._sites:
+            self._sites = sorted(self._sites + [note['site']])
+        self._dates.add(self._index.add(note.get('content', '')), note)
+        self._facets.add(note)
+        if self._fingerprints is not None:
+            self._fingerprints.add(note_fingerprint(note.get('site'), note.get('content')))
+        self._generation += 1
+
+    def _write(self, notes):
+        """Atomically replace notes.json with the given notes."""
+        write_json(self.notes_path, notes, indent=4)
+        self._signature = self._file_signature(self.notes_path)
+
+    def _replay_journal(self, notes, offset):
+        """
+        Apply journal entries starting at byte ``offset`` to ``notes``.
+        Returns the offset just past the last complete line.
+        """
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # A write still in progress; pick it up on the next refresh
+                    break
+                offset += len(line)
+                try:
+                    pos, note = _parse_journal_entry(line)
+                except ValueError as e:
+                    logging.error(f"Skipping corrupt journal entry in {self.journal_path}: {e}")
+                    continue
+                self._journal_entries += 1
+                if pos < len(notes):
+                    # Already part of the snapshot
+                    continue
+                if notes is self._notes:
+                    self._append_to_cache(note)
+                else:
+                    notes.append(note)
+        return offset
+
+    def _reload(self):
+        try:
+            if os.path.exists(self.notes_path):
+                with open(self.notes_path, 'r', encoding='utf-8') as f:
+                    notes = json.load(f)
+                self._signature = self._file_signature(self.notes_path)
+                if notes and not any('source' in note for note in notes):
+                    self._adopt_equipment_notes(notes)
+            else:
+                # Check for individual site directories if notes.json doesn't exist
+                notes = load_site_dir_notes(self.data_dir)
+                # Save the combined notes to notes.json for future use
+                self._write(notes)
+        except Exception as e:
+            logging.error(f"Error loading notes: {e}")
+            # Create an empty notes file if it doesn't exist or has errors
+            notes = []
+            self._write(notes)
+
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._journal_signature = self._file_signature(self.journal_path)
+        if self._journal_signature is not None:
+            self._journal_offset = self._replay_journal(notes, 0)
+        self._set_notes(notes)
+
+    def _adopt_equipment_notes(self, notes):
+        """
+        One-time migration of a notes.json written before sources were
+        recorded: notes matching one in an equipment file (same site,
+        equipment and normalized text) are marked with its source, so
+        replace_source() can later update or remove them. Other notes, such
+        as ones posted by hand, stay without a source.
+        """
+        try:
+            sources = equipment_note_sources(self.data_dir)
+            adopted = 0
+            for note in notes:
+                source = sources.get((note_fingerprint(note.get('site'), note.get('content')), note.get('equipment')))
+                if source is not None:
+                    note['source'] = source
+                    adopted += 1
+            if adopted:
+                self._write(notes)
+                logging.info(f"Recorded the equipment file of {adopted} notes in {self.notes_path}")
+        except OSError as e:
+            # The notes load as they are; the migration is retried on the next reload
+            logging.error(f"Error recording note sources in {self.notes_path}: {e}")
+
+    def refresh(self):
+        """Reload the corpus if notes.json or its journal changed on disk since the last load."""
+        with self._lock:
+            signature = self._file_signature(self.notes_path)
+            if signature is None or signature != self._signature:
+                inc('cache_misses_total', cache='notes')
+                self._reload()
+                return
+            journal_signature = self._file_signature(self.journal_path)
+            if journal_signature != self._journal_signature:
+                inc('cache_misses_total', cache='notes')
+                if journal_signature is None or journal_signature[1] < self._journal_offset:
+                    # Journal was compacted or removed by another process
+                    self._reload()
+                    return
+                # Another process appended notes; apply only the new tail
+                self._journal_offset = self._replay_journal(self._notes, self._journal_offset)
+                self._journal_signature = journal_signature
+            else:
+                inc('cache_hits_total', cache='notes')
+
+    def _refresh_for_read(self):
+        # Writes always refresh first; reads rely on the watcher when one runs
+        if not self.watched or self._signature is None:
+            with span('load'):
+                self.refresh()
+
+    def get_notes(self):
+        """
+        Return the cached notes, reloading them first if needed. The table is
+        shared between requests and must be treated as read-only; indexing or
+        iterating it yields a new dict per note.
+        """
+        self._refresh_for_read()
+        return self._notes
+
+    def generation(self):
+        """Return a number that changes whenever the cached corpus changes."""
+        with self._lock:
+            self._refresh_for_read()
+            return self._generation
+
+    def get_sites(self):
+        """Return the sorted list of sites present in the corpus."""
+        self._refresh_for_read()
+        return self._sites
+
+    def _match_ids(self, query, site, date_from, date_to):
+        """Return the sorted positions of matching notes without copying any note."""
+        with span('filter'):
+            return self._filter_ids(query, site, date_from, date_to)
+
+    def _filter_ids(self, query, site, date_from, date_to):
+        if date_from or date_to:
+            ids = self._dates.range(date_from, date_to)
+            if query:
+                matches = self._index.search(query)
+                if len(matches) < len(ids):
+                    ids, matches = matches, ids
+                matches = set(matches)
+                ids = [i for i in ids if i in matches]
+        else:
+            ids = self._index.search(query)
+        inc('notes_scanned_total', len(ids), backend='json')
+        if site:
+            sites = self._notes.columns['site']
+            ids = [i for i in ids if sites[i] == site]
+        return ids
+
+    def query_notes(self, query='', site='', date_from=None, date_to=None,
+                    limit=None, offset=0, after=None):
+        """
+        Return notes whose content contains ``query`` (ignoring case), optionally
+        restricted to a site and to dates in ``[date_from, date_to)``.
+        ``after`` skips notes up to and including that id; ``offset`` and
+        ``limit`` then select a page. Each returned note carries its ``id``.
+        """
+        with self._lock:
+            self._refresh_for_read()
+            notes = self._notes
+            ids = self._match_ids(query, site, date_from, date_to)
+        if after is not None:
+            ids = ids[bisect.bisect_right(ids, after):]
+        ids = ids[offset:] if limit is None else ids[offset:offset + limit]
+        return [notes.row(i, id=i) for i in ids]
+
+    def get_notes_by_id(self, ids):
+        """Return the notes at the given positions in that order, each carrying its ``id``; unknown ids are skipped."""
+        with self._lock:
+            self._refresh_for_read()
+            notes = self._notes
+        return [notes.row(i, id=i) for i in ids if 0 <= i < len(notes)]
+
+    def facet_notes(self, query='', site='', date_from=None, date_to=None,
+                    limit=None, offset=0, after=None):
+        """
+        Return {"total", "facets", "notes"} for a query: the number of
+        matching notes, their counts per facet and the page of notes that
+        query_notes() would return. Unfiltered counts are maintained as notes
+        are added; filtered ones come from the same pass that finds the page.
+        """
+        with self._lock:
+            self._refresh_for_read()
+            notes = self._notes
+            if query or site or date_from or date_to:
+                ids = self._match_ids(query, site, date_from, date_to)
+                facets = FacetCounts()
+                columns = notes.columns
+                sites, equipment, dates = columns['site'], columns['equipment'], columns['date']
+                with span('facets'):
+                    for i in ids:
+                        facets.add_values(sites[i], equipment[i], dates[i])
+            else:
+                ids = range(len(notes))
+                facets = self._facets
+            facet_dict = facets.to_dict()
+            total = facets.total
+        if after is not None:
+            ids = ids[bisect.bisect_right(ids, after):]
+        ids = ids[offset:] if limit is None else ids[offset:offset + limit]
+        return {'total': total, 'facets': facet_dict, 'notes': [notes.row(i, id=i) for i in ids]}
+
+    def iter_notes(self, query='', site='', date_from=None, date_to=None):
+        """
+        Yield matching notes one at a time, each carrying its ``id``.
+        Notes added while iterating are not included.
+        """
+        with self._lock:
+            self._refresh_for_read()
+            notes = self._notes
+            if query or site or date_from or date_to:
+                ids = self._match_ids(query, site, date_from, date_to)
+            else:
+                ids = range(len(notes))
+        for i in ids:
+            yield notes.row(i, id=i)
+
+    def count_notes(self, query='', site='', date_from=None, date_to=None):
+        """Return the number of notes query_notes() would match."""
+        with self._lock:
+            self._refresh_for_read()
+            return len(self._match_ids(query, site, date_from, date_to))
+
+    def _known_fingerprints(self):
+        if self._fingerprints is None:
+            self._fingerprints = {note_fingerprint(note.get('site'), note.get('content')) for note in self._notes}
+        return self._fingerprints
+
+    def add_note(self, note):
+        """
+        Append a note to the journal and the cache; cost is independent of
+        corpus size. Returns the note's position, also set as its ``id``, or
+        None if it has no text or a note with the same site and normalized
+        text already exists.
+        """
+        with self._lock, file_lock(self.lock_path):
+            # Catch up with other processes first, so the position is free
+            self.refresh()
+            fingerprint = note_fingerprint(note.get('site'), note.get('content'))
+            if fingerprint is None or fingerprint in self._known_fingerprints():
+                return None
+            with self._open_journal() as f:
+                self._journal_notes(f, [note])
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_signature = self._file_signature(self.journal_path)
+            self._start_compactor()
+            position = len(self._notes) - 1
+        note['id'] = position
+        return position
+
+    def _open_journal(self):
+        """
+        Open the journal for appending; the caller holds both locks and has
+        refreshed. Bytes past the last complete line were left by a writer
+        that crashed mid-entry and are cut off, so the next entry starts on
+        a line of its own instead of being joined to them and lost.
+        """
+        f = open(self.journal_path, 'ab')
+        if f.tell() > self._journal_offset:
+            f.truncate(self._journal_offset)
+        return f
+
+    def _journal_notes(self, f, notes):
+        """Write notes to the open journal as one block, then add them to the cache."""
+        start = len(self._notes)
+        data = ''.join(json.dumps({'pos': start + i, 'note': note}) + '\n'
+                       for i, note in enumerate(notes)).encode('utf-8')
+        f.write(data)
+        self._journal_offset += len(data)
+        self._journal_entries += len(notes)
+        for note in notes:
+            self._append_to_cache(note)
+
+    def import_notes(self, notes, batch_size=1000):
+        """
+        Add the notes that have text and are not already in the corpus (same
+        site and normalized text); returns how many were added. notes may be
+        any iterable. New notes are appended to the journal batch_size at a
+        time and synced to disk once at the end.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self.refresh()
+            known = self._known_fingerprints()
+
+            def new_notes():
+                # Notes waiting in the current batch are not in known yet
+                seen = set()
+                for note in notes:
+                    fingerprint = note_fingerprint(note.get('site'), note.get('content'))
+                    if fingerprint is not None and fingerprint not in known and fingerprint not in seen:
+                        seen.add(fingerprint)
+                        yield note
+
+            return self._append_notes(new_notes(), batch_size)
+
+    def _append_notes(self, notes, batch_size=1000):
+        """Journal new notes batch_size at a time and sync once; the caller holds both locks."""
+        added = 0
+        f = None
+        try:
+            for batch in iter(lambda: list(islice(notes, batch_size)), []):
+                if f is None:
+                    f = self._open_journal()
+                self._journal_notes(f, batch)
+                added += len(batch)
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            if f is not None:
+                f.close()
+        if added:
+            self._journal_signature = self._file_signature(self.journal_path)
+            self._start_compactor()
+        return added
+
+    def get_sources(self):
+        """Return the set of files the cached notes were imported from."""
+        with self._lock:
+            self._refresh_for_read()
+            return {source for source in self._notes.sources if source is not None}
+
+    def replace_source(self, source, notes):
+        """
+        Make the notes imported from source (a ``<site>/<equipment>.json``
+        key) exactly the given ones; an empty list removes them all. Notes
+        without text or already stored from elsewhere, including identical
+        notes posted by hand, are skipped and stay unowned. Returns
+        (added, removed).
+
+        Additions are journaled like import_notes(). Removing notes rewrites
+        notes.json, since the positions after them change.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self.refresh()
+            table = self._notes
+            sites, contents = table.columns['site'], table.columns['content']
+            wanted = {}
+            for note in notes:
+                fingerprint = note_fingerprint(note.get('site'), note.get('content'))
+                if fingerprint is not None and fingerprint not in wanted:
+                    wanted[fingerprint] = dict(note, source=source)
+
+            owned = {note_fingerprint(sites[i], contents[i]): i
+                     for i, owner in enumerate(table.sources) if owner == source}
+            stale = {i for fingerprint, i in owned.items() if fingerprint not in wanted}
+            new = {fingerprint: note for fingerprint, note in wanted.items() if fingerprint not in owned}
+
+            known = self._known_fingerprints()
+            added = [note for fingerprint, note in new.items() if fingerprint not in known]
+
+            if not stale:
+                self._append_notes(iter(added))
+                return len(added), 0
+
+            remaining = [table.record(i) for i in range(len(table)) if i not in stale]
+            remaining.extend(added)
+            self._rewrite(remaining)
+            return len(added), len(stale)
+
+    def _rewrite(self, notes):
+        """Replace notes.json and drop the journal, whose positions no longer apply; the caller holds both locks."""
+        if self._journal_signature is not None:
+            # Removed first: a reader in between sees the old snapshot alone,
+            # never journal entries replayed onto the new one
+            os.remove(self.journal_path)
+        self._journal_signature = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._write(notes)
+        self._set_notes(notes)
+
+    def compact(self):
+        """
+        Fold the journal into notes.json and truncate the journal. Returns
+        False if there was nothing to fold in, or another process compacted
+        the files while the snapshot was being written.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self.refresh()
+            if not self._journal_entries:
+                return False
+            count = len(self._notes)
+            snapshot = [self._notes.record(i) for i in range(count)]
+            signature = self._signature
+
+        # Writing the snapshot is the slow part; appends continue meanwhile
+        # and are kept in the journal because their positions are >= count.
+        tmp_path = write_json_temp(self.notes_path, snapshot, indent=4)
+
+        with self._lock, file_lock(self.lock_path):
+            if self._file_signature(self.notes_path) != signature:
+                # Replacing a newer snapshot would lose the notes it folded in
+                os.remove(tmp_path)
+                return False
+            # Apply what other processes appended meanwhile before the
+            # journal offset is reset below
+            self.refresh()
+            os.replace(tmp_path, self.notes_path)
+            self._signature = self._file_signature(self.notes_path)
+
+            remaining = []
+            tail = b''
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        tail = line
+                        break
+                    try:
+                        if _parse_journal_entry(line)[0] >= count:
+                            remaining.append(line)
+                    except ValueError:
+                        continue
+            tmp_journal = self.journal_path + '.tmp'
+            with open(tmp_journal, 'wb') as f:
+                f.writelines(remaining)
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_journal, self.journal_path)
+            self._journal_offset = sum(len(line) for line in remaining)
+            self._journal_signature = self._file_signature(self.journal_path)
+            self._journal_entries = len(remaining)
+        return True
+
+    def _start_compactor(self):
+        if self._compactor is None and self.compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name='notes-compactor', daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(self.compact_interval)
+            try:
+                self.compact()
+            except Exception as e:
+                logging.error(f"Error compacting notes journal: {e}")
@@ -0,0 +1,91 @@
+import sys
+
+COLUMNS = ('site', 'equipment', 'content', 'date')
+# Columns with few distinct values; each value is stored once
+INTERNED = ('site', 'equipment')
+# Key naming the file a note was imported from; kept for the store, not
+# part of the note returned to readers
+SOURCE = 'source'
+
+
+class NoteTable:
+    """
+    Column-oriented store for a notes corpus.
+
+    Each field lives in its own list indexed by note position, with site
+    and equipment strings interned so thousands of notes share one copy, so
+    a note costs a few list slots instead of a dict. Reading a position with
+    ``table[i]`` builds an ordinary note dict, which makes the table usable
+    wherever a read-only list of notes was. Keys other than COLUMNS, and
+    columns a note did not have, are remembered per note so the dict comes
+    back with the same keys. A note's ``source`` is kept in ``sources``
+    and only returned by ``record()``.
+    """
+
+    def __init__(self, notes=()):
+        self.columns = {column: [] for column in COLUMNS}
+        self.sources = []
+        self._missing = {}
+        self._extra = {}
+        self.extend(notes)
+
+    def append(self, note):
+        position = len(self)
+        missing = []
+        for column in COLUMNS:
+            if column in note:
+                value = note[column]
+                if column in INTERNED and type(value) is str:
+                    value = sys.intern(value)
+            else:
+                value = None
+                missing.append(column)
+            self.columns[column].append(value)
+        source = note.get(SOURCE)
+        self.sources.append(sys.intern(source) if type(source) is str else None)
+        if missing:
+            self._missing[position] = tuple(missing)
+        if len(note) + len(missing) > len(COLUMNS) + (SOURCE in note):
+            self._extra[position] = {key: value for key, value in note.items()
+                                     if key not in self.columns and key != SOURCE}
+
+    def extend(self, notes):
+        for note in notes:
+            self.append(note)
+
+    def row(self, position, **fields):
+        """Return the note at position as a new dict, updated with fields."""
+        columns = self.columns
+        note = {column: columns[column][position] for column in COLUMNS}
+        missing = self._missing.get(position)
+        if missing:
+            for column in missing:
+                del note[column]
+        extra = self._extra.get(position)
+        if extra:
+            note.update(extra)
+        note.update(fields)
+        return note
+
+    def record(self, position):
+        """Return the note at position as stored, including its source."""
+        note = self.row(position)
+        if self.sources[position] is not None:
+            note[SOURCE] = self.sources[position]
+        return note
+
+    def __len__(self):
+        return len(self.columns['content'])
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.row(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError('note position out of range')
+        return self.row(position)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.row(position)
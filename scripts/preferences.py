@@ -1,14 +1,31 @@
 import os
+import copy
 import json
+import time
+import atexit
 import logging
+import threading
 from pathlib import Path
+from scripts.json_file import write_json
 
 class UserPreferences:
-    """Manage user preferences for the Sticky Note Compiler application."""
-    
-    def __init__(self):
-        self.config_dir = Path(r'c:\LocalStorage\Sticky_Note_Compiler\config')
+    """
+    Manage user preferences for the Sticky Note Compiler application.
+
+    Reads are served from memory. update() applies a batch of changes to a
+    copy and swaps it in, so readers never see half an update, and the file
+    is rewritten with one atomic replace ``flush_delay`` seconds after the
+    last change; flush() writes immediately and also runs at exit. The file
+    is re-read only when its mtime or size changes, checked at most every
+    ``check_interval`` seconds. A lock serialises writers from request
+    threads.
+    """
+
+    def __init__(self, config_dir=None, flush_delay=0.5, check_interval=1.0):
+        self.config_dir = Path(config_dir or r'c:\LocalStorage\Sticky_Note_Compiler\config')
         self.preferences_file = self.config_dir / 'user_preferences.json'
+        self.flush_delay = flush_delay
+        self.check_interval = check_interval
         self.default_preferences = {
             "theme": "light",
             "defaultSortOrder": "date-desc",
@@ -27,31 +44,55 @@ class UserPreferences:
                 "enabled": True
             }
         }
+        self._lock = threading.RLock()
+        self._signature = None
+        self._next_check = 0.0
+        self._dirty = False
+        self._flush_timer = None
+        self._preferences = None
+        # Bumped on every change or reload, for callers caching derived data
+        self.version = 0
         self.preferences = self.load_preferences()
-        
+        atexit.register(self.flush)
+
+    @property
+    def preferences(self):
+        """The current preferences; treat the dict as read-only and change it with update()."""
+        self._check_external_change()
+        return self._preferences
+
+    @preferences.setter
+    def preferences(self, preferences):
+        with self._lock:
+            self._preferences = preferences
+            self.version += 1
+
     def load_preferences(self):
         """Load user preferences from file or create with defaults if not exists."""
         try:
             # Ensure config directory exists
             self.config_dir.mkdir(parents=True, exist_ok=True)
-            
+
             # If preferences file exists, load it
             if self.preferences_file.exists():
+                signature = self._file_signature()
                 with open(self.preferences_file, 'r') as f:
                     user_prefs = json.load(f)
                     # Ensure all default keys exist by merging with defaults
-                    merged = self.default_preferences.copy()
+                    merged = copy.deepcopy(self.default_preferences)
                     self._deep_update(merged, user_prefs)
+                    self._signature = signature
                     return merged
-            
+
             # If file doesn't exist, create it with defaults
-            self.save_preferences(self.default_preferences)
-            return self.default_preferences
-            
+            defaults = copy.deepcopy(self.default_preferences)
+            self.save_preferences(defaults)
+            return defaults
+
         except Exception as e:
             logging.error(f"Error loading preferences: {str(e)}")
-            return self.default_preferences
-    
+            return copy.deepcopy(self.default_preferences)
+
     def _deep_update(self, target, source):
         """Recursively update nested dictionaries."""
         for key, value in source.items():
@@ -59,21 +100,64 @@ class UserPreferences:
                 self._deep_update(target[key], value)
             else:
                 target[key] = value
-    
-    def save_preferences(self, preferences=None):
-        """Save preferences to JSON file."""
-        if preferences is None:
-            preferences = self.preferences
-            
+
+    def _file_signature(self):
         try:
-            with open(self.preferences_file, 'w') as f:
-                json.dump(preferences, f, indent=4)
-            self.preferences = preferences
-            return True
-        except Exception as e:
-            logging.error(f"Error saving preferences: {str(e)}")
-            return False
-    
+            stat = os.stat(self.preferences_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _check_external_change(self):
+        """Reload if another process rewrote the file; unsaved local changes win."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + self.check_interval
+            if self._dirty or self._file_signature() == self._signature:
+                return
+            self.preferences = self.load_preferences()
+
+    def save_preferences(self, preferences=None):
+        """Atomically write preferences to the JSON file now."""
+        with self._lock:
+            if preferences is None:
+                preferences = self._preferences
+
+            try:
+                write_json(self.preferences_file, preferences, indent=4)
+                self._signature = self._file_signature()
+                self._dirty = False
+                if preferences is not self._preferences:
+                    self.preferences = preferences
+                return True
+            except Exception as e:
+                logging.error(f"Error saving preferences: {str(e)}")
+                return False
+
+    def flush(self):
+        """Write pending changes now. Returns False only if the write failed."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return True
+            return self.save_preferences()
+
+    def _schedule_flush(self):
+        self._dirty = True
+        if self.flush_delay <= 0:
+            self.flush()
+            return
+        # Restart the delay so a burst of changes ends in one write
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
     def get_preference(self, key_path, default=None):
         """
         Get a preference value using a dot-notation path.
@@ -87,25 +171,38 @@ class UserPreferences:
             return value
         except (KeyError, TypeError):
             return default
-    
-    def set_preference(self, key_path, value):
+
+    def update(self, changes):
         """
-        Set a preference value using a dot-notation path and save to file.
-        Example: set_preference('notifications.sound', False)
+        Set several preferences from a {dot.path: value} dict as one change:
+        readers see all of them or none, and they are saved by one write.
         """
         try:
-            keys = key_path.split('.')
-            target = self.preferences
-            
-            # Navigate to the innermost dictionary
-            for key in keys[:-1]:
-                if key not in target or not isinstance(target[key], dict):
-                    target[key] = {}
-                target = target[key]
-            
-            # Set the value and save
-            target[keys[-1]] = value
-            return self.save_preferences()
+            with self._lock:
+                self._check_external_change()
+                preferences = copy.deepcopy(self._preferences)
+                for key_path, value in changes.items():
+                    keys = key_path.split('.')
+                    target = preferences
+
+                    # Navigate to the innermost dictionary
+                    for key in keys[:-1]:
+                        if key not in target or not isinstance(target[key], dict):
+                            target[key] = {}
+                        target = target[key]
+                    target[keys[-1]] = value
+
+                self.preferences = preferences
+                self._schedule_flush()
+                return True
         except Exception as e:
-            logging.error(f"Error setting preference {key_path}: {str(e)}")
+            logging.error(f"Error updating preferences {list(changes)}: {str(e)}")
             return False
+
+    def set_preference(self, key_path, value):
+        """
+        Set a preference value using a dot-notation path; the file is
+        written shortly afterwards (see flush()).
+        Example: set_preference('notifications.sound', False)
+        """
+        return self.update({key_path: value})
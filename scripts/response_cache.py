@@ -0,0 +1,65 @@
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of rendered response bodies.
+
+    Entries are keyed by a tuple the caller builds from everything the
+    response depends on (route, normalized filters, corpus generation,
+    preferences). The least recently used entries are evicted once the
+    cached bodies exceed ``max_bytes`` or there are more than
+    ``max_entries``; bodies larger than a quarter of ``max_bytes`` are
+    never stored.
+
+    clear() drops everything and changes the epoch that etag() mixes into
+    every tag, for changes the key cannot see (such as an extraction
+    rewriting the data directory). The epoch is random per process, so
+    tags issued before a restart are never mistaken for current ones.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self.epoch = uuid.uuid4().hex
+
+    def etag(self, key):
+        """Return the strong ETag of the response for key, without rendering it."""
+        digest = hashlib.sha1(repr((self.epoch, key)).encode('utf-8')).hexdigest()
+        return digest[:32]
+
+    def get(self, key):
+        """Return the cached (body, mimetype) for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, mimetype):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (body, mimetype)
+            self._size += len(body)
+            while self._size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.epoch = uuid.uuid4().hex
+
+    def __len__(self):
+        return len(self._entries)
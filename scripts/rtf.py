@@ -0,0 +1,354 @@
+import re
+import codecs
+
+# A single compiled tokenizer converts the control words, built below once
+# the control words it handles are defined. The text is first cut into runs
+# of plain text, joined as they are, and runs of consecutive tokens such as
+# \par\r\n\pard\sa200\f0\fs22, which repeat on every line and are converted
+# once per state they start in. Ignorable destination groups are skipped
+# with a brace-only scan.
+_BINARY = re.compile(r"\\bin(\d+)[ ]?")
+
+_FONT_TABLE_START = re.compile(r"{[^{}]*\\fonttbl")
+_FONT_ENTRY = re.compile(r"\\f(\d+).*?\\fcharset(\d+).*?([^;]+);")
+_BRACE = re.compile(r"[{}]")
+_HYPERLINK = re.compile(
+    r"(\{\\field\{\s*\\\*\\fldinst\{.*HYPERLINK\s(\".*\")\}{2}\s*\{.*?\s+(.*?)\}{2,3})",
+    re.IGNORECASE,
+)
+
+# Control words that start a destination whose contents are not document text
+DESTINATIONS = frozenset((
+    'aftncn', 'aftnsep', 'aftnsepc', 'annotation', 'atnauthor', 'atndate', 'atnicn', 'atnid',
+    'atnparent', 'atnref', 'atntime', 'atrfend', 'atrfstart', 'author', 'background',
+    'bkmkend', 'bkmkstart', 'blipuid', 'buptim', 'category', 'colorschememapping',
+    'colortbl', 'comment', 'company', 'creatim', 'datafield', 'datastore', 'defchp', 'defpap',
+    'do', 'doccomm', 'docvar', 'dptxbxtext', 'ebcend', 'ebcstart', 'factoidname', 'falt',
+    'fchars', 'ffdeftext', 'ffentrymcr', 'ffexitmcr', 'ffformat', 'ffhelptext', 'ffl',
+    'ffname', 'ffstattext', 'file', 'filetbl', 'fldinst', 'fldtype', 'fonttbl',
+    'fname', 'fontemb', 'fontfile', 'footer', 'footerf', 'footerl', 'footerr',
+    'footnote', 'formfield', 'ftncn', 'ftnsep', 'ftnsepc', 'g', 'generator', 'gridtbl',
+    'header', 'headerf', 'headerl', 'headerr', 'hl', 'hlfr', 'hlinkbase', 'hlloc', 'hlsrc',
+    'hsv', 'htmltag', 'info', 'keycode', 'keywords', 'latentstyles', 'lchars', 'levelnumbers',
+    'leveltext', 'lfolevel', 'linkval', 'list', 'listlevel', 'listname', 'listoverride',
+    'listoverridetable', 'listpicture', 'liststylename', 'listtable',
+    'lsdlockedexcept', 'macc', 'maccPr', 'mailmerge', 'maln', 'malnScr', 'manager', 'margPr',
+    'mbar', 'mbarPr', 'mbaseJc', 'mbegChr', 'mborderBox', 'mborderBoxPr', 'mbox', 'mboxPr',
+    'mchr', 'mcount', 'mctrlPr', 'md', 'mdeg', 'mdegHide', 'mden', 'mdiff', 'mdPr', 'me',
+    'mendChr', 'meqArr', 'meqArrPr', 'mf', 'mfName', 'mfPr', 'mfunc', 'mfuncPr', 'mgroupChr',
+    'mgroupChrPr', 'mgrow', 'mhideBot', 'mhideLeft', 'mhideRight', 'mhideTop', 'mhtmltag',
+    'mlim', 'mlimloc', 'mlimlow', 'mlimlowPr', 'mlimupp', 'mlimuppPr', 'mm', 'mmaddfieldname',
+    'mmath', 'mmathPict', 'mmathPr', 'mmaxdist', 'mmc', 'mmcJc', 'mmconnectstr',
+    'mmconnectstrdata', 'mmcPr', 'mmcs', 'mmdatasource', 'mmheadersource', 'mmmailsubject',
+    'mmodso', 'mmodsofilter', 'mmodsofldmpdata', 'mmodsomappedname', 'mmodsoname',
+    'mmodsorecipdata', 'mmodsosort', 'mmodsosrc', 'mmodsotable', 'mmodsoudl',
+    'mmodsoudldata', 'mmodsouniquetag', 'mmPr', 'mmquery', 'mmr', 'mnary', 'mnaryPr',
+    'mnoBreak', 'mnum', 'mobjDist', 'moMath', 'moMathPara', 'moMathParaPr', 'mopEmu',
+    'mphant', 'mphantPr', 'mplcHide', 'mpos', 'mr', 'mrad', 'mradPr', 'mrPr', 'msepChr',
+    'mshow', 'mshp', 'msPre', 'msPrePr', 'msSub', 'msSubPr', 'msSubSup', 'msSubSupPr', 'msSup',
+    'msSupPr', 'mstrikeBLTR', 'mstrikeH', 'mstrikeTLBR', 'mstrikeV', 'msub', 'msubHide',
+    'msup', 'msupHide', 'mtransp', 'mtype', 'mvertJc', 'mvfmf', 'mvfml', 'mvtof', 'mvtol',
+    'mzeroAsc', 'mzeroDesc', 'mzeroWid', 'nesttableprops', 'nextfile', 'nonesttables',
+    'objalias', 'objclass', 'objdata', 'object', 'objname', 'objsect', 'objtime', 'oldcprops',
+    'oldpprops', 'oldsprops', 'oldtprops', 'oleclsid', 'operator', 'panose', 'password',
+    'passwordhash', 'pgp', 'pgptbl', 'picprop', 'pict', 'pn', 'pnseclvl', 'pntext', 'pntxta',
+    'pntxtb', 'printim', 'private', 'propname', 'protend', 'protstart', 'protusertbl', 'pxe',
+    'result', 'revtbl', 'revtim', 'rsidtbl', 'rxe', 'shp', 'shpgrp', 'shpinst',
+    'shppict', 'shprslt', 'shptxt', 'sn', 'sp', 'staticval', 'stylesheet', 'subject', 'sv',
+    'svb', 'tc', 'template', 'themedata', 'title', 'txe', 'ud', 'upr', 'userprops',
+    'wgrffmtfilter', 'windowcaption', 'writereservation', 'writereservhash', 'xe', 'xform',
+    'xmlattrname', 'xmlattrvalue', 'xmlclose', 'xmlname', 'xmlnstbl',
+    'xmlopen',
+))
+
+# \fcharset values -> Python codecs
+CHARSETS = {
+    0: "cp1252", 42: "cp1252", 77: "mac_roman", 78: "mac_japanese",
+    79: "mac_chinesetrad", 80: "mac_korean", 81: "mac_arabic", 82: "mac_hebrew",
+    83: "mac_greek", 84: "mac_cyrillic", 85: "mac_chinesesimp", 86: "mac_rumanian",
+    87: "mac_ukrainian", 88: "mac_thai", 89: "mac_ce", 128: "cp932", 129: "cp949",
+    130: "cp1361", 134: "cp936", 136: "cp950", 161: "cp1253", 162: "cp1254",
+    163: "cp1258", 177: "cp1255", 178: "cp1256", 186: "cp1257", 204: "cp1251",
+    222: "cp874", 238: "cp1250", 254: "cp437", 255: "cp850",
+}
+
+SECTION_CHARS = {"par": "\n", "sect": "\n\n", "page": "\n\n"}
+SPECIAL_CHARS = {
+    "line": "\n", "tab": "\t", "emdash": "\u2014", "endash": "\u2013",
+    "emspace": "\u2003", "enspace": "\u2002", "qmspace": "\u2005", "bullet": "\u2022",
+    "lquote": "\u2018", "rquote": "\u2019", "ldblquote": "\u201C", "rdblquote": "\u201D",
+    "row": "\n", "cell": "|", "nestcell": "|",
+    "~": "\xa0", "\n": "\n", "\r": "\r", "{": "{", "}": "}", "\\": "\\",
+    "-": "\xad", "_": "\u2011",
+    **SECTION_CHARS,
+}
+
+
+def _word_alternation(words):
+    """
+    Return a regex alternation matching any of words, factored into a prefix
+    tree so that a word which is none of them is rejected within a character
+    or two rather than after trying every alternative.
+    """
+    branches = {}
+    for word in words:
+        branches.setdefault(word[:1], []).append(word[1:])
+    ends = "" in branches
+    parts = [re.escape(first) + _word_alternation(rest) for first, rest in sorted(branches.items()) if first]
+    if not parts:
+        return ""
+    if len(parts) == 1 and not ends:
+        return parts[0]
+    return "(?:" + "|".join(parts) + ")" + ("?" if ends else "")
+
+
+_HANDLED_WORDS = DESTINATIONS | {word for word in SPECIAL_CHARS if word.isalpha()} | {"ansicpg", "uc", "u", "f"}
+# Raw line breaks after a control word are part of its token
+_TOKEN = re.compile(
+    r"((?:\\(?!%s(?![a-zA-Z]))[a-zA-Z]{1,32}(?:-?\d{1,10})?[ ]?[\r\n]*)+)"  # 1: run of formatting words
+    r"|\\([a-zA-Z]{1,32})(-?\d{1,10})?[ ]?[\r\n]*"  # 2, 3: handled control word with optional parameter
+    r"|\\'([0-9a-fA-F]{2})"                         # 4: \'hh escaped byte
+    r"|\\([^a-zA-Z])"                               # 5: control symbol
+    r"|([{}])"                                      # 6: group start / end
+    r"|([\r\n]+)" % _word_alternation(_HANDLED_WORDS)  # 7: raw line breaks, which carry no meaning
+)
+
+
+# What follows the backslash of a control word, \'hh escape or control symbol
+_AFTER_BACKSLASH = r"(?:[a-zA-Z]{1,32}+(?:-?\d{1,10})?+[ ]?[\r\n]*+|'[0-9a-fA-F]{2}|[^a-zA-Z])"
+# A run of consecutive tokens and raw line breaks, so the plain text between
+# runs can be copied as it is. Starts with a character class rather than a
+# group, so the regex engine can search for it quickly; the quantifiers
+# never backtrack. Only a backslash ending the text is left to plain text.
+_TOKEN_RUN = re.compile(r"[\\{}\r\n](?:(?<=\\)%s|(?<=[{}\r\n]))(?:\\%s|[{}\r\n])*+"
+                        % (_AFTER_BACKSLASH, _AFTER_BACKSLASH))
+
+
+def _code_page(number):
+    """Return the codec of an \\ansicpgN code page, utf8 if Python has none."""
+    encoding = f"cp{number}"
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = "utf8"
+    return encoding
+
+
+def _font_table(text, encoding):
+    """Map font ids to codecs using the document's {\\fonttbl ...} group."""
+    start = _FONT_TABLE_START.search(text)
+    if not start:
+        return {}
+    depth = 1
+    group = text[start.start():]
+    for brace in _BRACE.finditer(text, start.end()):
+        depth += 1 if brace.group() == "{" else -1
+        if depth == 0:
+            group = text[start.start():brace.end()]
+            break
+    return {font_id: CHARSETS.get(int(charset), encoding)
+            for font_id, charset, _name in _FONT_ENTRY.findall(group)}
+
+
+def _skip_group(text, pos):
+    """
+    Return the position just after the '}' closing the group that is open at
+    ``pos``, or None if the group is never closed or must be walked token by
+    token because it changes the code page.
+
+    Uses str.find rather than a regex so embedded pictures, which are long
+    runs of hex digits, are crossed at memory speed.
+    """
+    find = text.find
+    start = pos
+    depth = 1
+    opening = find("{", pos)
+    closing = find("}", pos)
+    escape = find("\\", pos)
+    while closing != -1:
+        if escape != -1 and escape < closing and (opening == -1 or escape < opening):
+            following = text[escape + 1:escape + 2]
+            if following and following in "{}\\":
+                pos = escape + 2
+            else:
+                binary = _BINARY.match(text, escape)
+                # \binN is followed by N raw bytes that may contain braces
+                pos = binary.end() + int(binary.group(1)) if binary else escape + 1
+        elif opening != -1 and opening < closing:
+            depth += 1
+            pos = opening + 1
+        else:
+            depth -= 1
+            pos = closing + 1
+            if depth == 0:
+                if find("\\ansicpg", start, pos) != -1:
+                    return None
+                return pos
+        if opening != -1 and opening < pos:
+            opening = find("{", pos)
+        if closing < pos:
+            closing = find("}", pos)
+        if escape != -1 and escape < pos:
+            escape = find("\\", pos)
+    return None
+
+
+def _convert_run(run, fonts, errors, font, encoding, ucskip, curskip, ignorable, depth, in_document, stack):
+    """
+    Convert one run of tokens starting in the given state, for rtf_to_text().
+    Returns (text, state after the run, skip): state is None once the
+    document group closes, and skip is the position in the run where a
+    destination rtf_to_text() should try to skip starts, if one does.
+    """
+    out = []
+    hexes = []
+    for match in _TOKEN.finditer(run):
+        kind = match.lastindex
+        if hexes and kind != 4:
+            out.append(bytes.fromhex(''.join(hexes)).decode(fonts.get(font, encoding), errors))
+            hexes = []
+        if kind == 4:
+            if curskip:
+                curskip -= 1
+            elif not ignorable:
+                hexes.append(match.group(4))
+            continue
+        if kind == 7:
+            continue
+        # Formatting words have no effect on the text, but end a \uN fallback
+        curskip = 0
+        if kind == 6:
+            if match.group(6) == "{":
+                depth += 1
+                in_document = True
+                stack += ((ucskip, ignorable),)
+            else:
+                depth -= 1
+                if stack:
+                    ucskip, ignorable = stack[-1]
+                    stack = stack[:-1]
+                else:
+                    ucskip = 0
+                    ignorable = True
+                if in_document and depth <= 0:
+                    # Anything after the outer document group is discarded
+                    return ''.join(out), None, None
+        elif kind == 2 or kind == 3:
+            word = match.group(2)
+            if word in DESTINATIONS:
+                if not ignorable and depth > 0:
+                    return ''.join(out), (font, encoding, ucskip, 0, ignorable, depth, in_document, stack), match.end()
+                ignorable = True
+            elif word == "ansicpg":
+                encoding = _code_page(match.group(3))
+            elif ignorable:
+                continue
+            elif word in SPECIAL_CHARS:
+                out.append(SPECIAL_CHARS[word])
+            elif word == "f":
+                font = match.group(3)
+            elif word == "uc":
+                arg = match.group(3)
+                ucskip = int(arg) if arg else 0
+            else:
+                arg = match.group(3)
+                if arg is not None:
+                    code = int(arg)
+                    if code < 0:
+                        code += 0x10000
+                    out.append(chr(code))
+                curskip = ucskip
+        elif kind == 5:
+            symbol = match.group(5)
+            if symbol in SPECIAL_CHARS:
+                if not ignorable:
+                    out.append(SPECIAL_CHARS[symbol])
+            elif symbol == "*" and not ignorable:
+                if depth > 0:
+                    return ''.join(out), (font, encoding, ucskip, 0, ignorable, depth, in_document, stack), match.end()
+                ignorable = True
+    if hexes:
+        out.append(bytes.fromhex(''.join(hexes)).decode(fonts.get(font, encoding), errors))
+    return ''.join(out), (font, encoding, ucskip, curskip, ignorable, depth, in_document, stack), None
+
+
+def rtf_to_text(text, encoding="cp1252", errors="strict"):
+    """
+    Convert RTF to plain text.
+
+    Handles control words with numeric parameters, ``\\'hh`` escapes decoded
+    through the document's code page or font charset, ``\\uN`` characters
+    with ``\\ucN`` fallback skipping, and ignorable ``{\\*...}`` and other
+    non-text destinations. For well-formed documents without ``\\binN`` data
+    the output matches ``striprtf.rtf_to_text``; unbalanced braces and
+    binary data may convert differently.
+    """
+    if "HYPERLINK" in text:
+        # Rendered as link_text("destination"), as striprtf does
+        text = _HYPERLINK.sub("\\1(\\2)", text)
+
+    fonts = _font_table(text, encoding)
+    out = []
+    append = out.append
+    # font, code page, \ucN, fallback characters left to skip, ignorable,
+    # group depth, whether the document group was entered, and the
+    # (\ucN, ignorable) pairs of the enclosing groups
+    state = (None, encoding, 1, 0, False, 0, False, ())
+    # Converted runs per starting state; each entry also holds the table of
+    # the state it ends in, so states are only hashed when a run is new
+    tables = {}
+    table = tables.setdefault(state, {})
+    pos = 0
+    while pos is not None:
+        # Restarted only after a group skip; otherwise one pass over the text
+        start, pos = pos, None
+        for match in _TOKEN_RUN.finditer(text, start):
+            run_start, end = match.span()
+            if start < run_start:
+                plain = text[start:run_start]
+                if state[3]:
+                    state, plain = _end_fallback(state, plain)
+                    table = tables.setdefault(state, {})
+                if plain and not state[4]:
+                    append(plain)
+            start = end
+            run = text[run_start:end]
+            result = table.get(run)
+            if result is None:
+                run_text, after, skip = _convert_run(run, fonts, errors, *state)
+                result = table[run] = (run_text, after, skip, tables.setdefault(after, {}) if after else None)
+            run_text, state, skip, table = result
+            append(run_text)
+            if state is None:
+                return ''.join(out)
+            if skip is not None:
+                skip += run_start
+                skip_to = _skip_group(text, skip)
+                font, encoding, _, curskip, ignorable, depth, in_document, stack = state
+                if skip_to is None:
+                    # Never closed or changes the code page: walk it token by token
+                    pos = skip
+                    state = (font, encoding, state[2], curskip, True, depth, in_document, stack)
+                else:
+                    # Nothing left in this group can produce output
+                    depth -= 1
+                    ucskip, ignorable = stack[-1]
+                    if in_document and depth <= 0:
+                        return ''.join(out)
+                    pos = skip_to
+                    state = (font, encoding, ucskip, curskip, ignorable, depth, in_document, stack[:-1])
+                table = tables.setdefault(state, {})
+                break
+        else:
+            plain = text[start:]
+            if state[3]:
+                state, plain = _end_fallback(state, plain)
+            if plain and not state[4]:
+                append(plain)
+    return ''.join(out)
+
+
+def _end_fallback(state, plain):
+    """Drop the \\uN fallback characters still due from the start of plain text."""
+    skipped = min(state[3], len(plain))
+    return state[:3] + (state[3] - skipped,) + state[4:], plain[skipped:]
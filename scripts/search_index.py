@@ -0,0 +1,96 @@
+from collections import defaultdict
+
+# Appended to every indexed text so that each character position starts a
+# full trigram; this lets one- and two-character queries be answered from
+# the trigram prefixes alone. It never occurs in a real query.
+_PAD = '\0\0'
+
+
+class TrigramIndex:
+    """
+    Inverted index of lowercase character trigrams over note content.
+
+    Each trigram maps to the set of document ids containing it. A query is
+    answered by intersecting the posting lists of its trigrams and then
+    confirming the candidates with a plain substring test, so the results are
+    exactly those of ``query.lower() in content.lower()``.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        # One- and two-character prefixes -> trigrams starting with them
+        self._prefixes = defaultdict(set)
+        self._texts = []
+        # Removed documents keep their id; their text slot becomes None
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._texts) - self._removed
+
+    @staticmethod
+    def _trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, content):
+        """Index a document and return its id (its position in the index)."""
+        doc_id = len(self._texts)
+        text = (content or '').lower()
+        self._texts.append(text)
+        for gram in self._trigrams(text + _PAD):
+            postings = self._postings[gram]
+            if not postings:
+                self._prefixes[gram[:1]].add(gram)
+                self._prefixes[gram[:2]].add(gram)
+            postings.add(doc_id)
+        return doc_id
+
+    def remove(self, doc_id):
+        """Drop a document from the index. Other ids are unchanged."""
+        text = self._texts[doc_id]
+        if text is None:
+            return
+        self._texts[doc_id] = None
+        self._removed += 1
+        for gram in self._trigrams(text + _PAD):
+            postings = self._postings[gram]
+            postings.discard(doc_id)
+            if not postings:
+                del self._postings[gram]
+                self._prefixes[gram[:1]].discard(gram)
+                self._prefixes[gram[:2]].discard(gram)
+
+    def build(self, contents):
+        """Replace the index contents with the given documents."""
+        self._postings = defaultdict(set)
+        self._prefixes = defaultdict(set)
+        self._texts = []
+        self._removed = 0
+        for content in contents:
+            self.add(content)
+
+    def search(self, query):
+        """Return the sorted ids of documents containing ``query`` case-insensitively."""
+        needle = query.lower()
+        if not needle:
+            return [i for i, text in enumerate(self._texts) if text is not None]
+
+        if len(needle) < 3:
+            if '\0' in needle:
+                return [i for i, text in enumerate(self._texts) if text is not None and needle in text]
+            matches = set()
+            for gram in self._prefixes.get(needle, ()):
+                matches.update(self._postings[gram])
+            return sorted(matches)
+
+        grams = self._trigrams(needle)
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0].intersection(*postings[1:])
+        texts = self._texts
+        return sorted(i for i in candidates if needle in texts[i])
@@ -0,0 +1,308 @@
+import zlib
+import heapq
+import struct
+import hashlib
+import threading
+
+from scripts.fingerprints import normalize_note_text, note_fingerprint
+
+# Notes are compared on their normalized text cut into overlapping
+# SHINGLE_SIZE-byte shingles. A signature holds NUM_BINS 16-bit MinHash
+# values packed into one int; the LSH index splits it into BANDS bands of
+# ROWS values, and two notes become candidates when any band matches. With
+# 32 bands of 4 rows a pair at Jaccard similarity 0.6 is found 98.8% of the
+# time and at 0.7 over 99.9%, while pairs below 0.25 rarely share a band.
+SHINGLE_SIZE = 5
+NUM_BINS = 128
+BANDS = 32
+ROWS = NUM_BINS // BANDS
+DEFAULT_THRESHOLD = 0.6
+# clusters() compares a text with at most this many cluster leaders before
+# starting a new cluster with it, which keeps the pass linear however many
+# leaders share its bands; at worst a cluster is split, never wrongly merged
+MAX_LEADER_CHECKS = 64
+
+_VALUE_BITS = 16
+_BIN_SHIFT = 32 - (NUM_BINS.bit_length() - 1)
+_EMPTY = 0xFFFFFFFF
+_PACK = struct.Struct(f'<{NUM_BINS}H').pack
+_BAND_BITS = ROWS * _VALUE_BITS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _lane_mask(bits):
+    """An int with the low `bits` bits of every signature value set."""
+    return int.from_bytes(_PACK(*[(1 << bits) - 1] * NUM_BINS), 'little')
+
+
+_FOLDS = [(shift, _lane_mask(shift)) for shift in (8, 4, 2, 1)]
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+def shingle_hashes(text):
+    """Return the set of crc32 hashes of a note's shingles, whose Jaccard similarity signatures estimate."""
+    return _shingle_hashes(normalize_note_text(text).encode('utf-8'))
+
+
+def _shingle_hashes(data):
+    crc32 = zlib.crc32
+    return {crc32(data[i:i + SHINGLE_SIZE]) for i in range(max(1, len(data) - SHINGLE_SIZE + 1))} if data else set()
+
+
+def minhash_signature(text):
+    """
+    Return the MinHash signature of a note's text as an int, or None if it
+    has no text.
+
+    Uses one-permutation hashing: each shingle is hashed once with crc32,
+    the top bits of the hash pick one of NUM_BINS bins and each bin keeps
+    the low 16 bits of its smallest hash. Bins no shingle fell into borrow
+    the next filled bin's value (rotation densification), so short notes
+    still get comparable signatures.
+    """
+    data = normalize_note_text(text).encode('utf-8')
+    return _signature(data) if data else None
+
+
+def _signature(data):
+    values = [_EMPTY] * NUM_BINS
+    # Largest first, so the last value written to each bin is its minimum
+    for value in sorted(_shingle_hashes(data), reverse=True):
+        values[value >> _BIN_SHIFT] = value
+    if _EMPTY in values:
+        original = values[:]
+        for slot in range(NUM_BINS):
+            if original[slot] == _EMPTY:
+                distance = 1
+                while original[(slot + distance) % NUM_BINS] == _EMPTY:
+                    distance += 1
+                values[slot] = original[(slot + distance) % NUM_BINS] + distance * 0x9E37
+    return int.from_bytes(_PACK(*[value & 0xFFFF for value in values]), 'little')
+
+
+def _band_keys(signature):
+    return [(signature >> shift) & _BAND_MASK for shift in range(0, NUM_BINS * _VALUE_BITS, _BAND_BITS)]
+
+
+def _add_to_buckets(buckets, keys, group):
+    for bucket, key in zip(buckets, keys):
+        bucket.setdefault(key, []).append(group)
+
+
+def estimate_similarity(a, b):
+    """Estimate the Jaccard similarity of two notes' shingles from their signatures."""
+    # Fold each 16-bit lane of a ^ b onto its lowest bit, which is then set
+    # exactly for the values that differ
+    diff = a ^ b
+    for shift, mask in _FOLDS:
+        diff = (diff | (diff >> shift)) & mask
+    return (NUM_BINS - _popcount(diff)) / NUM_BINS
+
+
+class SimilarityIndex:
+    """
+    MinHash signatures of note texts with a banded LSH index over them.
+
+    Notes with the same signature (in practice the same normalized text) are
+    indexed once, as a numbered group. similar() only scores the groups
+    sharing a band with the query note's, and clusters() compares each group
+    with the cluster leaders it shares a band with, so neither ever compares
+    every pair of notes.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._reset()
+
+    def _reset(self):
+        # note id -> group number; groups are numbered in order of creation
+        self._note_groups = {}
+        self._group_signatures = []
+        self._group_notes = []
+        self._signature_groups = {}
+        # blake2b digest of a normalized text -> its group number
+        self._texts = {}
+        # One dict per band: band value -> numbers of the groups sharing it
+        self._buckets = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self._note_groups)
+
+    def __contains__(self, note_id):
+        return note_id in self._note_groups
+
+    def add(self, note_id, text):
+        """Index a note's text; returns False for a note with no text, which is skipped."""
+        data = normalize_note_text(text).encode('utf-8')
+        if not data:
+            return False
+        # Pasted work text repeats across sites; hash each distinct text once
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        group = self._texts.get(digest)
+        if group is None:
+            signature = _signature(data)
+            group = self._signature_groups.get(signature)
+            if group is None:
+                group = self._signature_groups[signature] = len(self._group_signatures)
+                self._group_signatures.append(signature)
+                self._group_notes.append([])
+                _add_to_buckets(self._buckets, _band_keys(signature), group)
+            self._texts[digest] = group
+        self._group_notes[group].append(note_id)
+        self._note_groups[note_id] = group
+        return True
+
+    def build(self, notes):
+        """Replace the index contents with (note id, text) pairs."""
+        self._reset()
+        for note_id, text in notes:
+            self.add(note_id, text)
+
+    def groups(self):
+        """Return the number of distinct signatures indexed."""
+        return len(self._group_signatures)
+
+    def similarity(self, a, b):
+        signatures, groups = self._group_signatures, self._note_groups
+        return estimate_similarity(signatures[groups[a]], signatures[groups[b]])
+
+    def similar(self, note_id, limit=10, threshold=None):
+        """
+        Return up to limit (note id, estimated similarity) pairs for the notes
+        most like note_id, best first and then by id. Raises KeyError for an
+        unindexed note.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signatures = self._group_signatures
+        signature = signatures[self._note_groups[note_id]]
+        candidates = set()
+        for bucket, key in zip(self._buckets, _band_keys(signature)):
+            candidates.update(bucket[key])
+        scored = []
+        for group in candidates:
+            score = estimate_similarity(signature, signatures[group])
+            if score >= threshold:
+                scored.append((score, group))
+        scored.sort(key=lambda item: -item[0])
+        matches = []
+        for position, (score, group) in enumerate(scored):
+            # Lower-scoring groups are only needed while the limit is unfilled
+            if len(matches) >= limit and score < scored[position - 1][0]:
+                break
+            ids = heapq.nsmallest(limit + 1, self._group_notes[group])
+            matches.extend((-score, other_id) for other_id in ids if other_id != note_id)
+        return [(other_id, -score) for score, other_id in heapq.nsmallest(limit, matches)]
+
+    def clusters(self, threshold=None, min_size=2, progress=None):
+        """
+        Group the indexed notes into clusters of near-duplicates, largest
+        first, each as a sorted list of note ids.
+
+        Distinct texts are visited in order of their first note. Each joins
+        the first cluster whose leader (first text) shares a band with it and
+        resembles it at least ``threshold``, trying up to MAX_LEADER_CHECKS
+        leaders from its least shared bands first; otherwise it leads a new
+        cluster. Every member is therefore close to its leader, and clusters
+        do not chain together through a series of slightly different notes.
+        progress('clustered') is called once per note.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signatures = self._group_signatures
+        leaders = [{} for _ in range(BANDS)]
+        members = {}
+        order = sorted(range(len(signatures)), key=lambda group: min(self._group_notes[group]))
+        for group in order:
+            signature = signatures[group]
+            keys = _band_keys(signature)
+            match = self._find_leader(signature, keys, leaders, threshold)
+            if match is None:
+                members[group] = list(self._group_notes[group])
+                _add_to_buckets(leaders, keys, group)
+            else:
+                members[match].extend(self._group_notes[group])
+            if progress:
+                progress('clustered', len(self._group_notes[group]))
+        found = [sorted(ids) for ids in members.values() if len(ids) >= min_size]
+        found.sort(key=lambda ids: (-len(ids), ids[0]))
+        return found
+
+    def _find_leader(self, signature, keys, leaders, threshold):
+        signatures = self._group_signatures
+        checked = set()
+        # Bands shared by few leaders are the most specific, so try those first
+        shared = sorted(filter(None, (bucket.get(key) for bucket, key in zip(leaders, keys))), key=len)
+        for bucket in shared:
+            for leader in bucket:
+                if leader in checked:
+                    continue
+                if estimate_similarity(signature, signatures[leader]) >= threshold:
+                    return leader
+                checked.add(leader)
+                if len(checked) >= MAX_LEADER_CHECKS:
+                    return None
+        return None
+
+
+class NoteSimilarity:
+    """
+    A SimilarityIndex kept in step with a note store (SqliteNoteStore or
+    NoteStore).
+
+    Notes are added with increasing ids, so refresh() indexes just the notes
+    after the last one it saw. Notes can also be removed (replace_source()),
+    which the store's note count reveals: once fewer notes remain than were
+    read, or the last note read is gone or its text changed (a JSON corpus
+    replaced on disk), the index is rebuilt and holds only current notes.
+    """
+
+    def __init__(self, note_store, threshold=DEFAULT_THRESHOLD, batch_size=5000):
+        self.note_store = note_store
+        self.batch_size = batch_size
+        self.index = SimilarityIndex(threshold)
+        self._lock = threading.Lock()
+        self._generation = None
+        self._last = None
+        # Notes read into the index since it was last rebuilt
+        self._read = 0
+
+    def _reset(self):
+        self.index = SimilarityIndex(self.index.threshold)
+        self._last = None
+        self._read = 0
+
+    def _last_still_present(self):
+        if self._last is None:
+            return True
+        last_id, fingerprint = self._last
+        notes = self.note_store.get_notes_by_id([last_id])
+        return bool(notes) and note_fingerprint(notes[0].get('site'), notes[0].get('content')) == fingerprint
+
+    def _index_new_notes(self, progress):
+        while True:
+            after = None if self._last is None else self._last[0]
+            notes = self.note_store.query_notes(after=after, limit=self.batch_size)
+            if not notes:
+                break
+            for note in notes:
+                self.index.add(note['id'], note.get('content'))
+            self._read += len(notes)
+            if progress:
+                progress('indexed', len(notes))
+            note = notes[-1]
+            self._last = (note['id'], note_fingerprint(note.get('site'), note.get('content')))
+
+    def refresh(self, progress=None):
+        """Index notes added since the last call and return the index; progress('indexed') counts notes read."""
+        with self._lock:
+            generation = self.note_store.generation()
+            if generation == self._generation:
+                return self.index
+            if not self._last_still_present():
+                self._reset()
+            self._index_new_notes(progress)
+            if self._read != self.note_store.count_notes():
+                # Notes were removed since the index was built
+                self._reset()
+                self._index_new_notes(progress)
+            self._generation = generation
+            return self.index
@@ -0,0 +1,259 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+
+# inotify(7) event flags
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct('iIII')
+
+
+def is_ignored(name):
+    """Hidden files and the temp files written by atomic replaces are never reported."""
+    return name.startswith('.') or name.endswith('.tmp')
+
+
+def _load_inotify():
+    """Return libc if it provides inotify, otherwise None."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class _InotifySource:
+    """Recursive inotify watch over a directory tree."""
+
+    def __init__(self, libc, root):
+        self.libc = libc
+        self.root = root
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+
+    def _watch_tree(self, directory, changed):
+        """Watch directory and its subdirectories; files already in them are reported."""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return
+        self._dirs[wd] = directory
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if is_ignored(entry.name):
+                continue
+            if changed is not None:
+                changed.add(os.path.relpath(entry.path, self.root))
+            if entry.is_dir(follow_symlinks=False):
+                self._watch_tree(entry.path, changed)
+
+    def start(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._watch_tree(self.root, None)
+
+    def read(self, timeout):
+        """
+        Wait up to timeout seconds and return the set of relative paths that
+        changed, or None if events were lost and everything must be rescanned.
+        Events for ignored names alone keep waiting, so they never end a
+        quiet period early.
+        """
+        deadline = time.monotonic() + timeout
+        changed = set()
+        while not changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                break
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    continue
+                raise
+            if self._read_events(data, changed) is None:
+                return None
+        return changed
+
+    def _read_events(self, data, changed):
+        """Add the paths named by a buffer of events to changed; None if events were lost."""
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            directory = self._dirs.get(wd)
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if directory is None:
+                continue
+            if not name:
+                # The watched directory itself was removed or moved away
+                if directory != self.root:
+                    changed.add(os.path.relpath(directory, self.root))
+                continue
+            if is_ignored(name):
+                continue
+            path = os.path.join(directory, name)
+            changed.add(os.path.relpath(path, self.root))
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(path, changed)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingSource:
+    """Detect changes by comparing (mtime_ns, size, inode) snapshots of the tree."""
+
+    def __init__(self, root, interval):
+        self.root = root
+        self.interval = interval
+        self._snapshot = {}
+
+    def _scan(self, directory, snapshot):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if is_ignored(entry.name):
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            snapshot[os.path.relpath(entry.path, self.root)] = (stat.st_mtime_ns, stat.st_size, entry.inode())
+            if entry.is_dir(follow_symlinks=False):
+                self._scan(entry.path, snapshot)
+
+    def start(self):
+        self._scan(self.root, self._snapshot)
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = {}
+        self._scan(self.root, snapshot)
+        changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+        changed.update(path for path in self._snapshot if path not in snapshot)
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class DataDirWatcher:
+    """
+    Background thread reporting changes below a data directory.
+
+    Uses inotify on Linux and falls back to polling elsewhere. Changes are
+    collected until the tree has been quiet for ``debounce`` seconds (or for
+    at most ``max_delay`` seconds during a long burst) and then passed to
+    ``callback`` as a set of paths relative to the directory
+    (files or directories that were added, modified or removed). The
+    callback receives None when events were lost and it should rescan.
+    """
+
+    def __init__(self, data_dir, callback, poll_interval=2.0, debounce=0.2, max_delay=2.0):
+        self.data_dir = data_dir
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.mode = None
+        self._source = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start watching. Changes made after this returns are reported."""
+        libc = _load_inotify()
+        source = None
+        if libc is not None:
+            try:
+                source = _InotifySource(libc, self.data_dir)
+                source.start()
+                self.mode = 'inotify'
+            except OSError as e:
+                logging.warning(f"inotify unavailable, polling {self.data_dir} instead: {e}")
+                source = None
+        if source is None:
+            source = _PollingSource(self.data_dir, self.poll_interval)
+            source.start()
+            self.mode = 'polling'
+        self._source = source
+        self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _deliver(self, changes):
+        try:
+            self.callback(changes)
+        except Exception as e:
+            logging.error(f"Error applying changes under {self.data_dir}: {e}")
+
+    def _run(self):
+        pending = set()
+        first_change = None
+        try:
+            while not self._stop.is_set():
+                changed = self._source.read(self.debounce if pending else 0.5)
+                if changed is None:
+                    pending = set()
+                    self._deliver(None)
+                    continue
+                if changed:
+                    if not pending:
+                        first_change = time.monotonic()
+                    pending |= changed
+                if pending and (not changed or time.monotonic() - first_change >= self.max_delay):
+                    # Quiet for one debounce period, or busy for too long
+                    batch, pending = pending, set()
+                    self._deliver(batch)
+        finally:
+            self._source.close()
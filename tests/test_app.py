@@ -0,0 +1,171 @@
+import importlib
+import sys
+import time
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """app.py imported once, with its store, data directory and preferences under a temp directory."""
+    root = tmp_path_factory.mktemp('app')
+    patch = pytest.MonkeyPatch()
+    patch.chdir(root)
+    patch.setenv('NOTES_BACKEND', 'sqlite')
+    patch.setenv('NOTES_DB', str(root / 'notes.db'))
+    patch.setenv('DATA_WATCHER', '0')
+    patch.delenv('RESPONSE_CACHE_MB', raising=False)
+    sys.modules.pop('app', None)
+    yield importlib.import_module('app')
+    sys.modules.pop('app', None)
+    patch.undo()
+
+
+@pytest.fixture
+def client(app_module):
+    app_module.response_cache.clear()
+    return app_module.app.test_client()
+
+
+def add_note(client, content):
+    response = client.post('/api/notes', json={'site': 'King', 'equipment': 'FP 1', 'content': content})
+    assert response.status_code == 200
+    assert response.get_json()['success']
+
+
+def test_response_carries_an_etag_and_revalidates_with_304(client):
+    add_note(client, 'Replaced PPU')
+    response = client.get('/api/notes?site=King')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    revalidated = client.get('/api/notes?site=King', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+
+
+def test_adding_a_note_changes_the_etag(client):
+    add_note(client, 'Purged CRIND')
+    etag = client.get('/api/notes?site=King').headers['ETag']
+
+    add_note(client, 'Cleaned nozzle')
+    response = client.get('/api/notes?site=King', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Cleaned nozzle' in [note['content'] for note in response.get_json()['notes']]
+
+
+def test_error_responses_are_not_cached_and_have_no_etag(client, app_module, monkeypatch):
+    response = client.get('/api/notes?limit=0')
+    assert response.status_code == 400
+    assert 'ETag' not in response.headers
+    assert len(app_module.response_cache) == 0
+
+    # A store failure is reported with a 200 but must not be served again
+    def fail(*args, **kwargs):
+        raise RuntimeError('database is locked')
+    monkeypatch.setattr(app_module.note_store, 'count_notes', fail)
+    response = client.get('/api/notes?search=ppu')
+    assert response.status_code == 200
+    assert not response.get_json()['success']
+    assert 'ETag' not in response.headers
+    assert len(app_module.response_cache) == 0
+
+    monkeypatch.undo()
+    response = client.get('/api/notes?search=ppu')
+    assert response.get_json()['success']
+    assert 'ETag' in response.headers
+
+
+def test_export_link_carries_the_date_filter(client):
+    add_note(client, 'Replaced hose')
+    page = client.post('/', data={'site_filter': 'King', 'date_filter': 'custom',
+                                  'date_from': '2025-03-01', 'date_to': '2025-03-31'}).get_data(as_text=True)
+    assert 'date_filter: "custom"' in page
+    assert 'date_from: "2025-03-01"' in page
+    assert 'date_to: "2025-03-31"' in page
+
+    # The same parameters narrow the export to the range
+    params = {'format': 'ndjson', 'site': 'King', 'date_filter': 'custom'}
+    assert 'Replaced hose' not in client.get('/api/export', query_string={
+        **params, 'date_from': '2025-03-01', 'date_to': '2025-03-31'}).get_data(as_text=True)
+    assert 'Replaced hose' in client.get('/api/export', query_string=params).get_data(as_text=True)
+
+
+def wait_for_job(client, status_url):
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        job = client.get(status_url).get_json()['job']
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'{status_url} did not finish')
+
+
+def test_similar_notes_and_clusters_forget_removed_notes(client, app_module):
+    text = 'Replaced the PPU board in the premium position and tested the dispenser'
+    notes = [{'site': 'Oak Ridge', 'equipment': 'FP 3', 'content': content, 'date': '2025-03-01'}
+             for content in (text, text.lower() + '.')]
+    app_module.note_store.replace_source('Oak Ridge/FP 3.json', notes)
+    add_note(client, text + ' again')
+    removed = [note['id'] for note in app_module.note_store.query_notes(site='Oak Ridge')]
+    kept = app_module.note_store.query_notes('again')[0]['id']
+
+    response = client.get(f'/api/notes/{removed[0]}/similar')
+    assert [note['id'] for note in response.get_json()['notes']] == [removed[1], kept]
+    job = wait_for_job(client, client.post('/api/clusters').get_json()['status_url'])
+    assert job['result']['largest'][0]['note_ids'] == removed + [kept]
+
+    app_module.note_store.replace_source('Oak Ridge/FP 3.json', [])
+    assert client.get(f'/api/notes/{removed[0]}/similar').status_code == 404
+    assert client.get(f'/api/notes/{kept}/similar').get_json()['notes'] == []
+    job = wait_for_job(client, client.post('/api/clusters').get_json()['status_url'])
+    assert job['status'] == 'succeeded'
+    assert all(kept not in cluster['note_ids'] for cluster in job['result']['largest'])
+
+
+@pytest.mark.parametrize('note', [
+    {'site': 'King', 'content': 'Replaced filter', 'date': 20250301},
+    {'site': 'King', 'equipment': 7, 'content': 'Replaced filter'},
+    {'site': ['King'], 'content': 'Replaced filter'},
+    ['King', 'Replaced filter'],
+])
+def test_add_note_rejects_malformed_fields_before_writing(client, app_module, note):
+    count = app_module.note_store.count_notes()
+    response = client.post('/api/notes', json=note)
+    assert response.status_code == 400
+    assert not response.get_json()['success']
+    assert app_module.note_store.count_notes() == count
+
+
+def test_lock_file_writes_keep_the_response_cache(client, app_module):
+    client.get('/api/notes?site=King')
+    assert len(app_module.response_cache) > 0
+    app_module.apply_data_changes({'notes.lock'})
+    assert len(app_module.response_cache) > 0
+
+    app_module.apply_data_changes({'notes.lock', 'notes.json'})
+    assert len(app_module.response_cache) == 0
+
+
+def test_requests_are_counted_in_metrics_and_timed_in_server_timing(client):
+    response = client.get('/api/notes?site=King')
+    timing = response.headers['Server-Timing'].split(', ')
+    assert timing[-1].startswith('total;dur=')
+    assert any(entry.startswith('filter;dur=') for entry in timing)
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert any(line.startswith('http_requests_total{endpoint="api_get_notes",method="GET",status="200"} ')
+               for line in lines)
+    assert any(line.startswith('http_request_duration_seconds_count{endpoint="api_get_notes"} ') for line in lines)
+
+
+def test_slow_requests_are_profiled(client, app_module, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'profiler', app_module.SlowRequestProfiler(0, output_dir=str(tmp_path)))
+    assert client.get('/api/notes?site=King').status_code == 200
+    assert [path.suffix for path in tmp_path.iterdir()] == ['.prof']
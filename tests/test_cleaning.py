@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from benchmarks.bench_cleaning import (legacy_clean_html_text, legacy_split_site_header, legacy_strip_code_lines,
+                                       make_html_notes, make_plain_notes)
+from scripts.cleaning import clean_html_text, split_site_header, strip_code_lines
+
+PLAIN = make_plain_notes(2000, random.Random(1)) + [
+    '',
+    '\n\n\n',
+    'Site: King\nReplaced PPU',
+    'replaced ppu\nsiteid:   Great Stop 18   \nsite: second header',
+    'no newline after Site: King',
+    '  # indented heading\n*\tbullet with a tab\n*not a bullet\n// comment\nkept',
+]
+HTML = make_html_notes(2000, random.Random(2)) + ['', '&amp;lt;b&amp;gt;', '<p>a</p>\n\t<p>b</p>', '<unclosed']
+
+
+@pytest.mark.parametrize('engine, legacy, samples', [
+    (strip_code_lines, legacy_strip_code_lines, PLAIN),
+    (split_site_header, legacy_split_site_header, PLAIN),
+    (clean_html_text, legacy_clean_html_text, HTML),
+], ids=['strip_code_lines', 'split_site_header', 'clean_html_text'])
+def test_matches_the_per_line_regex_implementation(engine, legacy, samples):
+    for sample in samples:
+        assert engine(sample) == legacy(sample), sample
+
+
+def test_cleans_a_sticky_note():
+    text = strip_code_lines('Site: 711 #36064 - King NC\n\n\n// pasted code\nReplaced PPU\n# heading\n  Tested')
+    assert text == 'Site: 711 #36064 - King NC\nReplaced PPU\n  Tested'
+    assert split_site_header(text) == ('711 #36064 - King NC', 'Replaced PPU\n  Tested')
+    assert split_site_header('Replaced PPU') == ('Uncategorized', 'Replaced PPU')
@@ -0,0 +1,144 @@
+import importlib
+import os
+import random
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def data_extractor(tmp_path_factory):
+    """scripts.data_extractor imported from a temp directory, where it creates its log directory."""
+    root = tmp_path_factory.mktemp('extractor')
+    patch = pytest.MonkeyPatch()
+    patch.chdir(root)
+    os.makedirs(os.path.join('c:', 'LocalStorage', 'Sticky_Note_Compiler', 'logs'))
+    sys.modules.pop('scripts.data_extractor', None)
+    yield importlib.import_module('scripts.data_extractor')
+    sys.modules.pop('scripts.data_extractor', None)
+    patch.undo()
+
+
+@pytest.fixture
+def extractor(data_extractor):
+    return data_extractor.DataExtractor()
+
+
+CSV = (
+    'Location,Asset,Created,Notes,Technician\n'
+    'King,FP 1,2025-03-01T09:00:00,Replaced PPU,Sam\n'
+    ',FP 5,2025-03-12,Purged CRIND,Ana\n'
+    'Jamestown,,,  ,Ana\n'
+    'Jamestown\n'
+    'Jamestown,FP 2,03/04/2025,"Cleaned nozzle\nand hose",Sam\n'
+)
+
+EXPECTED = [
+    {'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU', 'date': '2025-03-01 09:00:00'},
+    {'site': 'Uncategorized', 'equipment': 'FP 5', 'content': 'Purged CRIND', 'date': '2025-03-12 00:00:00'},
+    {'site': 'Jamestown', 'equipment': 'FP 2', 'content': 'Cleaned nozzle\nand hose', 'date': '03/04/2025'},
+]
+
+
+def test_csv_is_mapped_the_same_from_a_file_and_a_directory(extractor, tmp_path):
+    (tmp_path / 'export.csv').write_text(CSV, encoding='utf-8')
+    assert extractor.extract_from_file(str(tmp_path / 'export.csv')) == EXPECTED
+    assert list(extractor.iter_directory(str(tmp_path), parse_workers=1)) == [('export.csv', EXPECTED)]
+    assert extractor.extract_from_directory(str(tmp_path), parse_workers=1) == {'export.csv': EXPECTED}
+
+
+def test_csv_columns_from_the_config_apply_to_both_paths(extractor, tmp_path):
+    extractor.config = {'csv_columns': {'site': 'Technician'}}
+    (tmp_path / 'export.csv').write_text(CSV, encoding='utf-8')
+    expected = [dict(note, site=site) for note, site in zip(EXPECTED, ('Sam', 'Ana', 'Sam'))]
+    assert extractor.extract_from_file(str(tmp_path / 'export.csv')) == expected
+    assert list(extractor.iter_directory(str(tmp_path), parse_workers=1)) == [('export.csv', expected)]
+
+
+def test_ingest_csv_streams_batches_into_a_store(extractor, tmp_path):
+    from scripts.note_db import SqliteNoteStore
+
+    (tmp_path / 'export.csv').write_text(CSV + 'King,FP 1,2025-03-02,replaced  ppu,Sam\n', encoding='utf-8')
+    store = SqliteNoteStore(str(tmp_path / 'notes.db'))
+    assert extractor.ingest_csv(str(tmp_path / 'export.csv'), store, batch_size=2) == (4, 3)
+    assert [{k: v for k, v in note.items() if k != 'id'} for note in store.get_notes()] == EXPECTED
+
+
+def without_timestamps(data):
+    """data with the per-call extracted_at stamps of text notes dropped."""
+    if isinstance(data, dict):
+        return {key: without_timestamps(value) for key, value in data.items() if key != 'extracted_at'}
+    if isinstance(data, list):
+        return [without_timestamps(value) for value in data]
+    return data
+
+
+def write_tree(root):
+    files = {
+        'King/notes.md': '# Pump 1\nReplaced PPU\n\n## Pump 2\nPurged CRIND\n',
+        'King/list.txt': 'Tasks\n- Cleaned nozzle\n- Reset breaker\n',
+        'King/old/paragraphs.txt': 'Replaced hose\n\n\nChecked filter\n',
+        'King/old/export.csv': CSV,
+        'Jamestown/notes.json': '[{"site": "Jamestown", "content": "Replaced hose"}]',
+        'Jamestown/empty.json': '',
+        'Jamestown/broken.json': '{"site": ',
+        'Jamestown/plain.txt': 'just one line',
+        'Jamestown/skipped.log': 'not a note file',
+        'top.md': '### Site\ntext',
+    }
+    for relpath, content in files.items():
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+
+def test_directory_stream_matches_the_recursive_walk(extractor, tmp_path):
+    from benchmarks.bench_directory_ingest import legacy_extract_from_directory
+
+    def stream(**kwargs):
+        return [(relpath, without_timestamps(data))
+                for relpath, data in extractor.iter_directory(str(tmp_path), **kwargs)]
+
+    write_tree(tmp_path)
+    records = stream(parse_workers=1, batch_size=3)
+    assert [relpath for relpath, _ in records] == [os.path.join(*relpath.split('/')) for relpath in [
+        'Jamestown/broken.json', 'Jamestown/empty.json', 'Jamestown/notes.json', 'Jamestown/plain.txt',
+        'King/list.txt', 'King/notes.md', 'King/old/export.csv', 'King/old/paragraphs.txt', 'top.md']]
+    assert stream(io_workers=2, parse_workers=2, batch_size=2) == records
+    for relpath, data in records:
+        assert data == without_timestamps(extractor.extract_from_file(str(tmp_path / relpath)))
+
+    nested = without_timestamps(extractor.extract_from_directory(str(tmp_path), parse_workers=1))
+    assert nested == without_timestamps(legacy_extract_from_directory(extractor, str(tmp_path)))
+    assert [relpath for relpath, _ in stream(recursive=False, parse_workers=1)] == ['top.md']
+
+
+SEGMENTATION_CASES = [
+    '# Pump 1\nReplaced PPU\n\n## Pump 2\nPurged CRIND\n',
+    '#\t\nheader text on the next line\n####### seven hashes\n',
+    'Tasks\n- Cleaned nozzle\n-\n- \n1. Reset breaker\n12. Checked relay',
+    '- first line is not after a newline\n- second',
+    'Replaced hose\r\n\r\n\n\nChecked filter\x0c\n\n' + 'x' * 60,
+    '\n\n\nonly trailing and leading blanks\n\n\n',
+    'one paragraph\nno structure',
+    '',
+]
+
+
+def test_segmentation_matches_the_scans_it_replaced(data_extractor):
+    from benchmarks.bench_segmentation import fuzz_documents, legacy_identify_notes_in_text
+
+    def notes(function, text):
+        return without_timestamps(function(text))
+
+    for text in SEGMENTATION_CASES + list(fuzz_documents(2000, random.Random(1))):
+        assert notes(data_extractor.identify_notes_in_text, text) == notes(legacy_identify_notes_in_text, text), text
+
+
+def test_segmentation_stamps_every_note_of_a_call_alike(data_extractor):
+    text = ''.join(f'## Note {i}\nbody {i}\n' for i in range(50))
+    notes = data_extractor.identify_notes_in_text(text)
+    assert len(notes) == 50
+    assert len({note['extracted_at'] for note in notes}) == 1
+    lazy = data_extractor.iter_notes_in_text(text, extracted_at='2025-03-01T09:00:00')
+    assert next(lazy) == {'title': 'Note 0', 'level': 2, 'content': 'body 0', 'extracted_at': '2025-03-01T09:00:00'}
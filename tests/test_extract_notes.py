@@ -0,0 +1,92 @@
+import os
+import sqlite3
+
+import pytest
+
+import extract_notes as extract_notes_module
+from extract_notes import FINGERPRINT_INDEX_NAME, extract_notes, extract_notes_incremental
+from scripts.fingerprints import FingerprintIndex
+
+
+def write_plum(path, notes):
+    """Replace the Note table of a plum.sqlite at path with (id, text) rows."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('DROP TABLE IF EXISTS Note')
+        conn.execute('CREATE TABLE Note(Id, Text)')
+        conn.executemany('INSERT INTO Note VALUES (?, ?)', notes)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def note(text):
+    """A Sticky Notes RTF body filed under the King site."""
+    return r'{\rtf1 Site: King\par ' + text + '}'
+
+
+def filed_texts(data_dir):
+    """Return the sorted texts of every note file under data_dir."""
+    texts = []
+    for root, _, files in os.walk(data_dir):
+        for name in files:
+            if name.endswith('.txt'):
+                with open(os.path.join(root, name), encoding='utf-8') as f:
+                    texts.append(f.read())
+    return sorted(texts)
+
+
+def extract(plum, data_dir, notes):
+    write_plum(plum, notes)
+    return extract_notes_incremental(str(plum), str(data_dir))
+
+
+def test_duplicate_keeps_file_when_owner_is_deleted(tmp_path):
+    plum, data_dir = tmp_path / 'plum.sqlite', tmp_path / 'data'
+    extract(plum, data_dir, [('a', note('Replaced PPU')), ('b', note('Replaced PPU'))])
+    assert filed_texts(data_dir) == ['Replaced PPU']
+
+    assert extract(plum, data_dir, [('b', note('Replaced PPU'))])['removed'] == 1
+    assert filed_texts(data_dir) == ['Replaced PPU']
+
+    extract(plum, data_dir, [])
+    assert filed_texts(data_dir) == []
+
+
+def test_duplicate_keeps_file_when_owner_is_edited(tmp_path):
+    plum, data_dir = tmp_path / 'plum.sqlite', tmp_path / 'data'
+    extract(plum, data_dir, [('c', note('Fixed fuse')), ('d', note('Fixed fuse'))])
+
+    extract(plum, data_dir, [('c', note('Fixed fuse and relay')), ('d', note('Fixed fuse'))])
+    assert filed_texts(data_dir) == ['Fixed fuse', 'Fixed fuse and relay']
+
+    extract(plum, data_dir, [('c', note('Fixed fuse and relay')), ('d', note('Checked relay'))])
+    assert filed_texts(data_dir) == ['Checked relay', 'Fixed fuse and relay']
+
+
+def test_full_extraction_only_adds_files(tmp_path):
+    plum, data_dir = tmp_path / 'plum.sqlite', tmp_path / 'data'
+    write_plum(plum, [('e', note('Reset breaker'))])
+    extract_notes(str(plum), str(data_dir))
+    write_plum(plum, [('e', note('Reset breaker twice'))])
+    assert extract_notes(str(plum), str(data_dir)) == {'King': 2}
+    assert filed_texts(data_dir) == ['Reset breaker', 'Reset breaker twice']
+
+
+def test_incremental_extraction_saves_the_index_when_it_fails(tmp_path, monkeypatch):
+    plum, data_dir = tmp_path / 'plum.sqlite', tmp_path / 'data'
+    write_plum(plum, [('f', note('Replaced PPU')), ('g', note('Purged CRIND'))])
+
+    def prepare_batch(raw_texts):
+        if 'CRIND' in raw_texts[0]:
+            raise RuntimeError('worker crashed')
+        return [extract_notes_module.prepare_note(raw_text) for raw_text in raw_texts]
+
+    monkeypatch.setattr(extract_notes_module, 'prepare_batch', prepare_batch)
+    with pytest.raises(RuntimeError):
+        extract_notes_incremental(str(plum), str(data_dir), batch_size=1)
+    assert filed_texts(data_dir) == ['Replaced PPU']
+    # Saved with the note holding the file, which a rescan of the files cannot recover
+    index = FingerprintIndex(str(data_dir / FINGERPRINT_INDEX_NAME))
+    assert list(index.paths()) == [os.path.join('King', 'note_1.txt')]
+    assert index.holders == {index.fingerprint_of(os.path.join('King', 'note_1.txt')): {'f'}}
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from scripts.jobs import JobConflict, JobQueue
+
+
+def wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.active:
+        assert time.time() < deadline, f'{job.kind} job did not finish'
+        time.sleep(0.005)
+    return job
+
+
+def test_job_reports_progress_and_result():
+    def extract(job):
+        job.advance('read', 10)
+        job.advance('written', 4)
+        job.advance('written')
+        return {'changed': 5}
+
+    job = wait(JobQueue().submit('extract', extract, stages=('read', 'written')))
+    state = job.to_dict()
+    assert state['status'] == 'succeeded'
+    assert state['progress'] == {'read': 10, 'written': 5}
+    assert state['result'] == {'changed': 5}
+    assert state['error'] is None
+    assert state['elapsed'] >= 0
+
+
+def test_second_job_of_a_kind_is_rejected_while_one_is_active():
+    queue = JobQueue()
+    release = threading.Event()
+    running = queue.submit('extract', lambda job: release.wait(5))
+
+    with pytest.raises(JobConflict) as conflict:
+        queue.submit('extract', lambda job: None)
+    assert conflict.value.job is running
+    # Other kinds are not held up
+    assert wait(queue.submit('clusters', lambda job: 'done')).result == 'done'
+
+    release.set()
+    wait(running)
+    assert wait(queue.submit('extract', lambda job: 'again')).result == 'again'
+
+
+def test_failed_job_keeps_its_error_and_history_is_bounded():
+    queue = JobQueue(history=3)
+
+    def fail(job):
+        raise ValueError('plum.sqlite not found')
+
+    failed = wait(queue.submit('extract', fail))
+    assert failed.status == 'failed'
+    assert failed.error == 'plum.sqlite not found'
+    assert queue.get(failed.id) is failed
+
+    jobs = [wait(queue.submit('extract', lambda job: None)) for _ in range(3)]
+    assert queue.get(failed.id) is None
+    assert all(queue.get(job.id) is job for job in jobs)
+    assert queue.get('unknown') is None
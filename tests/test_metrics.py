@@ -0,0 +1,62 @@
+import pstats
+
+from scripts.metrics import MetricsRegistry, SlowRequestProfiler, finish_request, server_timing, span, start_request
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.inc('http_requests_total', endpoint='index', method='GET', status=200)
+    registry.inc('http_requests_total', 2, endpoint='index', method='GET', status=200)
+    registry.inc('custom_total', label='say "hi"\n')
+    registry.observe('span_duration_seconds', 0.004, span='db')
+    registry.observe('span_duration_seconds', 20, span='db')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE http_requests_total counter' in lines
+    assert 'http_requests_total{endpoint="index",method="GET",status="200"} 3' in lines
+    assert '# TYPE custom_total untyped' in lines
+    assert 'custom_total{label="say \\"hi\\"\\n"} 1' in lines
+    assert '# TYPE span_duration_seconds histogram' in lines
+    assert 'span_duration_seconds_bucket{span="db",le="0.0025"} 0' in lines
+    assert 'span_duration_seconds_bucket{span="db",le="0.005"} 1' in lines
+    assert 'span_duration_seconds_bucket{span="db",le="10.0"} 1' in lines
+    assert 'span_duration_seconds_bucket{span="db",le="+Inf"} 2' in lines
+    assert 'span_duration_seconds_sum{span="db"} 20.004000' in lines
+    assert 'span_duration_seconds_count{span="db"} 2' in lines
+
+
+def test_spans_are_collected_per_request():
+    with span('outside'):
+        pass
+    start_request()
+    with span('query'):
+        pass
+    with span('query'):
+        pass
+    with span('render'):
+        pass
+    spans = finish_request()
+    assert [name for name, _ in spans] == ['query', 'query', 'render']
+    assert finish_request() == []
+
+    header = server_timing([('query', 0.001), ('render', 0.0025), ('query', 0.002)], total=0.01)
+    assert header == 'query;dur=3.00, render;dur=2.50, total;dur=10.00'
+
+
+def test_profiler_keeps_stats_of_slow_requests_only(tmp_path):
+    profiler = SlowRequestProfiler(0.5, output_dir=str(tmp_path / 'profiles'))
+    profile = profiler.start()
+    assert profile is not None
+    # One request at a time
+    assert profiler.start() is None
+    assert profiler.finish(profile, 0.1, 'GET_/api/notes') is None
+    assert not (tmp_path / 'profiles').exists()
+
+    profile = profiler.start()
+    sum(range(1000))
+    path = profiler.finish(profile, 0.75, 'GET_/api/notes')
+    assert path.startswith(str(tmp_path / 'profiles'))
+    assert path.endswith('_GET__api_notes_750ms.prof')
+    assert pstats.Stats(path).total_calls > 0
+
+    assert SlowRequestProfiler(0, sample_rate=0).start() is None
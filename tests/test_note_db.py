@@ -0,0 +1,146 @@
+import json
+import sqlite3
+
+import pytest
+
+from scripts.facets import FacetCounts
+from scripts.note_db import SCHEMA_VERSION, SqliteNoteStore
+
+NOTES = [
+    {'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU in premium position', 'date': '2025-03-03 09:00:00'},
+    {'site': 'King', 'equipment': 'FP 5', 'content': 'Purged CRIND', 'date': '2025-03-12 14:30:00'},
+    {'site': 'Jamestown', 'equipment': 'FP 1', 'content': 'Cleaned ppu ribbon', 'date': '2025-04-02 08:15:00'},
+    {'site': 'Jamestown', 'equipment': None, 'content': 'Printer out of paper', 'date': '2025-04-06 17:45:00'},
+    {'site': 'King', 'equipment': 'FP 6', 'content': 'Undated PPU check', 'date': None},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteNoteStore(str(tmp_path / 'notes.db'))
+    for note in NOTES:
+        store.add_note(dict(note))
+    return store
+
+
+def contents(notes):
+    return [note['content'] for note in notes]
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'site': 'King'}, ['Replaced PPU in premium position', 'Purged CRIND', 'Undated PPU check']),
+    ({'query': 'ppu'}, ['Replaced PPU in premium position', 'Cleaned ppu ribbon', 'Undated PPU check']),
+    # Shorter than a trigram, so matched by the table scan alone
+    ({'query': 'Pu'}, ['Replaced PPU in premium position', 'Purged CRIND', 'Cleaned ppu ribbon', 'Undated PPU check']),
+    ({'query': 'ppu', 'site': 'Jamestown'}, ['Cleaned ppu ribbon']),
+    ({'date_from': '2025-03-10', 'date_to': '2025-04-03'}, ['Purged CRIND', 'Cleaned ppu ribbon']),
+    ({'query': 'ppu', 'date_from': '2025-04'}, ['Cleaned ppu ribbon']),
+    ({'site': 'King', 'date_to': '2025-03-12'}, ['Replaced PPU in premium position']),
+    ({'query': 'no such note'}, []),
+])
+def test_query_and_count_apply_site_search_and_date_filters(store, filters, expected):
+    assert contents(store.query_notes(**filters)) == expected
+    assert store.count_notes(**filters) == len(expected)
+    assert store.facet_notes(**filters)['total'] == len(expected)
+
+
+def test_facet_counts_follow_inserts(store):
+    facets = store.facet_counts()
+    assert facets['site'] == {'Jamestown': 2, 'King': 3}
+    assert facets['equipment'] == {'FP 1': 2, 'FP 5': 1, 'FP 6': 1}
+    assert facets['week'] == {'2025-03-03': 1, '2025-03-10': 1, '2025-03-31': 2}
+    assert facets['month'] == {'2025-03': 2, '2025-04': 2}
+
+    store.add_note({'site': 'Jamestown', 'equipment': 'FP 1', 'content': 'Replaced nozzle', 'date': '2025-04-07'})
+    # A duplicate is skipped and counted nowhere
+    assert store.add_note({'site': 'King', 'equipment': 'FP 9', 'content': 'purged  crind', 'date': '2025-05-01'}) is None
+    facets = store.facet_counts()
+    assert facets['site'] == {'Jamestown': 3, 'King': 3}
+    assert facets['equipment']['FP 1'] == 3
+    assert facets['day']['2025-04-07'] == 1
+    assert facets['week']['2025-04-07'] == 1
+    assert '2025-05' not in facets['month']
+
+
+def test_facet_counts_after_bulk_import(tmp_path):
+    store = SqliteNoteStore(str(tmp_path / 'notes.db'))
+    store.add_note(dict(NOTES[0]))
+    # Several batches, so the insert triggers are suspended for the import
+    notes = [dict(note) for note in NOTES * 2]
+    assert store.import_notes(notes, batch_size=2) == len(NOTES) - 1
+
+    expected = FacetCounts(NOTES)
+    assert store.facet_counts() == {facet: dict(counts) for facet, counts in expected.counts.items()}
+    assert store.count_notes() == len(NOTES)
+    assert contents(store.query_notes('ppu')) == contents(n for n in NOTES if 'ppu' in n['content'].lower())
+    # The triggers are back, so single inserts are counted again
+    store.add_note({'site': 'Oak Ridge', 'content': 'Reset the tank monitor'})
+    assert store.facet_counts()['site']['Oak Ridge'] == 1
+
+
+def test_migrates_a_version_0_database(tmp_path):
+    path = str(tmp_path / 'clean_notes.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE notes (id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT)')
+    conn.executemany('INSERT INTO notes (content) VALUES (?)',
+                     [('Replaced PPU at King',), ('Purged CRIND',)])
+    conn.commit()
+    conn.close()
+
+    store = SqliteNoteStore(path)
+    assert store._connect().execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert [(note['id'], note['site'], note['content']) for note in store.get_notes()] == [
+        (1, 'Uncategorized', 'Replaced PPU at King'), (2, 'Uncategorized', 'Purged CRIND')]
+    assert store.facet_counts()['site'] == {'Uncategorized': 2}
+    # The search index and fingerprints were built for the existing rows
+    assert contents(store.query_notes('crind')) == ['Purged CRIND']
+    assert store.add_note({'site': 'Uncategorized', 'content': 'purged crind'}) is None
+
+    note_id = store.add_note({'site': 'King', 'content': 'Cleaned nozzle', 'date': '2025-03-01'})
+    assert note_id == 3
+    assert store.facet_counts()['site'] == {'King': 1, 'Uncategorized': 2}
+
+
+def write_equipment_file(data_dir, site, equipment, *texts):
+    (data_dir / site).mkdir(parents=True, exist_ok=True)
+    (data_dir / site / f'{equipment}.json').write_text(
+        json.dumps([{'content': text, 'date': '2025-03-01'} for text in texts]))
+
+
+def test_migration_records_the_source_of_equipment_file_notes(tmp_path):
+    data = tmp_path / 'data'
+    write_equipment_file(data, 'King', 'FP 1', 'Replaced PPU')
+    # notes.json repeats the file's note without a source, next to a posted one
+    (data / 'notes.json').write_text(json.dumps([
+        {'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU', 'date': '2025-03-01'},
+        {'site': 'King', 'equipment': 'FP 1', 'content': 'Posted by hand', 'date': '2025-03-02'},
+    ]))
+    store = SqliteNoteStore(str(tmp_path / 'notes.db'), data_dir=str(data))
+    assert store.get_sources() == {'King/FP 1.json'}
+
+    assert store.replace_source('King/FP 1.json', []) == (0, 1)
+    assert contents(store.query_notes()) == ['Posted by hand']
+
+
+def test_upgrade_records_the_source_of_equipment_file_notes_only(tmp_path):
+    data = tmp_path / 'data'
+    write_equipment_file(data, 'King', 'FP 1', 'Replaced PPU')
+    path = str(tmp_path / 'notes.db')
+    store = SqliteNoteStore(path)
+    store.import_notes([
+        {'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU', 'date': '2025-03-01'},
+        # Not in the file, so posted by hand
+        {'site': 'King', 'equipment': 'FP 1', 'content': 'Purged CRIND', 'date': '2025-03-02'},
+    ])
+    store._connect().execute('PRAGMA user_version = 6')
+
+    store = SqliteNoteStore(path, data_dir=str(data))
+    assert store.get_sources() == {'King/FP 1.json'}
+    assert store._connect().execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert store.replace_source('King/FP 1.json', []) == (0, 1)
+    assert contents(store.query_notes()) == ['Purged CRIND']
+    # Posted after the upgrade, so never taken over by the file
+    store.add_note({'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU'})
+    assert store.replace_source('King/FP 1.json', [{'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU'}]) == (0, 0)
+    assert store.replace_source('King/FP 1.json', []) == (0, 0)
+    assert store.count_notes() == 2
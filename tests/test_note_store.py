@@ -0,0 +1,213 @@
+import json
+
+import pytest
+
+from scripts.note_store import NoteStore
+from scripts.note_db import SqliteNoteStore
+
+NOTES = [
+    {'site': 'King', 'equipment': 'FP 1', 'content': 'Replaced PPU', 'date': '2025-03-01 09:00:00'},
+    {'site': 'King', 'equipment': 'FP 5', 'content': 'Purged CRIND', 'date': '2025-03-12 14:30:00'},
+    {'site': 'Jamestown', 'equipment': 'FP 1', 'content': 'Cleaned PPU ribbon', 'date': '2025-04-02 08:15:00'},
+    {'site': 'Jamestown', 'equipment': 'FP 6', 'content': 'No date given', 'date': ''},
+    {'site': 'King', 'equipment': 'FP 6', 'content': 'Undated PPU check', 'date': None},
+]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """A NoteStore and a SqliteNoteStore holding the same NOTES, in the same order."""
+    json_store = NoteStore(str(tmp_path / 'data'), compact_interval=0)
+    sqlite_store = SqliteNoteStore(str(tmp_path / 'notes.db'))
+    for note in NOTES:
+        json_store.add_note(dict(note))
+        sqlite_store.add_note(dict(note))
+    return json_store, sqlite_store
+
+
+def contents(notes):
+    return [note['content'] for note in notes]
+
+
+@pytest.mark.parametrize('date_from, date_to', [
+    (None, '2025-03-15'),
+    ('2025-03-05', None),
+    ('2025-03', '2025-04'),
+    (None, '2026'),
+])
+def test_date_range_matches_across_stores(stores, date_from, date_to):
+    json_store, sqlite_store = stores
+    expected = contents(json_store.query_notes(date_from=date_from, date_to=date_to))
+    assert contents(sqlite_store.query_notes(date_from=date_from, date_to=date_to)) == expected
+    assert sqlite_store.count_notes(date_from=date_from, date_to=date_to) == len(expected)
+    assert 'No date given' not in expected
+    assert 'Undated PPU check' not in expected
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        return NoteStore(str(tmp_path / 'data'), compact_interval=0)
+    return SqliteNoteStore(str(tmp_path / 'notes.db'))
+
+
+def equipment_notes(*texts):
+    return [{'site': 'King', 'equipment': 'FP 1', 'content': text, 'date': '2025-03-01 09:00:00'}
+            for text in texts]
+
+
+def test_replace_source_applies_edits_and_removals(store):
+    store.add_note({'site': 'King', 'equipment': 'FP 5', 'content': 'Posted note', 'date': '2025-03-02'})
+    assert store.replace_source('King/FP 1.json', equipment_notes('Replaced PPU', 'Purged CRIND')) == (2, 0)
+    assert store.get_sources() == {'King/FP 1.json'}
+
+    assert store.replace_source('King/FP 1.json', equipment_notes('Replaced PPU', 'Purged CRIND again')) == (1, 1)
+    assert contents(store.query_notes()) == ['Posted note', 'Replaced PPU', 'Purged CRIND again']
+
+    assert store.replace_source('King/FP 1.json', []) == (0, 2)
+    assert contents(store.query_notes()) == ['Posted note']
+    assert store.get_sources() == set()
+    assert store.facet_notes()['facets']['equipment'] == {'FP 5': 1}
+
+
+def test_replace_source_leaves_identical_posted_notes_unowned(store):
+    store.add_note(equipment_notes('Replaced PPU')[0])
+    assert store.replace_source('King/FP 1.json', equipment_notes('Replaced PPU')) == (0, 0)
+    assert store.get_sources() == set()
+
+    store.replace_source('King/FP 1.json', [])
+    assert contents(store.query_notes()) == ['Replaced PPU']
+
+
+def test_notes_json_from_before_sources_is_migrated_once(tmp_path):
+    data = tmp_path / 'data'
+    (data / 'King').mkdir(parents=True)
+    (data / 'King' / 'FP 1.json').write_text(json.dumps([{'content': 'Replaced PPU', 'date': '2025-03-01'}]))
+    posted = {'site': 'King', 'equipment': 'FP 2', 'content': 'Replaced PPU', 'date': '2025-03-02'}
+    legacy = equipment_notes('Replaced PPU', 'Purged CRIND') + [posted]
+    (data / 'notes.json').write_text(json.dumps(legacy))
+
+    store = NoteStore(str(data), compact_interval=0)
+    assert store.get_sources() == {'King/FP 1.json'}
+    # Recorded in notes.json, so other processes and restarts see it too
+    stored = json.loads((data / 'notes.json').read_text())
+    assert [note.get('source') for note in stored] == ['King/FP 1.json', None, None]
+
+    # Only the note still in the file was its; the others stay
+    assert store.replace_source('King/FP 1.json', []) == (0, 1)
+    assert contents(store.query_notes()) == ['Purged CRIND', 'Replaced PPU']
+
+
+def test_replace_source_leaves_notes_owned_elsewhere(store):
+    store.add_note(equipment_notes('Replaced PPU')[0])
+    assert store.replace_source('King/FP 2.json', equipment_notes('Cleaned nozzle')) == (1, 0)
+    assert store.replace_source('King/FP 1.json', equipment_notes('Cleaned nozzle')) == (0, 0)
+
+    store.replace_source('King/FP 1.json', [])
+    assert contents(store.query_notes()) == ['Replaced PPU', 'Cleaned nozzle']
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'query': 'ppu'},
+    {'query': 'Pu'},
+    {'site': 'King'},
+    {'query': 'ppu', 'site': 'Jamestown'},
+    {'date_from': '2025-03-05', 'date_to': '2025-04-30'},
+    {'site': 'King', 'date_from': '2025-03'},
+])
+def test_query_count_and_facets_match_across_stores(stores, filters):
+    json_store, sqlite_store = stores
+    expected = json_store.facet_notes(**filters)
+    actual = sqlite_store.facet_notes(**filters)
+    assert actual['total'] == expected['total']
+    assert actual['facets'] == expected['facets']
+    assert contents(actual['notes']) == contents(expected['notes'])
+    assert contents(sqlite_store.query_notes(**filters)) == contents(json_store.query_notes(**filters))
+    assert sqlite_store.count_notes(**filters) == json_store.count_notes(**filters) == expected['total']
+
+
+def test_journal_is_read_by_another_instance(tmp_path):
+    data_dir = str(tmp_path / 'data')
+    writer = NoteStore(data_dir, compact_interval=0)
+    writer.add_note(dict(NOTES[0]))
+    writer.import_notes([dict(note) for note in NOTES[1:3]])
+    assert (tmp_path / 'data' / 'notes.jsonl').read_text(encoding='utf-8').count('\n') == 3
+
+    reader = NoteStore(data_dir, compact_interval=0)
+    assert contents(reader.query_notes()) == contents(NOTES[:3])
+    # Appends made after the reader loaded are picked up from the journal tail
+    writer.add_note(dict(NOTES[3]))
+    assert contents(reader.query_notes()) == contents(NOTES[:4])
+    assert reader.facet_notes()['facets']['site'] == {'Jamestown': 2, 'King': 2}
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    data_dir = tmp_path / 'data'
+    store = NoteStore(str(data_dir), compact_interval=0)
+    for note in NOTES[:3]:
+        store.add_note(dict(note))
+    assert store.compact()
+    assert (data_dir / 'notes.jsonl').read_text(encoding='utf-8') == ''
+    assert not store.compact()
+
+    # Positions continue after the snapshot, and a fresh load sees both
+    assert store.add_note(dict(NOTES[3])) == 3
+    reloaded = NoteStore(str(data_dir), compact_interval=0)
+    assert contents(reloaded.query_notes()) == contents(NOTES[:4])
+    assert [note['id'] for note in reloaded.query_notes()] == [0, 1, 2, 3]
+
+
+def test_truncated_last_journal_line_is_skipped(tmp_path):
+    data_dir = tmp_path / 'data'
+    store = NoteStore(str(data_dir), compact_interval=0)
+    for note in NOTES[:2]:
+        store.add_note(dict(note))
+    # A writer that crashed part way through its entry
+    journal = data_dir / 'notes.jsonl'
+    journal.write_bytes(journal.read_bytes()[:-20])
+
+    recovered = NoteStore(str(data_dir), compact_interval=0)
+    assert contents(recovered.query_notes()) == contents(NOTES[:1])
+    # The next entry starts on a line of its own rather than after the fragment
+    assert recovered.add_note(dict(NOTES[2])) == 1
+    assert contents(NoteStore(str(data_dir), compact_interval=0).query_notes()) == contents([NOTES[0], NOTES[2]])
+    assert recovered.compact()
+    assert contents(NoteStore(str(data_dir), compact_interval=0).query_notes()) == contents([NOTES[0], NOTES[2]])
+
+
+@pytest.mark.parametrize('entry', [
+    {'note': NOTES[1]},
+    {'pos': 1},
+    {'pos': '1', 'note': NOTES[1]},
+    {'pos': 1, 'note': 'Purged CRIND'},
+    [1, NOTES[1]],
+    None,
+])
+def test_malformed_journal_entry_is_skipped(tmp_path, entry):
+    data_dir = tmp_path / 'data'
+    store = NoteStore(str(data_dir), compact_interval=0)
+    store.add_note(dict(NOTES[0]))
+    with open(data_dir / 'notes.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+
+    recovered = NoteStore(str(data_dir), compact_interval=0)
+    assert contents(recovered.query_notes()) == contents(NOTES[:1])
+    assert recovered.add_note(dict(NOTES[2])) == 1
+    assert recovered.compact()
+    assert contents(NoteStore(str(data_dir), compact_interval=0).query_notes()) == contents([NOTES[0], NOTES[2]])
+
+
+def test_journal_entry_with_a_non_string_date_still_loads(tmp_path):
+    data_dir = tmp_path / 'data'
+    store = NoteStore(str(data_dir), compact_interval=0)
+    store.add_note(dict(NOTES[0]))
+    # Written before add_note callers had to pass dates as strings
+    with open(data_dir / 'notes.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'pos': 1, 'note': dict(NOTES[1], date=20250312)}) + '\n')
+
+    reloaded = NoteStore(str(data_dir), compact_interval=0)
+    assert contents(reloaded.query_notes()) == contents(NOTES[:2])
+    assert reloaded.facet_notes()['facets']['month'] == {'2025-03': 1}
+    assert contents(reloaded.query_notes(date_from='2025-03')) == contents(NOTES[:1])
+    assert reloaded.add_note(dict(NOTES[2])) == 2
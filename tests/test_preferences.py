@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import scripts.preferences
+from scripts.preferences import UserPreferences
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Record every preferences file write."""
+    paths = []
+    write_json = scripts.preferences.write_json
+
+    def counting_write_json(path, data, **kwargs):
+        paths.append(path)
+        write_json(path, data, **kwargs)
+
+    monkeypatch.setattr(scripts.preferences, 'write_json', counting_write_json)
+    return paths
+
+
+def read_file(prefs):
+    with open(prefs.preferences_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_update_is_written_once_after_flush_and_reloads(tmp_path, writes):
+    prefs = UserPreferences(tmp_path, flush_delay=60)
+    assert len(writes) == 1  # the defaults, on first use
+    version = prefs.version
+
+    assert prefs.update({'theme': 'dark', 'notifications.sound': False, 'notesPerPage': 50})
+    assert prefs.set_preference('fontSize', 'large')
+    # Readers see the changes at once; each update bumps the version once
+    assert prefs.get_preference('notifications.sound') is False
+    assert prefs.get_preference('notifications.enabled') is True
+    assert prefs.version == version + 2
+    # but the file is left alone until the delay passes or flush() runs
+    assert len(writes) == 1
+    assert read_file(prefs)['theme'] == 'light'
+
+    assert prefs.flush()
+    assert len(writes) == 2
+    assert prefs.flush()
+    assert len(writes) == 2
+
+    reloaded = UserPreferences(tmp_path, flush_delay=60)
+    assert reloaded.get_preference('theme') == 'dark'
+    assert reloaded.get_preference('notesPerPage') == 50
+    assert reloaded.get_preference('fontSize') == 'large'
+    assert reloaded.preferences['notifications'] == {'enabled': True, 'sound': False, 'desktop': True}
+
+
+def test_burst_of_updates_is_flushed_once_by_the_timer(tmp_path, writes):
+    prefs = UserPreferences(tmp_path, flush_delay=0.2)
+    for size in range(10):
+        prefs.update({'refreshInterval': size})
+    timer = prefs._flush_timer
+    assert len(writes) == 1
+    timer.join(5)
+    assert len(writes) == 2
+    assert read_file(prefs)['refreshInterval'] == 9
+
+
+def test_external_change_is_reloaded_but_unsaved_changes_win(tmp_path):
+    prefs = UserPreferences(tmp_path, flush_delay=60, check_interval=0)
+    other = UserPreferences(tmp_path, flush_delay=0)
+    version = prefs.version
+
+    other.update({'theme': 'dark'})
+    # Another process's write may land within the same mtime tick; the size differs
+    assert prefs.get_preference('theme') == 'dark'
+    assert prefs.version == version + 1
+    unchanged = prefs.version
+    assert prefs.get_preference('theme') == 'dark'
+    assert prefs.version == unchanged
+
+    prefs.update({'defaultView': 'list'})
+    other.update({'theme': 'light'})
+    assert prefs.get_preference('theme') == 'dark'
+    prefs.flush()
+    assert read_file(prefs)['defaultView'] == 'list'
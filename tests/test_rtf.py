@@ -0,0 +1,59 @@
+import os
+import random
+
+import pytest
+from striprtf.striprtf import rtf_to_text as striprtf_to_text
+
+from benchmarks.bench_rtf import FIXTURE_DIR, make_document, make_large_document
+from scripts.rtf import rtf_to_text
+
+
+@pytest.mark.parametrize('filename', sorted(os.listdir(FIXTURE_DIR)))
+def test_fixture_matches_striprtf(filename):
+    with open(os.path.join(FIXTURE_DIR, filename), 'r', encoding='utf-8') as f:
+        text = f.read()
+    assert rtf_to_text(text, errors='replace') == striprtf_to_text(text, errors='replace')
+
+
+def test_random_documents_match_striprtf():
+    rng = random.Random(1)
+    for _ in range(300):
+        text = make_document(rng, rng.randint(1, 200))
+        assert rtf_to_text(text, errors='replace') == striprtf_to_text(text, errors='replace')
+
+
+def test_document_with_pictures_matches_striprtf():
+    text = make_large_document(random.Random(2), 0.2, picture_every=5)
+    assert '\\pict' in text
+    assert rtf_to_text(text) == striprtf_to_text(text)
+
+
+@pytest.mark.parametrize('rtf, expected', [
+    ('{\\rtf1\\ansi\\pard Replaced PPU\\par\r\nTested\\par}', 'Replaced PPU\nTested\n'),
+    # Raw line breaks carry no meaning, including inside plain text
+    ('{\\rtf1 Replaced\r\n PPU\\line\r\ndone}', 'Replaced PPU\ndone'),
+    # \uN with its fallback skipped, per \ucN, across runs of plain text
+    (r'{\rtf1 caf\u233?, {\uc2\u8364\'80\'80 40}, \u-3913?x}', 'caf\xe9, \u20ac 40, \uf0b7x'),
+    (r"{\rtf1\ansi\ansicpg1251 \'cf\'f0\'e8}", '\u041f\u0440\u0438'),
+    (r"{\rtf1{\fonttbl{\f0\fcharset0 A;}{\f1\fcharset204 B;}}\f1 \'cf\f0 \'cf}", '\u041f\xcf'),
+    # Destinations, ignorable groups and pictures leave no text
+    (r'{\rtf1 a{\*\bkmkstart x}b{\info{\author me}}c{\pict\wmetafile8 0a{}1b}d}', 'abcd'),
+    (r'{\rtf1 \{braces\} and \\share\~\emdash }', '{braces} and \\share\xa0\u2014'),
+    # Text after the document group is discarded
+    (r'{\rtf1 note}trailing', 'note'),
+])
+def test_converts(rtf, expected):
+    assert rtf_to_text(rtf) == expected
+    assert striprtf_to_text(rtf) == expected
+
+
+@pytest.mark.parametrize('rtf, expected', [
+    # A destination that is never closed hides the rest of the document
+    (r'{\rtf1 kept{\comment never closed', 'kept'),
+    # One that changes the code page is walked to apply it
+    (r"{\rtf1 {\*\x\ansicpg1251 \'cf}\'cf}", '\u041f'),
+    (r'}}{\rtf1 a}', ''),
+    ('{\\rtf1 dangling\\', 'dangling\\'),
+])
+def test_converts_malformed_documents(rtf, expected):
+    assert rtf_to_text(rtf) == expected
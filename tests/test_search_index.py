@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from scripts.search_index import TrigramIndex
+
+CONTENTS = [
+    'Replaced PPU in premium position',
+    'Purged CRIND',
+    'purged crind again',
+    '',
+    None,
+    'Ünicode Straße café',
+    'ab',
+    'a',
+    'ppu ppu ppu',
+]
+
+
+def containment(contents, query):
+    """The case-insensitive substring semantics the index must reproduce."""
+    return [i for i, content in enumerate(contents) if query.lower() in (content or '').lower()]
+
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    index.build(CONTENTS)
+    return index
+
+
+@pytest.mark.parametrize('query', [
+    '', 'p', 'P', 'pp', 'ppu', 'PPU ', 'purged crind', 'Crind', 'ppu ppu', 'ß', 'straße', 'CAFÉ',
+    'a', 'ab', 'abc', 'zzz', 'n p', '\0', 'a\0',
+])
+def test_search_matches_case_insensitive_containment(index, query):
+    assert index.search(query) == containment(CONTENTS, query)
+
+
+def test_random_corpus_matches_containment():
+    rng = random.Random(1)
+    alphabet = 'abcAB C-'
+    contents = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(300)]
+    index = TrigramIndex()
+    index.build(contents)
+    for _ in range(500):
+        query = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+        assert index.search(query) == containment(contents, query)
+
+
+def test_added_and_removed_documents(index):
+    assert index.add('New PPU harness') == len(CONTENTS)
+    assert index.search('ppu') == [0, 8, len(CONTENTS)]
+    assert index.search('pp') == [0, 8, len(CONTENTS)]
+
+    index.remove(0)
+    index.remove(0)
+    assert len(index) == len(CONTENTS)
+    assert index.search('ppu') == [8, len(CONTENTS)]
+    assert index.search('pr') == []
+    assert 0 not in index.search('')
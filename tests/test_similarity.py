@@ -0,0 +1,82 @@
+import pytest
+
+from scripts.note_db import SqliteNoteStore
+from scripts.note_store import NoteStore
+from scripts.similarity import NoteSimilarity, SimilarityIndex, estimate_similarity, minhash_signature
+
+TEXTS = [
+    'Replaced the PPU board in the premium position and tested the dispenser',
+    'replaced the PPU board in premium position and tested the dispenser',
+    'Purged the CRIND and reset the card reader at the island',
+    'Replaced the PPU board in the premium position and tested the dispenser.',
+    'Tank monitor alarm cleared after probe recalibration',
+]
+
+
+def equipment_notes(*texts):
+    return [{'site': 'King', 'equipment': 'FP 1', 'content': text, 'date': '2025-03-01 09:00:00'}
+            for text in texts]
+
+
+def test_signatures_estimate_similarity():
+    same = minhash_signature(TEXTS[0])
+    assert minhash_signature('  ' + TEXTS[0].upper()) == same
+    assert estimate_similarity(same, same) == 1.0
+    assert estimate_similarity(same, minhash_signature(TEXTS[1])) >= 0.6
+    assert estimate_similarity(same, minhash_signature(TEXTS[4])) < 0.25
+    assert minhash_signature('  ') is None
+
+
+def test_similar_and_clusters():
+    index = SimilarityIndex()
+    for note_id, text in enumerate(TEXTS, start=1):
+        assert index.add(note_id, text)
+    assert not index.add(6, '')
+    assert len(index) == 5 and 6 not in index
+
+    assert [note_id for note_id, _ in index.similar(1)] == [4, 2]
+    assert index.similar(3) == []
+    assert index.similar(1, limit=1)[0][0] == 4
+    with pytest.raises(KeyError):
+        index.similar(6)
+    assert index.clusters() == [[1, 2, 4]]
+    assert index.clusters(min_size=4) == []
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        return NoteStore(str(tmp_path / 'data'), compact_interval=0)
+    return SqliteNoteStore(str(tmp_path / 'notes.db'))
+
+
+def test_refresh_indexes_added_notes(store):
+    similarity = NoteSimilarity(store)
+    store.add_note(equipment_notes(TEXTS[0])[0])
+    assert len(similarity.refresh()) == 1
+
+    store.import_notes(equipment_notes(*TEXTS[1:]))
+    index = similarity.refresh()
+    assert len(index) == 5
+    assert index.clusters() == [[note['id'] for note in store.query_notes('PPU board')]]
+
+
+def test_refresh_drops_notes_removed_by_replace_source(store):
+    similarity = NoteSimilarity(store)
+    store.replace_source('King/FP 1.json', equipment_notes(TEXTS[0], TEXTS[1]))
+    store.add_note({'site': 'King', 'equipment': 'FP 2', 'content': TEXTS[3]})
+    store.add_note({'site': 'King', 'equipment': 'FP 2', 'content': TEXTS[2]})
+    assert len(similarity.refresh().clusters()[0]) == 3
+
+    store.replace_source('King/FP 1.json', [])
+    index = similarity.refresh()
+    ids = [note['id'] for note in store.query_notes()]
+    assert len(index) == len(ids) and all(note_id in index for note_id in ids)
+    assert index.similar(ids[0]) == []
+    assert index.clusters() == []
+
+    # Notes added afterwards are picked up as usual
+    store.add_note({'site': 'Jamestown', 'content': TEXTS[1]})
+    index = similarity.refresh()
+    assert len(index) == 3
+    assert len(index.clusters()[0]) == 2
@@ -0,0 +1,53 @@
+import os
+import queue
+
+import pytest
+
+import scripts.watcher
+from scripts.watcher import DataDirWatcher, is_ignored
+
+
+@pytest.fixture(params=['inotify', 'polling'])
+def watch(request, tmp_path, monkeypatch):
+    """Start a watcher on tmp_path and return a function waiting for its next batch of changes."""
+    if request.param == 'polling':
+        monkeypatch.setattr(scripts.watcher, '_load_inotify', lambda: None)
+    elif scripts.watcher._load_inotify() is None:
+        pytest.skip('inotify is not available')
+    batches = queue.Queue()
+    watcher = DataDirWatcher(str(tmp_path), batches.put, poll_interval=0.05, debounce=0.1).start()
+    assert watcher.mode == request.param
+
+    def next_batch():
+        return batches.get(timeout=5)
+
+    yield next_batch
+    watcher.stop()
+    assert batches.empty()
+
+
+def test_reports_added_changed_and_removed_paths(tmp_path, watch):
+    (tmp_path / 'King').mkdir()
+    (tmp_path / 'King' / 'FP 1.json').write_text('[]')
+    assert watch() >= {'King', os.path.join('King', 'FP 1.json')}
+
+    (tmp_path / 'King' / 'FP 1.json').write_text('[{"content": "Replaced PPU"}]')
+    assert watch() == {os.path.join('King', 'FP 1.json')}
+
+    # Polling also sees the directory's mtime change
+    (tmp_path / 'King' / 'FP 1.json').unlink()
+    assert watch() - {'King'} == {os.path.join('King', 'FP 1.json')}
+
+
+def test_burst_of_writes_is_one_batch_without_temp_files(tmp_path, watch):
+    for i in range(5):
+        (tmp_path / f'note_{i}.tmp').write_text('partial')
+        os.replace(tmp_path / f'note_{i}.tmp', tmp_path / f'note_{i}.txt')
+    (tmp_path / '.hidden').write_text('x')
+    assert watch() == {f'note_{i}.txt' for i in range(5)}
+
+
+def test_ignored_names():
+    assert is_ignored('.note_fingerprints.json')
+    assert is_ignored('notes.json.tmp')
+    assert not is_ignored('notes.json')